@@ -0,0 +1,106 @@
+#!/usr/bin/python3
+"""Principal cache for authenticated requests."""
+
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Dict, Tuple
+from api.v1.configurations.settings import settings
+from api.v1.models.schemas.users import Principal
+
+
+class PrincipalCache:
+    """Bounded LRU cache of principals keyed by token subject."""
+
+    def __init__(
+        self, max_size: int, ttl: float, enabled: bool = True
+    ) -> None:
+        """Initialize the cache."""
+        self.max_size: int = max_size
+        self.ttl: float = ttl
+        self.enabled: bool = enabled
+        self._entries: OrderedDict[str, Tuple[float, Principal]] = (
+            OrderedDict()
+        )
+        self._lock = Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    def get(self, uuid_pk: str) -> Principal | None:
+        """
+        Retrieve a cached principal.
+
+        Args:
+            uuid_pk (str): The token subject
+        Returns:
+            The principal if cached and not expired, None otherwise
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(uuid_pk)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, principal = entry
+            if expires_at <= monotonic():
+                del self._entries[uuid_pk]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(uuid_pk)
+            self.hits += 1
+            return principal
+
+    def set(self, uuid_pk: str, principal: Principal) -> None:
+        """Cache a principal, evicting the least recently used entry."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[uuid_pk] = (monotonic() + self.ttl, principal)
+            self._entries.move_to_end(uuid_pk)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, uuid_pk: str) -> None:
+        """
+        Drop a principal and every trustee principal added by it.
+
+        Args:
+            uuid_pk (str): The grantor or trustee unique identifier
+        """
+        uuid_pk = str(uuid_pk)
+        with self._lock:
+            self._entries.pop(uuid_pk, None)
+            stale = [
+                key for key, (_, principal) in self._entries.items()
+                if principal.added_by == uuid_pk
+            ]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        """Drop every cached principal and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, int | bool]:
+        """Return the cache counters."""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+principal_cache = PrincipalCache(
+    max_size=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL,
+    enabled=settings.PRINCIPAL_CACHE_ENABLED
+)
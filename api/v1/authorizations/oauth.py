@@ -2,6 +2,7 @@
 """Authentication support."""
 
 from datetime import datetime, timedelta
+from hmac import compare_digest
 from typing import Optional
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status, Request
@@ -11,10 +12,11 @@ from fastapi.security.utils import get_authorization_scheme_param
 from fastapi.openapi.models import OAuthFlows as OAuthFlowsModel
 from sqlalchemy.exc import DataError
 from sqlalchemy.orm import Session
+from api.v1.authorizations.cache import principal_cache
 from api.v1.configurations.database import get_db
 from api.v1.configurations.settings import settings
 from api.v1.models.data.users import User, Trustee
-from api.v1.models.schemas.users import TokenData
+from api.v1.models.schemas.users import Principal, TokenData
 
 SECRET_KEY = settings.OAUTH2_SECRET_KEY
 ALGORITHM = settings.ALGORITHM
@@ -120,7 +122,12 @@ def verify_token(token: str, credentials_exception):
         user_id: str = decoded_jwt.get("uuid_pk")
         if user_id is None:
             raise credentials_exception
-        token_data = TokenData(uuid_pk=user_id)
+        token_data = TokenData(
+            uuid_pk=user_id,
+            username=decoded_jwt.get("username"),
+            account_type=decoded_jwt.get("account_type"),
+            added_by=decoded_jwt.get("added_by")
+        )
 
     except JWTError as exc:
         raise credentials_exception from exc
@@ -131,7 +138,7 @@ def verify_token(token: str, credentials_exception):
 def get_current_user(
         token: str = Depends(oauth2_scheme),
         session: Session = Depends(get_db)
-):
+) -> Principal:
     """Get current user helper."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -140,13 +147,84 @@ def get_current_user(
     )
 
     user = verify_token(token, credentials_exception)
-    query = session.query(User).filter(
-        User.uuid_pk == user.uuid_pk
-    ).first()
-    if query:
-        return query
-    else:
+    user_id = str(user.uuid_pk)
+    principal = principal_cache.get(user_id)
+    if principal:
+        return principal
+    # Tokens issued before the account_type claim existed fall back to
+    # trying both tables.
+    if user.account_type in (None, "grantor"):
+        query = session.query(User).filter(
+            User.uuid_pk == user_id
+        ).first()
+        if query:
+            principal = Principal(
+                uuid_pk=query.uuid_pk,
+                username=query.username,
+                account_type="grantor"
+            )
+    if principal is None and user.account_type in (None, "trustee"):
         trustee = session.query(Trustee).filter(
-            Trustee.uuid_pk == user.uuid_pk
+            Trustee.uuid_pk == user_id
         ).first()
-        return trustee
+        if trustee:
+            principal = Principal(
+                uuid_pk=trustee.uuid_pk,
+                username=trustee.username,
+                account_type="trustee",
+                added_by=trustee.added_by
+            )
+    if principal is None:
+        raise credentials_exception
+    principal_cache.set(user_id, principal)
+    return principal
+
+
+def get_token_principal(
+        token: str = Depends(oauth2_scheme),
+        session: Session = Depends(get_db)
+) -> Principal:
+    """
+    Build the current principal from the token claims alone.
+
+    Only suitable for routes whose queries are scoped by the principal id,
+    since the account is not looked up. Tokens without an account_type
+    claim are resolved through get_current_user.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid credentials",
+        headers={"WWW-Authenticate": "Bearer"}
+    )
+
+    user = verify_token(token, credentials_exception)
+    if user.account_type is None or user.username is None:
+        return get_current_user(token=token, session=session)
+    return Principal(
+        uuid_pk=str(user.uuid_pk),
+        username=user.username,
+        account_type=user.account_type,
+        added_by=user.added_by
+    )
+
+
+def get_metrics_scraper(request: Request) -> None:
+    """
+    Admit the monitoring system to the metrics route.
+
+    The scraper presents settings.METRICS_TOKEN as a bearer token; while
+    no token is configured the route does not exist.
+    """
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    scheme, param = get_authorization_scheme_param(
+        request.headers.get("Authorization")
+    )
+    if scheme.lower() != "bearer" or not compare_digest(
+        param.encode(), settings.METRICS_TOKEN.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid credentials",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
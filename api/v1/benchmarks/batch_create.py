@@ -0,0 +1,86 @@
+#!/usr/bin/python3
+"""
+Onboard an estate with N single POSTs versus one batch POST.
+
+Adds the same beneficiaries and assets both ways for a fresh grantor
+and reports the wall-clock time of each.
+
+Usage:
+    python -m api.v1.benchmarks.batch_create [items]
+"""
+
+import sys
+from time import perf_counter
+from fastapi.testclient import TestClient
+from api.v1.benchmarks.common import register_grantor
+from api.v1.main import app
+
+
+def beneficiaries(count: int, prefix: str):
+    """Build count beneficiary payloads."""
+    return [
+        {
+            "first_name": f"{prefix}{i}", "last_name": "Bench",
+            "middle_name": None, "relation": "son"
+        } for i in range(count)
+    ]
+
+
+def assets(count: int, will_to: str):
+    """Build count asset payloads willed to will_to."""
+    return [
+        {"name": f"Plot {i}", "location": "Onitsha", "will_to": will_to,
+         "note": ""} for i in range(count)
+    ]
+
+
+def run(items: int = 200) -> None:
+    """Time both ways of adding items beneficiaries and items assets."""
+    client = TestClient(app)
+    grantor = register_grantor(client)
+    grantor_id, headers = grantor["id"], grantor["headers"]
+    base = "/api/v1"
+
+    start = perf_counter()
+    for payload in beneficiaries(items, "Single"):
+        res = client.post(
+            f"{base}/beneficiaries/account/{grantor_id}/create/beneficiary",
+            headers=headers, json=payload
+        )
+        assert res.status_code == 201, res.text
+    heir = client.get(
+        f"{base}/beneficiaries/account/{grantor_id}/beneficiaries",
+        headers=headers
+    ).json()[0]["uuid_pk"]
+    for payload in assets(items, heir):
+        res = client.post(
+            f"{base}/assets/{grantor_id}/create/asset",
+            headers=headers, json=payload
+        )
+        assert res.status_code == 201, res.text
+    single = perf_counter() - start
+
+    start = perf_counter()
+    res = client.post(
+        f"{base}/beneficiaries/account/{grantor_id}/create/beneficiaries",
+        headers=headers, json=beneficiaries(items, "Batch")
+    )
+    assert res.status_code == 201, res.text
+    res = client.post(
+        f"{base}/assets/{grantor_id}/create/assets",
+        headers=headers, json=assets(items, res.json()[0]["uuid_pk"])
+    )
+    assert res.status_code == 201, res.text
+    batch = perf_counter() - start
+
+    print(f"{2 * items} single POSTs   {single * 1000:10.1f}ms")
+    print(f"2 batch POSTs       {batch * 1000:10.1f}ms")
+    print(f"speedup             {single / batch:10.1f}x")
+    client.delete(
+        f"{base}/grantors/account/dashboard/{grantor_id}/delete",
+        headers=headers
+    )
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
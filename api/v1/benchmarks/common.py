@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+"""Shared helpers for Estate Trust benchmarks."""
+
+from statistics import median
+from typing import Dict, List
+from uuid import uuid4
+from fastapi.testclient import TestClient
+
+PASSWORD = "07067Oliver"
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Return the given percentile of the samples."""
+    if pct == 50:
+        return median(samples)
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * len(ordered))))
+    return ordered[index]
+
+
+def register_grantor(client: TestClient) -> Dict[str, str]:
+    """
+    Create a throwaway grantor and log it in.
+
+    Args:
+        client (TestClient): The client to use
+    Returns:
+        Dictionary containing the grantor id, username and auth headers
+    """
+    suffix = uuid4().hex[:8]
+    res = client.post("/api/v1/grantors/account/create", json={
+        "first_name": "Bench",
+        "last_name": "Mark",
+        "middle_name": suffix,
+        "username": f"b{suffix}",
+        "password": PASSWORD,
+        "email": f"bench{suffix}@example.com",
+        "phone_number": f"+234{int(suffix, 16) % 10**10:010d}",
+        "date_of_birth": "2000-07-18",
+        "gender": "other"
+    })
+    assert res.status_code == 201, res.text
+    res = client.post("/api/v1/auths/account/login", json={
+        "username": f"b{suffix}",
+        "password": PASSWORD,
+        "account_type": "grantor"
+    })
+    assert res.status_code == 200, res.text
+    token = res.json()
+    return {
+        "id": token["id"],
+        "username": f"b{suffix}",
+        "headers": {"Authorization": f"Bearer {token['access_token']}"}
+    }
+
+
+def report(name: str, samples: List[float]) -> None:
+    """Print latency percentiles in milliseconds."""
+    print(
+        f"{name:<28} n={len(samples):<6} "
+        f"p50={percentile(samples, 50) * 1000:8.3f}ms "
+        f"p95={percentile(samples, 95) * 1000:8.3f}ms"
+    )
@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+"""
+Request throughput as the number of in-flight requests grows.
+
+A fixed per-statement delay stands in for the network round-trip to
+Postgres, so handlers spend their time waiting on the database the way
+they do in production.
+
+Usage:
+    python -m api.v1.benchmarks.concurrency [requests] [latency_ms]
+"""
+
+import asyncio
+import sys
+import time
+from time import perf_counter
+import httpx
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from api.v1.benchmarks.common import register_grantor
+from api.v1.configurations.database import THREADPOOL_SIZE, engine
+from api.v1.main import app, size_threadpool
+
+
+async def run_level(
+    client: httpx.AsyncClient, url: str, headers: dict,
+    requests: int, concurrency: int
+) -> float:
+    """Return requests per second at the given concurrency."""
+    queue = iter(range(requests))
+
+    async def worker():
+        for _ in queue:
+            res = await client.get(url, headers=headers)
+            assert res.status_code == 200, res.text
+
+    start = perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return requests / (perf_counter() - start)
+
+
+async def main(requests: int, latency_ms: float) -> None:
+    """Measure throughput at increasing concurrency."""
+    grantor = register_grantor(TestClient(app))
+    url = f"/api/v1/assets/grantor/{grantor['id']}/assets"
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def round_trip(*args):
+        """Simulate the database round-trip."""
+        time.sleep(latency_ms / 1000)
+
+    await size_threadpool()
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        print(f"threadpool={THREADPOOL_SIZE} db_latency={latency_ms}ms")
+        for concurrency in (1, 2, 4, 8, 16, 32):
+            rate = await run_level(
+                client, url, grantor["headers"], requests, concurrency
+            )
+            print(f"in-flight={concurrency:<4} {rate:10.1f} req/s")
+        event.remove(engine, "before_cursor_execute", round_trip)
+        await client.delete(
+            f"/api/v1/grantors/account/dashboard/{grantor['id']}/delete",
+            headers=grantor["headers"]
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 400,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    ))
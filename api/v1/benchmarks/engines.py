@@ -0,0 +1,125 @@
+#!/usr/bin/python3
+"""
+Compare the sync and async database engines under the same load.
+
+Every read route migrated to repository providers is driven with the
+same request mix and concurrency, once through the threadpool-backed
+sync repositories and once through the AsyncSession repositories.
+
+Usage:
+    python -m api.v1.benchmarks.engines [requests] [concurrency]
+"""
+
+import asyncio
+import sys
+from time import perf_counter
+from typing import List
+import httpx
+from fastapi.testclient import TestClient
+from api.v1.benchmarks.common import register_grantor, report
+from api.v1.main import app, size_threadpool
+from api.v1.repositories import providers
+from api.v1.repositories.assets import AssetRepository, AsyncAssetRepository
+from api.v1.repositories.beneficiaries import (
+    AsyncBeneficiaryRepo, BeneficiaryRepo
+)
+from api.v1.repositories.monetaries import (
+    AsyncMonetaryRepository, MonetaryRepository
+)
+from api.v1.repositories.trustees import (
+    AsyncTrusteeRepository, TrusteeRepository
+)
+
+REPOSITORIES = (
+    (providers.asset_repository, AssetRepository, AsyncAssetRepository),
+    (
+        providers.beneficiary_repository,
+        BeneficiaryRepo, AsyncBeneficiaryRepo
+    ),
+    (
+        providers.monetary_repository,
+        MonetaryRepository, AsyncMonetaryRepository
+    ),
+    (
+        providers.trustee_repository,
+        TrusteeRepository, AsyncTrusteeRepository
+    ),
+)
+
+
+def use_engine(name: str) -> None:
+    """Point every repository dependency at the named engine."""
+    for dependency, sync_repo, async_repo in REPOSITORIES:
+        app.dependency_overrides[dependency] = (
+            providers.async_provider(async_repo) if name == "async"
+            else providers.threaded_provider(sync_repo)
+        )
+
+
+async def load(
+    client: httpx.AsyncClient, urls: List[str], headers: dict,
+    requests: int, concurrency: int
+) -> List[float]:
+    """Issue the request mix and return per-request latencies."""
+    queue = iter(range(requests))
+    samples: List[float] = []
+
+    async def worker():
+        for index in queue:
+            start = perf_counter()
+            await client.get(urls[index % len(urls)], headers=headers)
+            samples.append(perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples
+
+
+async def main(requests: int, concurrency: int) -> None:
+    """Run the same load profile on both engines."""
+    sync_client = TestClient(app)
+    grantor = register_grantor(sync_client)
+    grantor_id, headers = grantor["id"], grantor["headers"]
+    sync_client.post(
+        f"/api/v1/beneficiaries/account/{grantor_id}/create/beneficiary",
+        headers=headers,
+        json={
+            "first_name": "Bench", "last_name": "Heir",
+            "middle_name": None, "relation": "son"
+        }
+    )
+    bene_id = sync_client.get(
+        f"/api/v1/beneficiaries/account/{grantor_id}/beneficiaries",
+        headers=headers
+    ).json()[0]["uuid_pk"]
+    urls = [
+        f"/api/v1/assets/grantor/{grantor_id}/assets",
+        f"/api/v1/assets/beneficiary/{bene_id}/assets",
+        f"/api/v1/monetaries/asset/grantor/{grantor_id}/assets",
+        f"/api/v1/beneficiaries/account/{grantor_id}/beneficiaries",
+        f"/api/v1/beneficiaries/account/{grantor_id}/beneficiaries/"
+        f"{bene_id}",
+    ]
+    await size_threadpool()
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        for name in ("sync", "async"):
+            use_engine(name)
+            await load(client, urls, headers, concurrency, concurrency)
+            start = perf_counter()
+            samples = await load(
+                client, urls, headers, requests, concurrency
+            )
+            elapsed = perf_counter() - start
+            report(f"{name} engine", samples)
+            print(f"{'':<28} {requests / elapsed:.1f} req/s")
+    app.dependency_overrides.clear()
+    sync_client.delete(
+        f"/api/v1/grantors/account/dashboard/{grantor_id}/delete",
+        headers=headers
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    ))
@@ -0,0 +1,81 @@
+#!/usr/bin/python3
+"""
+Bulk CSV import throughput.
+
+Builds a CSV of the requested number of assets for a fresh grantor and
+times importing it, then a monetary assets CSV of the same size. The
+grantor and everything imported are removed afterwards.
+
+Usage:
+    python -m api.v1.benchmarks.imports [rows]
+"""
+
+import csv
+import sys
+from io import StringIO
+from time import perf_counter
+from sqlalchemy import text
+from api.v1.configurations.database import session_local
+from api.v1.main import app  # noqa: F401 - brings the schema up to date
+from api.v1.repositories.imports import ImportRepository
+
+SEED = """
+WITH grantor AS (
+    INSERT INTO users (username, first_name, last_name, email,
+                       phone_number, password, date_of_birth, gender)
+    VALUES ('importbenc', 'Import', 'Bench', 'importbench@example.com',
+            '+9000000000001', 'unused', '2000-07-18', 'other')
+    RETURNING uuid_pk
+)
+INSERT INTO beneficiaries (first_name, last_name, relation, added_by)
+SELECT 'Heir', 'Bench', 'son', uuid_pk FROM grantor
+RETURNING added_by::text, uuid_pk::text
+"""
+
+
+def build_csv(header, row, rows: int) -> StringIO:
+    """Write rows copies of row, numbered, under the header."""
+    stream = StringIO(newline="")
+    writer = csv.writer(stream)
+    writer.writerow(header)
+    writer.writerows(row(i) for i in range(rows))
+    stream.seek(0)
+    return stream
+
+
+def run(rows: int = 100_000):
+    """Import rows assets, then rows monetary assets, from CSV."""
+    with session_local() as sess:
+        grantor, heir = sess.execute(text(SEED)).one()
+        sess.commit()
+        try:
+            for kind, header, row in (
+                ("assets", ("name", "location", "will_to", "note"),
+                 lambda i: (f"Plot {i}", "Onitsha", heir, "")),
+                ("monetaries", (
+                    "acc_name", "acc_number", "amount", "bank_name",
+                    "will_to", "note"
+                 ), lambda i: ("Savings", i, f"{i}.50", "Bank", heir, "")),
+            ):
+                stream = build_csv(header, row, rows)
+                start = perf_counter()
+                report = ImportRepository(sess).import_csv(
+                    grantor, kind, stream
+                )
+                elapsed = perf_counter() - start
+                assert report["imported"] == rows, report
+                print(
+                    f"{kind:<12} {rows} rows in {elapsed:6.2f}s "
+                    f"({rows / elapsed:,.0f} rows/s)"
+                )
+        finally:
+            sess.rollback()
+            sess.execute(
+                text("DELETE FROM users WHERE uuid_pk = :grantor"),
+                {"grantor": grantor}
+            )
+            sess.commit()
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:]))
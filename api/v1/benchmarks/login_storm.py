@@ -0,0 +1,82 @@
+#!/usr/bin/python3
+"""
+Unrelated GET latency while a burst of logins is being verified.
+
+Compares bcrypt run inline on the event loop (the previous behaviour)
+with the bounded password worker pool used by the login route.
+
+Usage:
+    python -m api.v1.benchmarks.login_storm [logins]
+"""
+
+import asyncio
+import sys
+from time import perf_counter
+from typing import Awaitable, Callable, List
+import httpx
+from fastapi.testclient import TestClient
+from api.v1.benchmarks.common import PASSWORD, register_grantor, report
+from api.v1.main import app
+from api.v1.utils.passwd import hash_pwd, password_service, verify_pwd
+
+
+async def probe(
+    client: httpx.AsyncClient, stop: asyncio.Event, samples: List[float]
+) -> None:
+    """Time GET / from when it was due until stop is set."""
+    while not stop.is_set():
+        due = perf_counter() + 0.005
+        await asyncio.sleep(0.005)
+        await client.get("/")
+        samples.append(perf_counter() - due)
+
+
+async def measure(
+    client: httpx.AsyncClient, storm: Callable[[], Awaitable]
+) -> List[float]:
+    """Run storm while probing the event loop."""
+    stop = asyncio.Event()
+    samples: List[float] = []
+    prober = asyncio.create_task(probe(client, stop, samples))
+    await asyncio.sleep(0.05)
+    await storm()
+    stop.set()
+    await prober
+    return samples
+
+
+async def main(logins: int) -> None:
+    """Run the idle, inline and pooled scenarios."""
+    grantor = register_grantor(TestClient(app))
+    hashed = hash_pwd(PASSWORD)
+
+    async def idle():
+        await asyncio.sleep(1)
+
+    async def inline():
+        async def one():
+            verify_pwd(PASSWORD, hashed)
+        await asyncio.gather(*(one() for _ in range(logins)))
+
+    async def pooled():
+        await asyncio.gather(*(
+            client.post("/api/v1/auths/account/login", json={
+                "username": grantor["username"],
+                "password": PASSWORD,
+                "account_type": "grantor"
+            }) for _ in range(logins)
+        ))
+
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        report("GET / idle", await measure(client, idle))
+        report(f"GET / {logins} inline bcrypt", await measure(client, inline))
+        report(f"GET / {logins} pooled logins", await measure(client, pooled))
+        await client.delete(
+            f"/api/v1/grantors/account/dashboard/{grantor['id']}/delete",
+            headers=grantor["headers"]
+        )
+    print(password_service.stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 16))
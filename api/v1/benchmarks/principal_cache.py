@@ -0,0 +1,40 @@
+#!/usr/bin/python3
+"""
+Authenticated request latency with the principal cache on and off.
+
+Usage:
+    python -m api.v1.benchmarks.principal_cache [requests]
+"""
+
+import sys
+from time import perf_counter
+from fastapi.testclient import TestClient
+from api.v1.authorizations.cache import principal_cache
+from api.v1.benchmarks.common import register_grantor, report
+from api.v1.main import app
+
+
+def run(requests: int = 500) -> None:
+    """Time the beneficiaries list route for both cache modes."""
+    client = TestClient(app)
+    grantor = register_grantor(client)
+    url = f"/api/v1/beneficiaries/account/{grantor['id']}/beneficiaries"
+    for enabled in (False, True):
+        principal_cache.clear()
+        principal_cache.enabled = enabled
+        client.get(url, headers=grantor["headers"])
+        samples = []
+        for _ in range(requests):
+            start = perf_counter()
+            client.get(url, headers=grantor["headers"])
+            samples.append(perf_counter() - start)
+        report(f"principal cache {'on' if enabled else 'off'}", samples)
+        print(f"{'':<28} {principal_cache.stats()}")
+    client.delete(
+        f"/api/v1/grantors/account/dashboard/{grantor['id']}/delete",
+        headers=grantor["headers"]
+    )
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,122 @@
+#!/usr/bin/python3
+"""
+Estate search latency over a large synthetic dataset.
+
+Seeds grantors whose assets and monetary assets add up to the requested
+row count, with names, locations, banks and notes drawn from a small
+vocabulary, then times searches of random grantors for common, rare,
+phrase and paged queries. Everything seeded is removed afterwards.
+
+Usage:
+    python -m api.v1.benchmarks.search [rows] [grantors] [searches]
+"""
+
+import random
+import sys
+from time import perf_counter
+from sqlalchemy import text
+from api.v1.benchmarks.common import report
+from api.v1.configurations.database import engine, session_local
+from api.v1.main import app  # noqa: F401 - brings the schema up to date
+from api.v1.repositories.search import SearchRepository
+
+WORDS = (
+    "lekki ikoyi enugu abuja onitsha kano ibadan warri duplex bungalow "
+    "farmland shop plaza warehouse car truck savings current domiciliary "
+    "rent lease inheritance gift family school church market estate"
+)
+QUERIES = {
+    "common word": "estate",
+    "rare pair": "warri warehouse",
+    "phrase": '"lekki duplex"',
+    "negation": "rent -lease",
+}
+
+SEED = """
+WITH grantors AS (
+    INSERT INTO users (username, first_name, last_name, email,
+                       phone_number, password, date_of_birth, gender)
+    SELECT 's' || lpad(g::text, 9, '0'), 'Search', 'Bench',
+           'searchbench' || g || '@example.com',
+           '+9' || lpad(g::text, 12, '0'), 'unused', '2000-07-18', 'other'
+    FROM generate_series(1, :grantors) AS g
+    RETURNING uuid_pk
+), heirs AS (
+    INSERT INTO beneficiaries (first_name, last_name, relation, added_by)
+    SELECT 'Heir', 'Bench', 'son', uuid_pk FROM grantors
+    RETURNING uuid_pk, added_by
+), words AS (
+    SELECT string_to_array(:words, ' ') AS w
+), assets AS (
+    INSERT INTO assets (name, location, note, owner_id, will_to)
+    SELECT w[1 + (i * 7) % n] || ' ' || w[1 + (i * 13) % n],
+           w[1 + (i * 3) % n],
+           w[1 + (i * 11) % n] || ' ' || w[1 + (i * 17) % n] || ' '
+               || w[1 + (i * 5) % n],
+           added_by, uuid_pk
+    FROM heirs, words, cardinality(w) AS n,
+         generate_series(1, :per_grantor) AS i
+)
+INSERT INTO monetaries (acc_name, acc_number, amount, bank_name, note,
+                        owner_id, will_to)
+SELECT w[1 + (i * 19) % n], i::text, i, w[1 + (i * 23) % n] || ' bank',
+       w[1 + (i * 29) % n] || ' ' || w[1 + (i * 31) % n],
+       added_by, uuid_pk
+FROM heirs, words, cardinality(w) AS n,
+     generate_series(1, :per_grantor) AS i
+"""
+
+
+def run(rows: int = 2_000_000, grantors: int = 2000, searches: int = 500):
+    """Seed rows assets and monetaries, then time estate searches."""
+    per_grantor = max(1, rows // grantors // 2)
+    with session_local() as sess:
+        start = perf_counter()
+        sess.execute(text("SET LOCAL statement_timeout = 0"))
+        sess.execute(text(SEED), {
+            "grantors": grantors, "per_grantor": per_grantor,
+            "words": WORDS
+        })
+        sess.commit()
+        # Set hint bits and the visibility map, as autovacuum would have
+        with engine.connect().execution_options(
+            isolation_level="AUTOCOMMIT"
+        ) as conn:
+            conn.execute(text("VACUUM ANALYZE assets, monetaries"))
+        print(
+            f"seeded {grantors * per_grantor * 2} rows for {grantors} "
+            f"grantors in {perf_counter() - start:.1f}s"
+        )
+        owners = sess.execute(text(
+            "SELECT uuid_pk::text FROM users "
+            "WHERE email LIKE 'searchbench%'"
+        )).scalars().all()
+        repo = SearchRepository(sess)
+        try:
+            for name, terms in QUERIES.items():
+                samples = []
+                for _ in range(searches):
+                    owner = random.choice(owners)
+                    start = perf_counter()
+                    repo.search_estate(owner, terms, limit=20)
+                    samples.append(perf_counter() - start)
+                report(name, samples)
+            samples = []
+            for _ in range(searches):
+                owner = random.choice(owners)
+                first = repo.search_estate(owner, "estate", limit=20)
+                after = (first[-1]["rank"], first[-1]["uuid_pk"])
+                start = perf_counter()
+                repo.search_estate(owner, "estate", after, limit=20)
+                samples.append(perf_counter() - start)
+            report("second page", samples)
+        finally:
+            sess.rollback()
+            sess.execute(text(
+                "DELETE FROM users WHERE email LIKE 'searchbench%'"
+            ))
+            sess.commit()
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:]))
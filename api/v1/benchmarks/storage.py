@@ -0,0 +1,94 @@
+#!/usr/bin/python3
+"""
+S3 document storage throughput.
+
+Stores a document of the requested size in a bucket and fetches it back,
+once per concurrency level, so the gain of sending and fetching its
+multipart parts several at a time shows. Runs against an in-process S3
+stand-in (moto) unless settings.S3_ENDPOINT_URL names a server, e.g. a
+local MinIO, in which case settings.AWS_BUCKET_NAME must exist there; the
+stored objects are removed afterwards. The stand-in shares the
+benchmark's interpreter, so it measures the transfer overhead on this
+host; the gain of concurrent parts shows against a real server.
+
+Usage:
+    python -m api.v1.benchmarks.storage [size_mb] [concurrency ...]
+"""
+
+import os
+import sys
+from contextlib import nullcontext
+from tempfile import TemporaryDirectory
+from time import perf_counter
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from api.v1.configurations.settings import settings
+from api.v1.utils.storage import S3Storage
+
+BUCKET = "estatetrust-bench"
+MIB = 1024 * 1024
+
+
+def connect(max_concurrency: int):
+    """Return an S3 client and bucket, and the stand-in to run it in."""
+    if settings.S3_ENDPOINT_URL:
+        bucket, stand_in = settings.AWS_BUCKET_NAME, nullcontext()
+    else:
+        from moto import mock_s3
+        bucket, stand_in = BUCKET, mock_s3()
+    stand_in.__enter__()
+    client = boto3.client(
+        "s3",
+        aws_access_key_id=settings.AWS_ACCESS_KEY or "bench",
+        aws_secret_access_key=settings.AWS_SECRET_KEY or "bench",
+        endpoint_url=settings.S3_ENDPOINT_URL,
+        region_name=settings.S3_REGION or "us-east-1",
+        config=Config(max_pool_connections=max_concurrency)
+    )
+    if not settings.S3_ENDPOINT_URL:
+        client.create_bucket(Bucket=bucket)
+    return client, bucket, stand_in
+
+
+def run(size_mb: int = 256, *concurrencies: int):
+    """Store and fetch a size_mb MiB document at each concurrency."""
+    concurrencies = concurrencies or (1, 4, 8)
+    client, bucket, stand_in = connect(max(concurrencies))
+    size = size_mb * MIB
+    try:
+        with TemporaryDirectory() as directory:
+            source = os.path.join(directory, "source")
+            with open(source, "wb") as f:
+                for _ in range(size_mb):
+                    f.write(os.urandom(MIB))
+            for concurrency in concurrencies:
+                s3 = S3Storage(client, bucket, TransferConfig(
+                    multipart_threshold=settings.S3_MULTIPART_THRESHOLD,
+                    multipart_chunksize=settings.S3_MULTIPART_CHUNK_SIZE,
+                    max_concurrency=concurrency
+                ))
+                key = f"bench/{concurrency}"
+                upload = os.path.join(directory, "upload")
+                os.link(source, upload)
+                start = perf_counter()
+                s3.store(upload, key)
+                stored = perf_counter() - start
+                fetched = os.path.join(directory, "fetched")
+                start = perf_counter()
+                s3.fetch(key, fetched)
+                elapsed = perf_counter() - start
+                assert os.path.getsize(fetched) == size
+                os.unlink(fetched)
+                s3.remove(key)
+                print(
+                    f"{size_mb} MiB, {concurrency:2} parts at a time: "
+                    f"store {size_mb / stored:7,.0f} MiB/s, "
+                    f"fetch {size_mb / elapsed:7,.0f} MiB/s"
+                )
+    finally:
+        stand_in.__exit__(None, None, None)
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:]))
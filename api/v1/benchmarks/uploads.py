@@ -0,0 +1,134 @@
+#!/usr/bin/python3
+"""
+Streamed document upload throughput and memory.
+
+Uploads distinct documents of the requested size to one asset, several
+at once, through the ASGI app, the request bodies generated a block at a
+time so only the server holds what it buffers. Reports the throughput and
+how far the peak resident memory grew, which should stay near a few
+settings.DOCUMENT_CHUNK_SIZE however large the documents are. Documents
+go to a temporary directory; the grantor and its blobs are removed
+afterwards.
+
+Usage:
+    python -m api.v1.benchmarks.uploads [size_mb] [uploads] [concurrency]
+"""
+
+import asyncio
+import resource
+import sys
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import List, Tuple
+import httpx
+from sqlalchemy import text
+from api.v1.authorizations.oauth import create_token
+from api.v1.configurations.database import session_local
+from api.v1.main import app
+from api.v1.repositories.documents import DocumentRepository
+from api.v1.utils import documents
+
+SEED = """
+WITH grantor AS (
+    INSERT INTO users (username, first_name, last_name, email,
+                       phone_number, password, date_of_birth, gender)
+    VALUES ('uploadbenc', 'Upload', 'Bench', 'uploadbench@example.com',
+            '+9000000000002', 'unused', '2000-07-18', 'other')
+    RETURNING uuid_pk
+), heir AS (
+    INSERT INTO beneficiaries (first_name, last_name, relation, added_by)
+    SELECT 'Heir', 'Bench', 'son', uuid_pk FROM grantor
+    RETURNING uuid_pk, added_by
+)
+INSERT INTO assets (name, location, note, owner_id, will_to)
+SELECT 'Plot 1', 'Onitsha', '', added_by, uuid_pk FROM heir
+RETURNING owner_id::text, uuid_pk::text
+"""
+BOUNDARY = "uploadbenchboundary"
+BLOCK = b"%PDF" * 16 * 1024
+
+
+async def body(size: int, number: int):
+    """Generate a multipart body around a distinct size byte document."""
+    yield (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="file"; '
+        'filename="scan.pdf"\r\n'
+        "Content-Type: application/pdf\r\n\r\n"
+    ).encode()
+    yield number.to_bytes(len(BLOCK), "big")
+    for _ in range(size // len(BLOCK) - 1):
+        yield BLOCK
+    yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def peak_rss_mb() -> float:
+    """Return the peak resident memory of the process in MiB."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def upload_all(
+    url: str, headers: dict, size: int, uploads: int, concurrency: int
+) -> Tuple[float, List[str]]:
+    """Return the seconds taken to upload every document, and their hashes."""
+    queue = iter(range(uploads))
+    sha256s = []
+    headers = {
+        **headers,
+        "Content-Type": f"multipart/form-data; boundary={BOUNDARY}"
+    }
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+
+        async def worker():
+            for number in queue:
+                res = await client.put(
+                    url, headers=headers, content=body(size, number)
+                )
+                assert res.status_code == 200, res.text
+                assert res.json()["size"] == size
+                sha256s.append(res.json()["sha256"])
+
+        start = perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return perf_counter() - start, sha256s
+
+
+def run(size_mb: int = 64, uploads: int = 16, concurrency: int = 4):
+    """Upload documents of size_mb MiB, concurrency at a time."""
+    size = size_mb * 1024 * 1024
+    with session_local() as sess:
+        grantor, asset = sess.execute(text(SEED)).one()
+        sess.commit()
+    headers = {"Authorization": "Bearer {}".format(create_token(data={
+        "uuid_pk": grantor, "username": "uploadbenc",
+        "account_type": "grantor"
+    }))}
+    url = f"/api/v1/assets/{grantor}/assets/{asset}/document"
+    sha256s = []
+    try:
+        with TemporaryDirectory() as directory:
+            documents.UPLOAD_DIR = directory
+            before = peak_rss_mb()
+            elapsed, sha256s = asyncio.run(
+                upload_all(url, headers, size, uploads, concurrency)
+            )
+            print(
+                f"{uploads} x {size_mb} MiB, {concurrency} at a time, in "
+                f"{elapsed:6.2f}s ({uploads * size_mb / elapsed:,.0f} MiB/s)"
+            )
+            print(f"peak RSS grew {peak_rss_mb() - before:,.1f} MiB")
+    finally:
+        with session_local() as sess:
+            sess.execute(
+                text("DELETE FROM users WHERE uuid_pk = :grantor"),
+                {"grantor": grantor}
+            )
+            sess.commit()
+            DocumentRepository(sess).sweep_blobs(sha256s)
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:]))
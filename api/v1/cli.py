@@ -0,0 +1,133 @@
+#!/usr/bin/python3
+"""
+Maintenance commands for Estate Trust.
+
+Usage:
+    python -m api.v1.cli migrate
+    python -m api.v1.cli summary check
+    python -m api.v1.cli summary rebuild
+    python -m api.v1.cli import {assets,monetaries,beneficiaries} GRANTOR FILE
+    python -m api.v1.cli documents backfill [--directory DIR]
+    python -m api.v1.cli documents gc
+"""
+
+import argparse
+import json
+import sys
+from typing import List
+from uuid import UUID
+from sqlalchemy.exc import DBAPIError
+from api.v1.configurations.database import session_local
+from api.v1.configurations.migrations import upgrade
+from api.v1.repositories.documents import (
+    DocumentRepository, backfill_documents
+)
+from api.v1.repositories.imports import IMPORTS, ImportRepository
+from api.v1.repositories.summaries import check_summaries, rebuild_summaries
+from api.v1.utils.documents import UPLOAD_DIR
+
+
+def migrate(args: argparse.Namespace) -> int:
+    """Create, migrate and index the schema before the application runs."""
+    try:
+        upgrade()
+    except DBAPIError as exc:
+        # A migration refusing to guess, e.g. at an unreadable amount
+        print(exc.orig, file=sys.stderr)
+        return 1
+    print("database up to date", file=sys.stderr)
+    return 0
+
+
+def summary(args: argparse.Namespace) -> int:
+    """Report estate summary drift, rebuilding the table if asked to."""
+    with session_local() as sess:
+        if args.action == "rebuild":
+            drift = rebuild_summaries(sess)
+        else:
+            drift = check_summaries(sess)
+    for entry in drift:
+        print(json.dumps(entry, default=str))
+    print(f"{len(drift)} estate summaries drifted", file=sys.stderr)
+    if args.action == "rebuild":
+        return 0
+    return 1 if drift else 0
+
+
+def import_csv(args: argparse.Namespace) -> int:
+    """Import a CSV file for a grantor, printing the report."""
+    with open(args.file, newline="", encoding="utf-8-sig") as stream:
+        with session_local() as sess:
+            report = ImportRepository(sess).import_csv(
+                str(args.grantor), args.kind, stream
+            )
+    print(json.dumps(report))
+    print(
+        f"{report['imported']} rows imported, {report['invalid']} invalid",
+        file=sys.stderr
+    )
+    return 1 if report["invalid"] else 0
+
+
+def documents(args: argparse.Namespace) -> int:
+    """Index the stored documents, or remove the unreferenced ones."""
+    with session_local() as sess:
+        if args.action == "gc":
+            removed = DocumentRepository(sess).sweep_blobs()
+        else:
+            report = backfill_documents(sess, args.directory)
+    if args.action == "gc":
+        for key in removed:
+            print(key)
+        print(f"{len(removed)} unreferenced files removed", file=sys.stderr)
+        return 0
+    for key in report["unattributed"]:
+        print(key)
+    print(
+        f"{report['scanned']} files scanned, {report['indexed']} indexed, "
+        f"{len(report['unattributed'])} unattributed",
+        file=sys.stderr
+    )
+    return 0
+
+
+def parser() -> argparse.ArgumentParser:
+    """Build the command line parser."""
+    cli = argparse.ArgumentParser(prog="python -m api.v1.cli")
+    commands = cli.add_subparsers(dest="command", required=True)
+    migrate_cmd = commands.add_parser(
+        "migrate", help="bring the database schema up to the models"
+    )
+    migrate_cmd.set_defaults(run=migrate)
+    summary_cmd = commands.add_parser(
+        "summary", help="check or rebuild the estate summary table"
+    )
+    summary_cmd.add_argument("action", choices=("check", "rebuild"))
+    summary_cmd.set_defaults(run=summary)
+    import_cmd = commands.add_parser(
+        "import", help="import a grantor's rows from a CSV file"
+    )
+    import_cmd.add_argument("kind", choices=tuple(IMPORTS))
+    import_cmd.add_argument("grantor", type=UUID, help="the grantor uuid_pk")
+    import_cmd.add_argument("file", help="the CSV file, header first")
+    import_cmd.set_defaults(run=import_csv)
+    documents_cmd = commands.add_parser(
+        "documents",
+        help="index the upload directory or remove unreferenced files"
+    )
+    documents_cmd.add_argument("action", choices=("backfill", "gc"))
+    documents_cmd.add_argument(
+        "--directory", default=UPLOAD_DIR, help="the upload directory"
+    )
+    documents_cmd.set_defaults(run=documents)
+    return cli
+
+
+def main(argv: List[str] = None) -> int:
+    """Run the command given on the command line."""
+    args = parser().parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,21 +1,205 @@
 #!/usr/bin/python3
 """User database configurations."""
-from sqlalchemy import create_engine
+from fastapi import Request
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from .pool import TimedAsyncQueuePool, TimedQueuePool
+from .routing import READ_METHODS, ReadRouter
 from .settings import settings
 
 PASSW: str = settings.DB_USER_PASSW
 DB_NAME: str = settings.DB_NAME
-SQLALCHEMY_DATABASE_URL: str = f"postgresql://{PASSW}@localhost/{DB_NAME}"
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+DB_HOST: str = f"{settings.DB_HOST}:{settings.DB_PORT}"
+SQLALCHEMY_DATABASE_URL: str = f"postgresql://{PASSW}@{DB_HOST}/{DB_NAME}"
+ASYNC_SQLALCHEMY_DATABASE_URL: str = (
+    f"postgresql+asyncpg://{PASSW}@{DB_HOST}/{DB_NAME}"
+)
+POOL_OPTIONS: dict = {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_timeout": settings.DB_POOL_TIMEOUT,
+    "pool_recycle": settings.DB_POOL_RECYCLE,
+    "pool_pre_ping": settings.DB_POOL_PRE_PING,
+}
+CONNECT_ARGS: dict = {
+    "options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT}"
+}
+ASYNC_CONNECT_ARGS: dict = {
+    "server_settings": {
+        "statement_timeout": str(settings.DB_STATEMENT_TIMEOUT)
+    }
+}
+# Zero while the replica has replayed everything it received; NULL
+# (reported as zero) when pointed at a primary standing in for one.
+REPLICA_LAG_QUERY = text(
+    "SELECT COALESCE(CASE WHEN pg_last_wal_receive_lsn() = "
+    "pg_last_wal_replay_lsn() THEN 0 ELSE EXTRACT(EPOCH FROM now() - "
+    "pg_last_xact_replay_timestamp()) END, 0)"
+)
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    poolclass=TimedQueuePool,
+    connect_args=CONNECT_ARGS,
+    **POOL_OPTIONS
+)
+# Sync handlers run on the anyio threadpool; one thread per pooled
+# connection keeps requests from queueing on threads they cannot use.
+THREADPOOL_SIZE: int = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
 session_local = sessionmaker(autoflush=False, autocommit=False, bind=engine)
+# The async engine serves routes when settings.DB_ENGINE is "async".
+# Objects must stay readable after commit since they cannot lazy load.
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    poolclass=TimedAsyncQueuePool,
+    connect_args=ASYNC_CONNECT_ARGS,
+    **POOL_OPTIONS
+)
+async_session_local = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+replica_engine = None
+replica_session_local = None
+async_replica_session_local = None
+if settings.DB_REPLICA_HOST:
+    REPLICA_HOST: str = (
+        f"{settings.DB_REPLICA_HOST}:{settings.DB_REPLICA_PORT}"
+    )
+    replica_engine = create_engine(
+        f"postgresql://{PASSW}@{REPLICA_HOST}/{DB_NAME}",
+        poolclass=TimedQueuePool,
+        connect_args=CONNECT_ARGS,
+        **POOL_OPTIONS
+    )
+    replica_session_local = sessionmaker(
+        autoflush=False, autocommit=False, bind=replica_engine
+    )
+    async_replica_session_local = async_sessionmaker(
+        bind=create_async_engine(
+            f"postgresql+asyncpg://{PASSW}@{REPLICA_HOST}/{DB_NAME}",
+            poolclass=TimedAsyncQueuePool,
+            connect_args=ASYNC_CONNECT_ARGS,
+            **POOL_OPTIONS
+        ),
+        autoflush=False, expire_on_commit=False
+    )
+
+
+def replica_lag() -> float:
+    """Measure how far the replica is behind the primary, in seconds."""
+    with replica_engine.connect() as conn:
+        return float(conn.execute(REPLICA_LAG_QUERY).scalar())
+
+
+read_router = ReadRouter(
+    sticky_seconds=settings.DB_READ_STICKY_SECONDS,
+    max_lag=settings.DB_REPLICA_MAX_LAG,
+    lag_check_interval=settings.DB_REPLICA_LAG_CHECK_INTERVAL,
+    probe=replica_lag if replica_engine is not None else None
+)
 Base = declarative_base()
 
 
-def get_db():
-    """Get the database."""
-    db = session_local()
+def route_session(request: Request, replica, primary):
+    """Pick the session factory for the request."""
+    key = read_router.key(request)
+    if request.method not in READ_METHODS:
+        read_router.mark_write(key)
+        return primary
+    if replica is not None and read_router.use_replica(
+        key, read_router.pinned(request)
+    ):
+        return replica
+    return primary
+
+
+def get_db(request: Request):
+    """Get the database, reading from the replica when it is safe to."""
+    db = route_session(request, replica_session_local, session_local)()
     try:
         yield db
     finally:
         db.close()
+
+
+async def route_async_session(request: Request, replica, primary):
+    """Pick the async session factory, probing the lag off the loop."""
+    key = read_router.key(request)
+    if request.method not in READ_METHODS:
+        read_router.mark_write(key)
+        return primary
+    if replica is not None and await read_router.use_replica_async(
+        key, read_router.pinned(request)
+    ):
+        return replica
+    return primary
+
+
+async def get_async_db(request: Request):
+    """Get the async database, reading from the replica when safe to."""
+    factory = await route_async_session(
+        request, async_replica_session_local, async_session_local
+    )
+    async with factory() as db:
+        yield db
+
+
+def ensure_indexes(bind=engine) -> None:
+    """
+    Create the model indexes an existing database does not have yet.
+
+    create_all only creates missing tables, so indexes added to tables
+    that already exist are created here, skipping those present. Each is
+    built CONCURRENTLY, outside a transaction, so the table stays
+    writable meanwhile; one left invalid by an interrupted build is
+    dropped and built again.
+    """
+    with bind.connect().execution_options(
+        isolation_level="AUTOCOMMIT"
+    ) as conn:
+        invalid = set(conn.execute(text(
+            "SELECT indexrelid::regclass::text FROM pg_index "
+            "WHERE NOT indisvalid"
+        )).scalars())
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                if index.name in invalid:
+                    conn.execute(text(
+                        f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'
+                    ))
+                # Only for this build: create_all runs in a transaction
+                options = index.dialect_options["postgresql"]
+                concurrently = options["concurrently"]
+                options["concurrently"] = True
+                try:
+                    index.create(bind=conn, checkfirst=True)
+                finally:
+                    options["concurrently"] = concurrently
+
+
+def warm_pool(connections: int = settings.DB_POOL_WARMUP) -> None:
+    """Open connections up front so early requests skip the handshake."""
+    for bind in filter(None, (engine, replica_engine)):
+        conns = [bind.connect() for _ in range(connections)]
+        for conn in conns:
+            conn.close()
+
+
+async def warm_async_pool(connections: int = settings.DB_POOL_WARMUP) -> None:
+    """Open async connections up front so early requests skip it too."""
+    conns = [await async_engine.connect() for _ in range(connections)]
+    for conn in conns:
+        await conn.close()
+
+
+def pool_stats() -> dict:
+    """Return occupancy and checkout wait counters for every engine."""
+    stats = {
+        "sync": engine.pool.snapshot(),
+        "async": async_engine.pool.snapshot(),
+    }
+    if replica_engine is not None:
+        stats["replica"] = replica_engine.pool.snapshot()
+    return stats
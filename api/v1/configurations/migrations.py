@@ -0,0 +1,201 @@
+#!/usr/bin/python3
+"""In-place schema migrations for existing Estate Trust databases."""
+
+import re
+from hashlib import sha256
+from typing import Tuple
+from sqlalchemy import Executable, text
+from api.v1.models.data.assets import ASSET_SEARCH, MONETARY_SEARCH
+from api.v1.models.data.documents import BLOB_FUNCTION, BLOB_TRIGGERS
+from api.v1.models.data.summaries import SUMMARY_FUNCTIONS, summary_triggers
+from api.v1.repositories.summaries import fill_statement
+from .database import Base, engine, ensure_indexes
+from .settings import settings
+
+# The digits and dots of a legacy text amount, read as a decimal that
+# fits NUMERIC(18, 2) or as whole units grouped by dots ("1.250.000"),
+# NULL for anything else.
+AMOUNT_DIGITS = "regexp_replace(amount, '[^0-9.]', '', 'g')"
+LEGACY_AMOUNT = f"""
+    CASE
+        WHEN {AMOUNT_DIGITS} ~ '^[0-9]{{1,15}}(\\.[0-9]*)?$'
+        THEN {AMOUNT_DIGITS}::NUMERIC
+        WHEN {AMOUNT_DIGITS} ~ '^[0-9]{{1,3}}(\\.[0-9]{{3}}){{2,4}}$'
+        THEN replace({AMOUNT_DIGITS}, '.', '')::NUMERIC
+    END
+"""
+
+# Each migration is idempotent: it checks the catalog before changing
+# anything, so the whole list runs on every upgrade and a fresh database
+# created by create_all passes through untouched.
+MIGRATIONS: Tuple[str | Executable, ...] = (
+    # Monetary amounts were free text such as "$300,000.00" or "NGN 5000".
+    # Keep a written currency code, or USD for a dollar sign, and the
+    # digits as an exact NUMERIC. An amount that cannot be read is not
+    # guessed at: the migration stops, listing the rows to correct first.
+    f"""
+    DO $$
+    DECLARE
+        unreadable BIGINT;
+        listed TEXT;
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'monetaries' AND column_name = 'currency'
+        ) THEN
+            ALTER TABLE monetaries ADD COLUMN currency VARCHAR(3)
+                NOT NULL DEFAULT '{settings.DEFAULT_CURRENCY}';
+        END IF;
+        IF (
+            SELECT data_type FROM information_schema.columns
+            WHERE table_name = 'monetaries' AND column_name = 'amount'
+        ) <> 'numeric' THEN
+            SELECT count(*), string_agg(
+                format('%s: %L', uuid_pk, amount), E'\n' ORDER BY uuid_pk
+            ) FILTER (WHERE number <= 50)
+            INTO unreadable, listed
+            FROM (
+                SELECT uuid_pk, amount, row_number() OVER () AS number
+                FROM monetaries WHERE ({LEGACY_AMOUNT}) IS NULL
+            ) AS legacy;
+            IF unreadable > 0 THEN
+                RAISE EXCEPTION '% monetary amounts cannot be read',
+                    unreadable
+                USING DETAIL = listed,
+                    HINT = 'Set each amount to digits, e.g. 1250000.00, '
+                        'then migrate again.';
+            END IF;
+            UPDATE monetaries SET currency = COALESCE(
+                substring(upper(amount) from '[A-Z]{{3}}'),
+                CASE WHEN amount LIKE '%$%' THEN 'USD' END,
+                currency
+            );
+            ALTER TABLE monetaries ALTER COLUMN amount TYPE NUMERIC(18, 2)
+                USING {LEGACY_AMOUNT};
+        END IF;
+    END
+    $$
+    """,
+    # Full-text search vectors, generated from the searched columns.
+    f"""
+    ALTER TABLE assets ADD COLUMN IF NOT EXISTS search TSVECTOR NOT NULL
+        GENERATED ALWAYS AS ({ASSET_SEARCH}) STORED
+    """,
+    f"""
+    ALTER TABLE monetaries ADD COLUMN IF NOT EXISTS search TSVECTOR NOT NULL
+        GENERATED ALWAYS AS ({MONETARY_SEARCH}) STORED
+    """,
+    # Documents became references to shared, content-addressed blobs: a
+    # storage key is no longer unique and a document goes with its parent.
+    """
+    DROP INDEX IF EXISTS ix_documents_storage_key, ix_documents_owner
+    """,
+    """
+    DO $$
+    DECLARE
+        parent TEXT[];
+    BEGIN
+        FOREACH parent SLICE 1 IN ARRAY ARRAY[
+            ['asset', 'assets'], ['monetary', 'monetaries']
+        ] LOOP
+            IF EXISTS (
+                SELECT 1 FROM pg_constraint
+                WHERE conname = format('documents_%s_id_fkey', parent[1])
+                AND confdeltype <> 'c'
+            ) THEN
+                EXECUTE format(
+                    'ALTER TABLE documents '
+                    'DROP CONSTRAINT documents_%1$s_id_fkey, '
+                    'ADD CONSTRAINT documents_%1$s_id_fkey '
+                    'FOREIGN KEY (%1$s_id) REFERENCES %2$I (uuid_pk) '
+                    'ON DELETE CASCADE',
+                    parent[1], parent[2]
+                );
+            END IF;
+        END LOOP;
+    END
+    $$
+    """,
+    # Count the references of the documents recorded before the blobs.
+    """
+    INSERT INTO document_blobs (sha256, storage_key, size, ref_count)
+    SELECT sha256, min(storage_key), max(size), count(*) FROM documents
+    WHERE NOT EXISTS (
+        SELECT 1 FROM document_blobs WHERE sha256 = documents.sha256
+    )
+    GROUP BY sha256
+    """,
+    # The triggers only update existing summary rows: count the estates
+    # of the grantors created before the summary table.
+    fill_statement(missing_only=True),
+)
+# The triggers of the estate summary and the document blobs, by the
+# function marking the installed version, installed once the migrations
+# have brought the tables up to the models: they read columns, such as the
+# NUMERIC monetary amount, that a migration above may still be converting.
+TRIGGERS: Tuple[Tuple[str, str], ...] = (
+    ("estate_summary_apply", SUMMARY_FUNCTIONS + summary_triggers()),
+    ("document_blobs_apply", BLOB_FUNCTION + BLOB_TRIGGERS),
+)
+# Serializes concurrent runs of the migrations, e.g. from several
+# containers starting at once.
+MIGRATION_LOCK = 0x657374617465
+
+
+def trigger_version(ddl: str) -> str:
+    """Identify a version of trigger DDL."""
+    return sha256(ddl.encode()).hexdigest()[:16]
+
+
+def install_triggers(conn) -> None:
+    """
+    Install the triggers whose version differs, or that are missing.
+
+    Dropping and creating a trigger locks its table, so triggers already
+    in place at the current version are left alone.
+    """
+    for function, ddl in TRIGGERS:
+        version = trigger_version(ddl)
+        installed, triggers = conn.execute(text(
+            "SELECT obj_description(to_regproc(:function), 'pg_proc'), "
+            "(SELECT count(*) FROM pg_trigger t JOIN pg_proc p "
+            "ON p.oid = t.tgfoid WHERE NOT t.tgisinternal "
+            "AND p.proname = ANY(:functions))"
+        ), {
+            "function": function,
+            "functions": re.findall(r"FUNCTION (\w+)\(\)", ddl)
+        }).one()
+        if installed == version and triggers == ddl.count("CREATE TRIGGER"):
+            continue
+        conn.execute(text(ddl))
+        conn.execute(text(f"COMMENT ON FUNCTION {function} IS '{version}'"))
+
+
+def apply_migrations(conn) -> None:
+    """Run every migration, in order, then install the triggers."""
+    conn.execute(text("SELECT pg_advisory_xact_lock(:lock)"), {
+        "lock": MIGRATION_LOCK
+    })
+    for migration in MIGRATIONS:
+        if isinstance(migration, str):
+            migration = text(migration)
+        conn.execute(migration)
+    install_triggers(conn)
+
+
+def migrate(bind=engine) -> None:
+    """Bring an existing database up to the current models."""
+    with bind.begin() as conn:
+        apply_migrations(conn)
+
+
+def upgrade(bind=engine) -> None:
+    """
+    Bring the database up to the models, before the application starts.
+
+    Creates the missing tables, migrates the existing ones, then builds
+    the missing indexes concurrently.
+    """
+    Base.metadata.create_all(bind=bind)
+    migrate(bind=bind)
+    ensure_indexes(bind=bind)
@@ -0,0 +1,87 @@
+#!/usr/bin/python3
+"""Connection pools that record checkout wait times."""
+
+from threading import Lock
+from time import perf_counter
+from typing import Dict
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolStats:
+    """Checkout wait counters for one connection pool."""
+
+    def __init__(self) -> None:
+        """Initialize the counters."""
+        self._lock = Lock()
+        self.waits: int = 0
+        self.timeouts: int = 0
+        self.wait_total: float = 0.0
+        self.wait_max: float = 0.0
+
+    def record(self, waited: float, timed_out: bool = False) -> None:
+        """Record one checkout."""
+        with self._lock:
+            self.waits += 1
+            self.timeouts += int(timed_out)
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def snapshot(self) -> Dict[str, int | float]:
+        """Return the wait counters."""
+        with self._lock:
+            return {
+                "checkouts": self.waits,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": (
+                    self.wait_total / self.waits * 1000
+                    if self.waits else 0.0
+                ),
+                "wait_max_ms": self.wait_max * 1000,
+            }
+
+
+class TimedPoolMixin:
+    """Time every checkout of a queue pool."""
+
+    stats: PoolStats
+
+    def __init__(self, *args, **kwargs) -> None:
+        """Initialize the pool with its own counters."""
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        """Check out a connection, recording how long it took."""
+        start = perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record(perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record(perf_counter() - start)
+        return conn
+
+    def recreate(self):
+        """Recreate the pool, keeping the counters."""
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def snapshot(self) -> Dict[str, int | float]:
+        """Return occupancy and wait counters."""
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": max(self.overflow(), 0),
+            **self.stats.snapshot(),
+        }
+
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    """QueuePool that records checkout wait times."""
+
+
+class TimedAsyncQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records checkout wait times."""
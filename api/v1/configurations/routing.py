@@ -0,0 +1,242 @@
+#!/usr/bin/python3
+"""Read-replica routing with read-your-writes stickiness."""
+
+from collections import OrderedDict
+from hashlib import sha256
+from math import ceil
+from threading import Lock
+from time import monotonic, time
+from typing import Callable, Dict, Optional
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Returns the replica lag in seconds, raising if the replica is down.
+LagProbe = Callable[[], float]
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+# Carries the end of a writer's sticky window, as a Unix time, to every
+# worker process the client's next requests reach.
+STICKY_COOKIE = "primary_until"
+# The wall clock difference tolerated between the workers' hosts.
+CLOCK_SKEW = 1.0
+
+
+class ReadRouter:
+    """
+    Decide whether a read may be served by the replica.
+
+    A caller who wrote is pinned to the primary for the sticky window,
+    by this process and, through the STICKY_COOKIE set by PinWrites, by
+    every other worker process.
+    """
+
+    def __init__(
+        self, sticky_seconds: float, max_lag: float,
+        lag_check_interval: float, probe: Optional[LagProbe] = None,
+        max_sticky: int = 10000, clock: Callable[[], float] = monotonic,
+        wall_clock: Callable[[], float] = time
+    ) -> None:
+        """Initialize the router."""
+        self.sticky_seconds: float = sticky_seconds
+        self.max_lag: float = max_lag
+        self.lag_check_interval: float = lag_check_interval
+        self.probe: Optional[LagProbe] = probe
+        self.max_sticky: int = max_sticky
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self._sticky: OrderedDict[str, float] = OrderedDict()
+        self._lock = Lock()
+        self.lag: Optional[float] = None
+        self._lag_checked_at: Optional[float] = None
+        self._probing: bool = False
+        self.replica_reads: int = 0
+        self.primary_reads: int = 0
+
+    @staticmethod
+    def key(request: Request) -> Optional[str]:
+        """Identify the caller by a digest of their credentials."""
+        credentials = (
+            request.headers.get("Authorization")
+            or request.cookies.get("Authorization")
+        )
+        if not credentials:
+            return None
+        return sha256(credentials.encode()).hexdigest()
+
+    def mark_write(self, key: Optional[str]) -> None:
+        """Pin the caller to the primary for the sticky window."""
+        if key is None:
+            return
+        with self._lock:
+            self._sticky[key] = self.clock() + self.sticky_seconds
+            self._sticky.move_to_end(key)
+            while len(self._sticky) > self.max_sticky:
+                self._sticky.popitem(last=False)
+
+    def pin_cookie(self) -> str:
+        """Build the Set-Cookie value pinning a writer to the primary."""
+        until = self.wall_clock() + self.sticky_seconds
+        return (
+            f"{STICKY_COOKIE}={until:.3f}; Max-Age="
+            f"{ceil(self.sticky_seconds)}; Path=/; HttpOnly; SameSite=lax"
+        )
+
+    def pinned(self, request: Request) -> bool:
+        """
+        Return True if the request carries a current pin cookie.
+
+        A pin further ahead than the sticky window, give or take
+        CLOCK_SKEW, is ignored, so a client cannot keep itself off the
+        replica.
+        """
+        try:
+            until = float(request.cookies.get(STICKY_COOKIE, ""))
+        except ValueError:
+            return False
+        now = self.wall_clock()
+        return now < until <= now + self.sticky_seconds + CLOCK_SKEW
+
+    def _is_sticky(self, key: Optional[str]) -> bool:
+        """Return True if the caller wrote within the sticky window."""
+        if key is None:
+            return False
+        with self._lock:
+            expires_at = self._sticky.get(key)
+            if expires_at is None:
+                return False
+            if expires_at <= self.clock():
+                del self._sticky[key]
+                return False
+            return True
+
+    def _claim_probe(self) -> bool:
+        """
+        Claim the lag refresh if one is due and none is in flight.
+
+        Callers that do not get the claim keep using the last measured
+        lag, so a slow replica delays at most one request per interval.
+        """
+        with self._lock:
+            if self.probe is None or self._probing:
+                return False
+            now = self.clock()
+            if (
+                self._lag_checked_at is not None
+                and now - self._lag_checked_at < self.lag_check_interval
+            ):
+                return False
+            self._lag_checked_at = now
+            self._probing = True
+            return True
+
+    def _refresh_lag(self) -> None:
+        """Run the claimed probe and record the replica lag."""
+        lag = None
+        try:
+            lag = self.probe()
+        except SQLAlchemyError:
+            pass
+        finally:
+            with self._lock:
+                self.lag = lag
+                self._probing = False
+
+    def _count(self, replica: bool) -> bool:
+        """Count a read routed to the replica or the primary."""
+        with self._lock:
+            if replica:
+                self.replica_reads += 1
+            else:
+                self.primary_reads += 1
+        return replica
+
+    def _replica_fresh(self) -> bool:
+        """Return True if the replica's last measured lag is acceptable."""
+        lag = self.lag
+        return lag is not None and lag <= self.max_lag
+
+    def use_replica(self, key: Optional[str], pinned: bool = False) -> bool:
+        """
+        Decide where a read for the given caller goes.
+
+        The lag probe runs on the calling thread when due: this is the
+        path of the sync handlers, already off the event loop.
+
+        Args:
+            key (str): The caller key from ReadRouter.key
+            pinned (bool): The request carries a pin, see pinned
+        Returns:
+            True if the replica may serve the read, False otherwise
+        """
+        if pinned or self._is_sticky(key):
+            return self._count(False)
+        if self._claim_probe():
+            self._refresh_lag()
+        return self._count(self._replica_fresh())
+
+    async def use_replica_async(
+        self, key: Optional[str], pinned: bool = False
+    ) -> bool:
+        """
+        Decide where a read for the given caller goes, from the loop.
+
+        The lag probe, a blocking round-trip to the replica, runs on the
+        threadpool when due.
+
+        Args:
+            key (str): The caller key from ReadRouter.key
+            pinned (bool): The request carries a pin, see pinned
+        Returns:
+            True if the replica may serve the read, False otherwise
+        """
+        if pinned or self._is_sticky(key):
+            return self._count(False)
+        if self._claim_probe():
+            await run_in_threadpool(self._refresh_lag)
+        return self._count(self._replica_fresh())
+
+    def stats(self) -> Dict[str, int | float | None]:
+        """Return routing counters."""
+        with self._lock:
+            return {
+                "replica_reads": self.replica_reads,
+                "primary_reads": self.primary_reads,
+                "sticky_callers": len(self._sticky),
+                "replica_lag_seconds": self.lag,
+            }
+
+
+class PinWrites:
+    """
+    ASGI middleware pinning writers to the primary across processes.
+
+    Successful writes answer with the pin cookie of the router, so the
+    client's reads in the sticky window go to the primary whichever
+    worker serves them.
+    """
+
+    def __init__(self, app: ASGIApp, router: ReadRouter) -> None:
+        """Wrap app, pinning with router's sticky window."""
+        self.app = app
+        self.router = router
+
+    async def __call__(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        """Add the pin cookie to the response of a successful write."""
+        if scope["type"] != "http" or scope["method"] in READ_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def pin(message: Message) -> None:
+            """Send message, pinning the writer if the write succeeded."""
+            if message["type"] == "http.response.start" \
+                    and message["status"] < 400:
+                MutableHeaders(scope=message).append(
+                    "set-cookie", self.router.pin_cookie()
+                )
+            await send(message)
+
+        await self.app(scope, receive, pin)
@@ -1,6 +1,7 @@
 #!/usr/bin/python3
 """Base settings for EstateTrust."""
 
+from typing import Literal, Optional
 from pydantic import EmailStr
 from pydantic_settings import BaseSettings
 
@@ -11,6 +12,8 @@ class Settings(BaseSettings):
     OAUTH2_SECRET_KEY: str
     DB_USER_PASSW: str
     DB_NAME: str
+    DB_HOST: str = "localhost"
+    DB_PORT: int = 5432
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_WEEKS: int
     EMAIL_HOST: str
@@ -22,6 +25,41 @@ class Settings(BaseSettings):
     AWS_ACCESS_KEY: str
     AWS_SECRET_KEY: str
     AWS_BUCKET_NAME: str
+    PRINCIPAL_CACHE_ENABLED: bool = True
+    PRINCIPAL_CACHE_SIZE: int = 1024
+    PRINCIPAL_CACHE_TTL: int = 60
+    PASSWORD_POOL_WORKERS: int = 4
+    PASSWORD_POOL_QUEUE_SIZE: int = 64
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_WARMUP: int = 5
+    DB_STATEMENT_TIMEOUT: int = 30000
+    DB_REPLICA_HOST: Optional[str] = None
+    DB_REPLICA_PORT: int = 5432
+    DB_REPLICA_MAX_LAG: float = 5.0
+    DB_REPLICA_LAG_CHECK_INTERVAL: float = 1.0
+    DB_READ_STICKY_SECONDS: float = 5.0
+    DB_ENGINE: Literal["sync", "async"] = "sync"
+    PAGE_SIZE: int = 100
+    PAGE_SIZE_MAX: int = 500
+    DEFAULT_CURRENCY: str = "NGN"
+    STREAM_BATCH_SIZE: int = 100
+    FUZZY_MATCH_LIMIT: int = 10
+    DUPLICATE_SIMILARITY: float = 0.5
+    IMPORT_CHUNK_SIZE: int = 5000
+    IMPORT_ERROR_LIMIT: int = 100
+    DOCUMENT_CHUNK_SIZE: int = 1024 * 1024
+    DOCUMENT_MAX_SIZE: int = 50 * 1024 * 1024
+    STORAGE_BACKEND: Literal["local", "s3"] = "local"
+    S3_ENDPOINT_URL: Optional[str] = None
+    S3_REGION: Optional[str] = None
+    S3_MULTIPART_THRESHOLD: int = 8 * 1024 * 1024
+    S3_MULTIPART_CHUNK_SIZE: int = 8 * 1024 * 1024
+    S3_MAX_CONCURRENCY: int = 8
+    METRICS_TOKEN: Optional[str] = None
 
     class Config:
         """Configuration for environment variables."""
@@ -1,20 +1,29 @@
 #!/usr/bin/python3
 """Estate planning software entry file."""
 
-from fastapi import FastAPI
+from anyio import to_thread
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from api.v1.configurations.database import engine
-from api.v1.models.data.users import Base as UserBase
-from api.v1.models.data.assets import Base as AssetBase
+from fastapi.responses import JSONResponse
+from api.v1.configurations.database import (
+    THREADPOOL_SIZE, read_router, warm_async_pool, warm_pool
+)
+from api.v1.configurations.routing import PinWrites
+from api.v1.configurations.settings import settings
 from api.v1.routes.authenticate import auths_routers
 from api.v1.routes.users import user_routers
 from api.v1.routes.trustees import trustee_router
 from api.v1.routes.beneficiaries import beneficiary_router
 from api.v1.routes.assets import asset_router
 from api.v1.routes.monetaries import monetary_router
+from api.v1.routes.metrics import metrics_router
+from api.v1.routes.search import search_router
+from api.v1.routes.imports import import_router
+from api.v1.utils.pagination import NEXT_CURSOR
+from api.v1.utils.passwd import PasswordPoolFull
 
-UserBase.metadata.create_all(bind=engine)
-AssetBase.metadata.create_all(bind=engine)
+# The schema is brought up to date by "python -m api.v1.cli migrate",
+# run once before the workers start, not by every worker on import.
 
 app = FastAPI()
 
@@ -28,7 +37,37 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR],
 )
+# Reads follow writes to the primary across worker processes
+if settings.DB_REPLICA_HOST:
+    app.add_middleware(PinWrites, router=read_router)
+
+
+@app.on_event("startup")
+async def size_threadpool() -> None:
+    """Match the handler threadpool to the database connection pool."""
+    to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+
+
+@app.on_event("startup")
+async def warm_connection_pool() -> None:
+    """Open pooled connections before the first request arrives."""
+    await to_thread.run_sync(warm_pool)
+    if settings.DB_ENGINE == "async":
+        await warm_async_pool()
+
+
+@app.exception_handler(PasswordPoolFull)
+async def password_pool_full(
+    request: Request, exc: PasswordPoolFull
+) -> JSONResponse:
+    """Shed load when the password worker pool is saturated."""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "server busy, try again"},
+        headers={"Retry-After": "1"}
+    )
 
 
 @app.get("/")
@@ -45,6 +84,9 @@ app.include_router(trustee_router, prefix="/api/v1")
 app.include_router(beneficiary_router, prefix="/api/v1")
 app.include_router(asset_router, prefix="/api/v1")
 app.include_router(monetary_router, prefix="/api/v1")
+app.include_router(search_router, prefix="/api/v1")
+app.include_router(import_router, prefix="/api/v1")
+app.include_router(metrics_router, prefix="/api/v1")
 
 if __name__ == "__main__":
     import uvicorn
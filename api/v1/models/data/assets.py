@@ -2,21 +2,75 @@
 """Assets models for estate planning software."""
 
 from sqlalchemy import (
-    Column, String, DateTime, Text,
-    TIMESTAMP, ForeignKey, text
+    Column, Computed, String, DateTime, Text, Numeric,
+    TIMESTAMP, ForeignKey, Index, text
 )
-from sqlalchemy.orm import relationship
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import deferred, relationship
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID
 from api.v1.configurations.database import Base
+from api.v1.configurations.settings import settings
 
 # PostgreSQL UUID type
 PgUUID = UUID(as_uuid=False)
+# Text search configuration of the search columns and their queries
+SEARCH_CONFIG = "english"
+# Prefix of the owner lexeme; the english parser never emits it
+OWNER_TAG = "~"
+
+
+def owner_lexeme(owner: str) -> str:
+    """
+    Build the SQL of the lexeme tagging a search document with its owner.
+
+    ANDed with the search terms, the lexeme lets the GIN index intersect
+    the owner's short posting list with the terms' ones, instead of
+    combining every match in the table with the owner index.
+
+    Args:
+        owner (str): SQL of the owner UUID, e.g. a column name
+    Returns:
+        The text expression of OWNER_TAG and the hex digits of the UUID
+    """
+    return f"'{OWNER_TAG}' || replace(({owner})::text, '-', '')"
+
+
+def search_document(owner: str, *weighted) -> str:
+    """
+    Build the generated column expression of a full-text document.
+
+    Args:
+        owner (str): The column naming the owning grantor
+        weighted: (column name, weight) pairs, weight being A to D
+    Returns:
+        The SQL expression, concatenating the weighted column vectors
+        and the owner lexeme
+    """
+    return " || ".join([
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', "
+        f"coalesce({name}, '')), '{weight}')" for name, weight in weighted
+    ] + [f"array_to_tsvector(ARRAY[{owner_lexeme(owner)}])"])
+
+
+ASSET_SEARCH = search_document(
+    "owner_id", ("name", "A"), ("location", "B"), ("note", "C")
+)
+MONETARY_SEARCH = search_document(
+    "owner_id", ("acc_name", "A"), ("bank_name", "B"), ("note", "C")
+)
 
 
 class Asset(Base):
     """Asset model."""
 
     __tablename__: str = 'assets'
+    # Foreign key lookups (owner checks, ON DELETE CASCADE) and keyset
+    # pagination of a grantor's and a beneficiary's assets
+    __table_args__ = (
+        Index("ix_assets_owner_page", "owner_id", "created_at", "uuid_pk"),
+        Index("ix_assets_will_to_page", "will_to", "created_at", "uuid_pk"),
+        # Full-text search, scoped to the owner by the owner lexeme
+        Index("ix_assets_search", "search", postgresql_using="gin"),
+    )
     uuid_pk = Column(
         PgUUID, primary_key=True,
         server_default=text("gen_random_uuid()")
@@ -47,6 +101,11 @@ class Asset(Base):
         foreign_keys=[will_to]
     )
     note = Column(Text, nullable=True)
+    # Weighted name, location and note lexemes and the owner lexeme,
+    # kept by PostgreSQL
+    search = deferred(Column(
+        TSVECTOR, Computed(ASSET_SEARCH, persisted=True), nullable=False
+    ))
     created_at = Column(
         TIMESTAMP(timezone=True),
         nullable=False,
@@ -66,13 +125,35 @@ class Monetary(Base):
     """Monetary model."""
 
     __tablename__ = 'monetaries'
+    # Foreign key lookups (owner checks, ON DELETE CASCADE) and keyset
+    # pagination of a grantor's and a beneficiary's monetary assets
+    __table_args__ = (
+        Index(
+            "ix_monetaries_owner_page", "owner_id", "created_at", "uuid_pk"
+        ),
+        Index(
+            "ix_monetaries_will_to_page", "will_to", "created_at", "uuid_pk"
+        ),
+        # Estate totals: an index-only scan of a grantor's accounts, already
+        # grouped by beneficiary and currency
+        Index(
+            "ix_monetaries_owner_totals", "owner_id", "will_to", "currency",
+            postgresql_include=["amount"]
+        ),
+        # Full-text search, scoped to the owner by the owner lexeme
+        Index("ix_monetaries_search", "search", postgresql_using="gin"),
+    )
     uuid_pk = Column(
         PgUUID, primary_key=True,
         server_default=text("gen_random_uuid()")
     )
     acc_name = Column(String(255), nullable=False)
     acc_number = Column(String(150), nullable=False)
-    amount = Column(String(150), nullable=False)
+    amount = Column(Numeric(18, 2), nullable=False)
+    # ISO 4217 code; amounts in different currencies are never summed
+    currency = Column(
+        String(3), nullable=False, server_default=settings.DEFAULT_CURRENCY
+    )
     bank_name = Column(String(255), nullable=False)
     document = Column(String(255), nullable=True)
     # document1 = Column(String(255), nullable=True)
@@ -98,6 +179,11 @@ class Monetary(Base):
         foreign_keys=[will_to]
     )
     note = Column(Text, nullable=True)
+    # Weighted account name, bank name and note lexemes and the owner
+    # lexeme, kept by PostgreSQL
+    search = deferred(Column(
+        TSVECTOR, Computed(MONETARY_SEARCH, persisted=True), nullable=False
+    ))
     created_at = Column(
         TIMESTAMP(timezone=True),
         nullable=False,
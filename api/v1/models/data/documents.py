@@ -0,0 +1,132 @@
+#!/usr/bin/python3
+"""Document metadata models for estate planning software."""
+
+from sqlalchemy import (
+    BigInteger, CheckConstraint, Column, ForeignKey, Index, Integer, String,
+    TIMESTAMP, text
+)
+from sqlalchemy.dialects.postgresql import UUID
+from api.v1.configurations.database import Base
+
+# PostgreSQL UUID type
+PgUUID = UUID(as_uuid=False)
+
+
+class Document(Base):
+    """A reference to a stored file from the asset it documents."""
+
+    __tablename__: str = 'documents'
+    __table_args__ = (
+        # Downloads resolve an owner's storage key with one index lookup;
+        # also serves the owner foreign key
+        Index("ix_documents_owner_key", "owner_id", "storage_key"),
+        # Foreign key lookups (ON DELETE CASCADE)
+        Index("ix_documents_asset", "asset_id"),
+        Index("ix_documents_monetary", "monetary_id"),
+        CheckConstraint(
+            "num_nonnulls(asset_id, monetary_id) <= 1",
+            name="ck_documents_one_parent"
+        ),
+    )
+    uuid_pk = Column(
+        PgUUID, primary_key=True,
+        server_default=text("gen_random_uuid()")
+    )
+    owner_id = Column(
+        PgUUID,
+        ForeignKey("users.uuid_pk", ondelete="CASCADE"),
+        nullable=False
+    )
+    # Deleting the parent drops the reference; a document with neither
+    # parent was found on disk by the backfill and is kept.
+    asset_id = Column(
+        PgUUID,
+        ForeignKey("assets.uuid_pk", ondelete="CASCADE"),
+        nullable=True
+    )
+    monetary_id = Column(
+        PgUUID,
+        ForeignKey("monetaries.uuid_pk", ondelete="CASCADE"),
+        nullable=True
+    )
+    # The file's path relative to the upload directory, that of its blob
+    storage_key = Column(String(255), nullable=False)
+    size = Column(BigInteger, nullable=False)
+    content_type = Column(String(255), nullable=False)
+    # Hex SHA-256 of the file
+    sha256 = Column(String(64), nullable=False)
+    created_at = Column(
+        TIMESTAMP(timezone=True),
+        nullable=False,
+        server_default=text("now()")
+    )
+
+    def __repr__(self):
+        """Document representation."""
+        return f"{self.uuid_pk} - {self.storage_key} - {self.size}"
+
+
+class DocumentBlob(Base):
+    """A stored file, shared by every document with its content."""
+
+    __tablename__: str = 'document_blobs'
+    __table_args__ = (
+        # The sweep of the files nothing references any more
+        Index(
+            "ix_document_blobs_unreferenced", "sha256",
+            postgresql_where=text("ref_count <= 0")
+        ),
+    )
+    # Hex SHA-256 of the content
+    sha256 = Column(String(64), primary_key=True)
+    # ab/cd/<sha256> for uploads, the original name for backfilled files
+    storage_key = Column(String(255), nullable=False)
+    size = Column(BigInteger, nullable=False)
+    # The documents rows referencing the file, kept by the triggers below
+    ref_count = Column(Integer, nullable=False, server_default="0")
+    created_at = Column(
+        TIMESTAMP(timezone=True),
+        nullable=False,
+        server_default=text("now()")
+    )
+
+    def __repr__(self):
+        """Document blob representation."""
+        return f"{self.sha256} - {self.storage_key} - {self.ref_count}"
+
+
+# Statement level triggers count the references to every blob inside the
+# transaction adding or removing documents, deletes cascading from an
+# asset, a monetary asset or a grantor included. The first reference
+# creates the blob row; the row is locked until the transaction ends, so
+# the file can be put in place, or swept away, before committing.
+# Installed by configurations.migrations, like the summary triggers.
+BLOB_FUNCTION = """
+CREATE OR REPLACE FUNCTION document_blobs_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO document_blobs (sha256, storage_key, size, ref_count)
+        SELECT sha256, min(storage_key), max(size), count(*)
+        FROM new_rows GROUP BY sha256
+        ON CONFLICT (sha256) DO UPDATE
+        SET ref_count = document_blobs.ref_count + EXCLUDED.ref_count;
+    ELSE
+        UPDATE document_blobs b SET ref_count = b.ref_count - d.refs
+        FROM (SELECT sha256, count(*) AS refs FROM old_rows GROUP BY 1) d
+        WHERE b.sha256 = d.sha256;
+    END IF;
+    RETURN NULL;
+END
+$$;
+"""
+BLOB_TRIGGERS = """
+DROP TRIGGER IF EXISTS document_blobs_insert ON documents;
+CREATE TRIGGER document_blobs_insert AFTER INSERT ON documents
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION document_blobs_apply();
+DROP TRIGGER IF EXISTS document_blobs_delete ON documents;
+CREATE TRIGGER document_blobs_delete AFTER DELETE ON documents
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION document_blobs_apply();
+"""
@@ -0,0 +1,138 @@
+#!/usr/bin/python3
+"""Estate summary model for estate planning software."""
+
+from sqlalchemy import Column, Integer, TIMESTAMP, ForeignKey, text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from api.v1.configurations.database import Base
+
+# PostgreSQL UUID type
+PgUUID = UUID(as_uuid=False)
+
+# (summary column, counted table, column referencing the grantor)
+SUMMARY_COUNTS = (
+    ("beneficiaries", "beneficiaries", "added_by"),
+    ("trustees", "trustees", "added_by"),
+    ("assets", "assets", "owner_id"),
+    ("monetaries", "monetaries", "owner_id"),
+)
+
+
+class EstateSummary(Base):
+    """Per grantor estate counts, kept current by the estate triggers."""
+
+    __tablename__: str = 'estate_summary'
+    grantor_id = Column(
+        PgUUID,
+        ForeignKey("users.uuid_pk", ondelete="CASCADE"),
+        primary_key=True
+    )
+    beneficiaries = Column(Integer, nullable=False, server_default="0")
+    trustees = Column(Integer, nullable=False, server_default="0")
+    assets = Column(Integer, nullable=False, server_default="0")
+    monetaries = Column(Integer, nullable=False, server_default="0")
+    # Non-zero monetary total per currency code, as decimal strings
+    monetary_totals = Column(
+        JSONB, nullable=False, server_default=text("'{}'::jsonb")
+    )
+    updated_at = Column(
+        TIMESTAMP(timezone=True),
+        nullable=False,
+        server_default=text("now()")
+    )
+
+    def __repr__(self):
+        """Estate summary representation."""
+        return f"{self.grantor_id} - {self.assets} - {self.monetaries}"
+
+
+# Statement level triggers fold each write into the summary inside the
+# writing transaction: one UPDATE per statement, whatever its row count,
+# and none for the writes that match nothing. Counts and totals are
+# applied as deltas against the locked summary row, so concurrent
+# writers to one estate queue on that row instead of losing updates,
+# and the deletes cascading from a beneficiary are counted too. They are
+# installed by configurations.migrations, after the migrations bring the
+# estate tables up to these models.
+SUMMARY_FUNCTIONS = """
+CREATE OR REPLACE FUNCTION estate_summary_open() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO estate_summary (grantor_id)
+        SELECT uuid_pk FROM new_rows ON CONFLICT DO NOTHING;
+    ELSE
+        UPDATE estate_summary SET updated_at = now()
+        WHERE grantor_id IN (SELECT uuid_pk FROM new_rows);
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION estate_summary_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    changes TEXT;
+BEGIN
+    -- TG_ARGV: the summary column and the column naming the grantor.
+    -- Rows entering an estate count once, rows leaving it minus once.
+    changes := CASE TG_OP
+        WHEN 'INSERT' THEN 'SELECT *, 1 AS sign FROM new_rows'
+        WHEN 'DELETE' THEN 'SELECT *, -1 AS sign FROM old_rows'
+        ELSE 'SELECT *, 1 AS sign FROM new_rows '
+            'UNION ALL SELECT *, -1 AS sign FROM old_rows'
+    END;
+    EXECUTE format(
+        'UPDATE estate_summary s '
+        'SET %1$I = s.%1$I + d.delta, updated_at = now() '
+        'FROM (SELECT %2$I AS grantor_id, sum(sign) AS delta '
+        'FROM (%3$s) c GROUP BY 1) d '
+        'WHERE s.grantor_id = d.grantor_id',
+        TG_ARGV[0], TG_ARGV[1], changes
+    );
+    IF TG_TABLE_NAME = 'monetaries' THEN
+        EXECUTE format(
+            'UPDATE estate_summary s SET monetary_totals = ('
+            'SELECT COALESCE(jsonb_object_agg(key, total::text) '
+            'FILTER (WHERE total <> 0), ''{}'') '
+            'FROM (SELECT key, sum(value::numeric) AS total FROM ('
+            'SELECT * FROM jsonb_each_text(s.monetary_totals) '
+            'UNION ALL SELECT * FROM jsonb_each_text(d.deltas)) t '
+            'GROUP BY key) k) '
+            'FROM (SELECT grantor_id, jsonb_object_agg(currency, delta) '
+            'AS deltas FROM (SELECT owner_id AS grantor_id, currency, '
+            'sum(sign * amount) AS delta FROM (%1$s) c GROUP BY 1, 2) g '
+            'GROUP BY 1) d '
+            'WHERE s.grantor_id = d.grantor_id',
+            changes
+        );
+    END IF;
+    RETURN NULL;
+END
+$$;
+"""
+
+
+def summary_triggers():
+    """Build the idempotent DDL attaching the summary triggers."""
+    statements = []
+    tables = [("users", "estate_summary_open()", ("INSERT", "UPDATE"))]
+    tables += [
+        (table, f"estate_summary_apply('{column}', '{owner}')",
+         ("INSERT", "UPDATE", "DELETE"))
+        for column, table, owner in SUMMARY_COUNTS
+    ]
+    for table, function, operations in tables:
+        for operation in operations:
+            name = f"estate_summary_{operation.lower()}"
+            transitions = {
+                "INSERT": "NEW TABLE AS new_rows",
+                "UPDATE": "NEW TABLE AS new_rows OLD TABLE AS old_rows",
+                "DELETE": "OLD TABLE AS old_rows",
+            }[operation]
+            statements.append(
+                f"DROP TRIGGER IF EXISTS {name} ON {table};\n"
+                f"CREATE TRIGGER {name} AFTER {operation} ON {table}\n"
+                f"REFERENCING {transitions}\n"
+                f"FOR EACH STATEMENT EXECUTE FUNCTION {function};"
+            )
+    return "\n".join(statements)
@@ -3,7 +3,7 @@
 
 from sqlalchemy import (
     Column, String, DateTime, Enum, Text,
-    TIMESTAMP, ForeignKey, text, Date
+    TIMESTAMP, ForeignKey, Index, text, Date, event, func, literal_column
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
@@ -17,6 +17,10 @@ class User(Base):
     """User model for estate planning software."""
 
     __tablename__: str = 'users'
+    # Keyset pagination of all users
+    __table_args__ = (
+        Index("ix_users_page", "created_at", "uuid_pk"),
+    )
     # Generate random UUID primary key column
     uuid_pk = Column(
         PgUUID, primary_key=True,
@@ -72,6 +76,14 @@ class Beneficiary(Base):
     """Beneficiary model."""
 
     __tablename__: str = 'beneficiaries'
+    # Foreign key lookups (owner checks, ON DELETE CASCADE) and keyset
+    # pagination of a grantor's beneficiaries
+    __table_args__ = (
+        Index(
+            "ix_beneficiaries_added_by_page",
+            "added_by", "created_at", "uuid_pk"
+        ),
+    )
     uuid_pk = Column(
         PgUUID, primary_key=True,
         server_default=text("gen_random_uuid()")
@@ -123,6 +135,13 @@ class Trustee(Base):
     """User trustee model."""
 
     __tablename__: str = 'trustees'
+    # Foreign key lookups (owner checks, ON DELETE CASCADE) and keyset
+    # pagination of a grantor's trustees
+    __table_args__ = (
+        Index(
+            "ix_trustees_added_by_page", "added_by", "created_at", "uuid_pk"
+        ),
+    )
     uuid_pk = Column(
         PgUUID, primary_key=True,
         server_default=text("gen_random_uuid()")
@@ -164,3 +183,69 @@ class Trustee(Base):
     def __str__(self):
         """Trustee representation."""
         return f"{self.username} - {self.first_name} - {self.last_name}"
+
+
+# Trigram operator classes, and GIN support for the added_by UUIDs the
+# fuzzy name indexes are scoped by
+TRIGRAM_EXTENSIONS = ("pg_trgm", "btree_gin")
+
+
+def searchable_text(*columns):
+    """
+    Join columns into the text matched by the fuzzy name indexes.
+
+    Only immutable operators are used, so the expression can be indexed;
+    queries must use the very same expression to be served by the index.
+
+    Args:
+        columns: The columns, nullable ones coalesced to ''
+    Returns:
+        The space separated text expression
+    """
+    space = literal_column("' '")
+    joined = func.coalesce(columns[0], literal_column("''"))
+    for column in columns[1:]:
+        joined = joined.op("||")(space).op("||")(
+            func.coalesce(column, literal_column("''"))
+        )
+    return joined
+
+
+def trigram_available(ddl, target, bind, **kw) -> bool:
+    """Tell whether the fuzzy name indexes can be built on bind."""
+    return bind.execute(text(
+        "SELECT count(*) FROM pg_extension WHERE extname = ANY(:names)"
+    ), {"names": list(TRIGRAM_EXTENSIONS)}).scalar() == len(
+        TRIGRAM_EXTENSIONS
+    )
+
+
+@event.listens_for(Base.metadata, "before_create")
+def install_trigram_extensions(target, connection, **kw) -> None:
+    """Install the trigram extensions the server provides, if missing."""
+    available = connection.execute(text(
+        "SELECT name FROM pg_available_extensions WHERE name = ANY(:names)"
+    ), {"names": list(TRIGRAM_EXTENSIONS)}).scalars().all()
+    for name in available:
+        connection.execute(text(f"CREATE EXTENSION IF NOT EXISTS {name}"))
+
+
+BENEFICIARY_NAME = searchable_text(
+    Beneficiary.first_name, Beneficiary.middle_name, Beneficiary.last_name
+)
+TRUSTEE_CONTACT = searchable_text(
+    Trustee.first_name, Trustee.middle_name, Trustee.last_name,
+    Trustee.email, Trustee.phone_number
+)
+# Typeahead and duplicate checks within one grantor's beneficiaries and
+# trustees; skipped where pg_trgm or btree_gin is not installed
+Index(
+    "ix_beneficiaries_name_trgm",
+    Beneficiary.added_by, BENEFICIARY_NAME.label("name"),
+    postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}
+).ddl_if(callable_=trigram_available)
+Index(
+    "ix_trustees_contact_trgm",
+    Trustee.added_by, TRUSTEE_CONTACT.label("contact"),
+    postgresql_using="gin", postgresql_ops={"contact": "gin_trgm_ops"}
+).ddl_if(callable_=trigram_available)
@@ -2,9 +2,16 @@
 """Assets schemas for Estate Trust."""
 
 from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel
-from fastapi import UploadFile
+from decimal import Decimal
+from typing import Annotated, List, Optional
+from uuid import UUID
+from pydantic import BaseModel, Field
+from api.v1.configurations.settings import settings
+
+# An exact, non-negative amount as stored in monetaries.amount
+Amount = Annotated[Decimal, Field(ge=0, max_digits=18, decimal_places=2)]
+# An ISO 4217 currency code
+CURRENCY = r"^[A-Z]{3}$"
 
 
 class AddAsset(BaseModel):
@@ -14,11 +21,6 @@ class AddAsset(BaseModel):
     location: Optional[str] = ""
     owner_id: Optional[str] = ""
     will_to: str
-    document: Optional[UploadFile] = None
-    # document1: Optional[UploadFile] = None
-    # document2: Optional[UploadFile] = None
-    # document3: Optional[UploadFile] = None
-    # document4: Optional[UploadFile] = None
     note: Optional[str]
 
 
@@ -27,15 +29,11 @@ class AddMonetary(BaseModel):
 
     acc_name: str
     acc_number: str
-    amount: str
+    amount: Amount
+    currency: str = Field(settings.DEFAULT_CURRENCY, pattern=CURRENCY)
     bank_name: str
     owner_id: Optional[str] = ""
     will_to: str
-    document: Optional[UploadFile] = None
-    # document1: Optional[UploadFile] = None
-    # document2: Optional[UploadFile] = None
-    # document3: Optional[UploadFile] = None
-    # document4: Optional[UploadFile] = None
     note: Optional[str]
 
 
@@ -68,7 +66,8 @@ class MonetaryRes(BaseModel):
     uuid_pk: str
     acc_name: str
     acc_number: str
-    amount: str
+    amount: Decimal
+    currency: str
     bank_name: str
     owner_id: str
     will_to: str
@@ -93,11 +92,6 @@ class UpdateAsset(BaseModel):
     name: Optional[str]
     location: Optional[str]
     will_to: Optional[str]
-    document: Optional[UploadFile] = None
-    # document1: Optional[UploadFile] = None
-    # document2: Optional[UploadFile] = None
-    # document3: Optional[UploadFile] = None
-    # document4: Optional[UploadFile] = None
     note: Optional[str]
     updated_at: str = datetime.now()
 
@@ -107,13 +101,65 @@ class UpdateMonetary(BaseModel):
 
     acc_name: Optional[str]
     acc_number: Optional[str]
-    amount: Optional[str]
+    amount: Optional[Amount]
+    currency: Optional[str] = Field(None, pattern=CURRENCY)
     bank_name: Optional[str]
     will_to: Optional[str]
-    document: Optional[UploadFile] = None
-    # document1: Optional[UploadFile] = None
-    # document2: Optional[UploadFile] = None
-    # document3: Optional[UploadFile] = None
-    # document4: Optional[UploadFile] = None
     note: Optional[str]
     updated_at: str = datetime.now()
+
+
+class DocumentRes(BaseModel):
+    """Return a stored document."""
+
+    filename: str
+    size: int
+    sha256: str
+    content_type: str
+
+
+class BulkDelete(BaseModel):
+    """Ids of the items to delete in one transaction."""
+
+    ids: List[UUID] = Field(min_length=1, max_length=500)
+
+
+class BatchItem(BaseModel):
+    """Result for one item of a batch create."""
+
+    index: int
+    uuid_pk: Optional[str] = None
+    error: Optional[str] = None
+
+
+class SearchHit(BaseModel):
+    """Return one asset or monetary asset matching a search."""
+
+    kind: str
+    uuid_pk: str
+    title: str
+    detail: Optional[str]
+    note: Optional[str]
+    rank: float
+
+
+class CurrencyTotal(BaseModel):
+    """Sum of a grantor's monetary assets in one currency."""
+
+    currency: str
+    amount: Decimal
+    accounts: int
+
+
+class BeneficiaryTotal(CurrencyTotal):
+    """Sum of the monetary assets willed to one beneficiary."""
+
+    beneficiary_id: str
+
+
+class EstateTotals(BaseModel):
+    """Monetary valuation of an estate, per currency."""
+
+    grantor_id: str
+    totals: List[CurrencyTotal]
+    beneficiaries: List[BeneficiaryTotal]
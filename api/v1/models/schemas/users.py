@@ -2,9 +2,10 @@
 """Users schemas for Estate Trust."""
 
 from datetime import datetime, date
+from decimal import Decimal
 from enum import Enum
 from uuid import UUID
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, EmailStr
 from .assets import AssetRes, MonetaryRes
 
@@ -57,6 +58,18 @@ class TokenData(BaseModel):
     """Token data schema."""
 
     uuid_pk: UUID
+    username: Optional[str] = None
+    account_type: Optional[str] = None
+    added_by: Optional[str] = None
+
+
+class Principal(BaseModel):
+    """Authenticated account resolved from an access token."""
+
+    uuid_pk: str
+    username: str
+    account_type: str
+    added_by: Optional[str] = None
 
 
 class AccessToken(BaseModel):
@@ -151,6 +164,18 @@ class TrusteeRes(BaseModel):
         orm_mode = True
 
 
+class BeneficiaryMatch(BeneficiaryRes):
+    """Return a beneficiary resembling a name search or a new entry."""
+
+    score: float
+
+
+class TrusteeMatch(TrusteeRes):
+    """Return a trustee resembling a contact search or a new entry."""
+
+    score: float
+
+
 class UserRes(BaseModel):
     """Return all the users in the database."""
 
@@ -231,3 +256,20 @@ class UpdateBeneficiary(BaseModel):
     middle_name: Optional[str]
     relation: Optional[BeneficiaryEnum]
     updated_at: str = datetime.now()
+
+
+class EstateSummaryRes(BaseModel):
+    """Return the estate summary of a grantor."""
+
+    grantor_id: str
+    beneficiaries: int
+    trustees: int
+    assets: int
+    monetaries: int
+    monetary_totals: Dict[str, Decimal]
+    updated_at: datetime
+
+    class Config:
+        """Serialiser configuration."""
+
+        orm_mode = True
@@ -1,12 +1,19 @@
 #!/usr/bin/python3
 """Assets repository for Estate Trust."""
 
-from typing import List
+from typing import Any, Dict, List
 from uuid import UUID
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import DataError
 from api.v1.models.data.users import Beneficiary, User
 from api.v1.models.data.assets import Asset
+from api.v1.repositories.base import (
+    Keyset, batch_insert, batch_rows, collect_owned, created, delete_returning,
+    heir_errors, heirs_statement, missing_ids, normalize_ids, owned_by,
+    update_returning
+)
 
 
 class AssetRepository:
@@ -25,45 +32,72 @@ class AssetRepository:
             return True
         return False
 
-    def get_all_assests_for_grantor(self, user_id: UUID) -> List[Asset] | None:
+    def add_assets(
+        self, owner_id: UUID, data: List
+    ) -> List[Dict[str, Any]]:
+        """
+        Add several assets in one transaction.
+
+        Every item must be willed to one of the grantor's beneficiaries.
+
+        Args:
+            owner_id (UUID): The grantor unique identifier
+            data (List[AddAsset]): The validated items
+        Returns:
+            The uuid_pk of every new row by item index, or the errors of the
+            invalid items, in which case nothing is inserted
+        """
+        will_to = normalize_ids(item.will_to for item in data)
+        owned = set(self.sess.scalars(
+            heirs_statement(owner_id, will_to)
+        ))
+        errors = heir_errors(will_to, owned)
+        if errors:
+            return errors
+        rows = batch_rows(data, owner_id=owner_id)
+        self.sess.execute(batch_insert(Asset), rows)
+        self.sess.commit()
+        return created(rows)
+
+    def get_all_assests_for_grantor(
+        self, user_id: UUID, after: Keyset | None = None,
+        limit: int = None
+    ) -> List[Asset] | None:
         """
         Retrieve all assets for a given user.
 
         Args:
             user_id (UUID): The grantor's unique ID
+            after (Keyset): Start after this (created_at, uuid_pk)
+            limit (int): The page size, plus one lookahead row
         Returns:
             The list of assests if user exists, or None otherwise
         """
         try:
-            user = self.sess.query(User).filter(
-                User.uuid_pk == user_id
-            ).first()
-            if user:
-                assets = user.assets
-                return assets
-            return None
+            return collect_owned(self.sess.execute(owned_by(
+                User, Asset, Asset.owner_id, user_id, after, limit
+            )).all())
         except DataError:
             return None
 
     def get_all_assests_for_beneficiary(
-        self, user_id: UUID
+        self, user_id: UUID, after: Keyset | None = None,
+        limit: int = None
     ) -> List[Asset] | None:
         """
         Retrieve all assets for a given beneficiary.
 
         Args:
             user_id (UUID): The beneficiary's unique ID
+            after (Keyset): Start after this (created_at, uuid_pk)
+            limit (int): The page size, plus one lookahead row
         Returns:
             The list of assests if user exists, or None otherwise
         """
         try:
-            user = self.sess.query(Beneficiary).filter(
-                Beneficiary.uuid_pk == user_id
-            ).first()
-            if user:
-                assets = user.assets
-                return assets
-            return None
+            return collect_owned(self.sess.execute(owned_by(
+                Beneficiary, Asset, Asset.will_to, user_id, after, limit
+            )).all())
         except DataError:
             return None
 
@@ -97,17 +131,15 @@ class AssetRepository:
             asset_id (UUID): The asset unique identifier
             data (dict): The data to be updated
         Returns:
-            Return True if the update was successful, None otherwise
+            Return the updated asset if successful, None otherwise
         """
         try:
-            asset = self.sess.query(Asset).filter_by(
-                uuid_pk=asset_id,
-                owner_id=user_id
-            )
-            if asset.first():
-                asset.update(data.dict(), synchronize_session=False)
+            asset = self.sess.execute(update_returning(
+                Asset, data, uuid_pk=asset_id, owner_id=user_id
+            )).first()
+            if asset:
                 self.sess.commit()
-                return asset.first()
+                return asset
             return None
         except DataError:
             return None
@@ -123,14 +155,213 @@ class AssetRepository:
             True if successful, None otherwise
         """
         try:
-            asset = self.sess.query(Asset).filter_by(
-                uuid_pk=asset_id,
-                owner_id=user_id
-            )
-            if asset.first():
-                asset.delete()
+            deleted = self.sess.execute(delete_returning(
+                Asset, uuid_pk=asset_id, owner_id=user_id
+            )).first()
+            if deleted:
                 self.sess.commit()
                 return True
             return None
         except DataError:
             return None
+
+    def delete_assets(
+        self, user_id: UUID, asset_ids: List[str]
+    ) -> List[str] | None:
+        """
+        Delete several assets in one transaction.
+
+        Args:
+            user_id (UUID): The grantor unique identifier
+            asset_ids (List[str]): The asset unique identifiers
+        Returns:
+            The ids that were not found, in which case nothing is deleted,
+            or None if an id is malformed
+        """
+        try:
+            deleted = self.sess.scalars(delete_returning(
+                Asset, asset_ids, owner_id=user_id
+            )).all()
+        except DataError:
+            self.sess.rollback()
+            return None
+        missing = missing_ids(asset_ids, deleted)
+        if missing:
+            self.sess.rollback()
+            return missing
+        self.sess.commit()
+        return missing
+
+
+class AsyncAssetRepository:
+    """Async assets repository."""
+
+    def __init__(self, sess: AsyncSession) -> None:
+        """Initialize the repository."""
+        self.sess: AsyncSession = sess
+
+    async def add_asset(self, data) -> bool:
+        """Add an asset."""
+        asset = Asset(**data.dict())
+        self.sess.add(asset)
+        await self.sess.commit()
+        return True
+
+    async def add_assets(
+        self, owner_id: UUID, data: List
+    ) -> List[Dict[str, Any]]:
+        """
+        Add several assets in one transaction.
+
+        Every item must be willed to one of the grantor's beneficiaries.
+
+        Args:
+            owner_id (UUID): The grantor unique identifier
+            data (List[AddAsset]): The validated items
+        Returns:
+            The uuid_pk of every new row by item index, or the errors of the
+            invalid items, in which case nothing is inserted
+        """
+        will_to = normalize_ids(item.will_to for item in data)
+        owned = set(await self.sess.scalars(
+            heirs_statement(owner_id, will_to)
+        ))
+        errors = heir_errors(will_to, owned)
+        if errors:
+            return errors
+        rows = batch_rows(data, owner_id=owner_id)
+        await self.sess.execute(batch_insert(Asset), rows)
+        await self.sess.commit()
+        return created(rows)
+
+    async def get_all_assests_for_grantor(
+        self, user_id: UUID, after: Keyset | None = None,
+        limit: int = None
+    ) -> List[Asset] | None:
+        """
+        Retrieve all assets for a given user.
+
+        Args:
+            user_id (UUID): The grantor's unique ID
+            after (Keyset): Start after this (created_at, uuid_pk)
+            limit (int): The page size, plus one lookahead row
+        Returns:
+            The list of assests if user exists, or None otherwise
+        """
+        try:
+            result = await self.sess.execute(owned_by(
+                User, Asset, Asset.owner_id, user_id, after, limit
+            ))
+            return collect_owned(result.all())
+        except DataError:
+            return None
+
+    async def get_all_assests_for_beneficiary(
+        self, user_id: UUID, after: Keyset | None = None,
+        limit: int = None
+    ) -> List[Asset] | None:
+        """
+        Retrieve all assets for a given beneficiary.
+
+        Args:
+            user_id (UUID): The beneficiary's unique ID
+            after (Keyset): Start after this (created_at, uuid_pk)
+            limit (int): The page size, plus one lookahead row
+        Returns:
+            The list of assests if user exists, or None otherwise
+        """
+        try:
+            result = await self.sess.execute(owned_by(
+                Beneficiary, Asset, Asset.will_to, user_id, after, limit
+            ))
+            return collect_owned(result.all())
+        except DataError:
+            return None
+
+    async def get_asset(self, user_id: UUID, asset_id: UUID):
+        """
+        Retrieve an asset.
+
+        Args:
+            user_id (UUID): The grantor unique identifier
+            asset_id (UUID): The asset unique identifier
+        Returns:
+            Return asset if successful, None otherwise
+        """
+        try:
+            return await self.sess.scalar(
+                select(Asset).filter_by(uuid_pk=asset_id, owner_id=user_id)
+            )
+        except DataError:
+            return None
+
+    async def update_asset(self, user_id: UUID, asset_id: UUID, data):
+        """
+        Update an asset.
+
+        Args:
+            user_id (UUID): The grantor unique identifier
+            asset_id (UUID): The asset unique identifier
+            data (dict): The data to be updated
+        Returns:
+            Return the updated asset if successful, None otherwise
+        """
+        try:
+            result = await self.sess.execute(update_returning(
+                Asset, data, uuid_pk=asset_id, owner_id=user_id
+            ))
+            asset = result.first()
+            if asset:
+                await self.sess.commit()
+                return asset
+            return None
+        except DataError:
+            return None
+
+    async def delete_asset(self, user_id: UUID, asset_id: UUID) -> bool | None:
+        """
+        Delete an asset.
+
+        Args:
+            user_id (UUID): The grantor unique identifier
+            asset_id (UUID): The asset unique identifier
+        Returns:
+            True if successful, None otherwise
+        """
+        try:
+            result = await self.sess.execute(delete_returning(
+                Asset, uuid_pk=asset_id, owner_id=user_id
+            ))
+            if result.first():
+                await self.sess.commit()
+                return True
+            return None
+        except DataError:
+            return None
+
+    async def delete_assets(
+        self, user_id: UUID, asset_ids: List[str]
+    ) -> List[str] | None:
+        """
+        Delete several assets in one transaction.
+
+        Args:
+            user_id (UUID): The grantor unique identifier
+            asset_ids (List[str]): The asset unique identifiers
+        Returns:
+            The ids that were not found, in which case nothing is deleted,
+            or None if an id is malformed
+        """
+        try:
+            deleted = (await self.sess.scalars(delete_returning(
+                Asset, asset_ids, owner_id=user_id
+            ))).all()
+        except DataError:
+            await self.sess.rollback()
+            return None
+        missing = missing_ids(asset_ids, deleted)
+        if missing:
+            await self.sess.rollback()
+            return missing
+        await self.sess.commit()
+        return missing
@@ -0,0 +1,383 @@
+#!/usr/bin/python3
+"""Shared query builders for the Estate Trust repositories."""
+
+from datetime import datetime
+from itertools import chain
+from typing import Any, Dict, Iterable, List, Sequence, Set, Tuple
+from uuid import UUID, uuid4
+from pydantic import BaseModel
+from sqlalchemy import (
+    Delete, Float, Insert, Row, Select, Update, and_, delete, func, insert,
+    literal, literal_column, select, text, true, tuple_, update
+)
+from sqlalchemy.dialects.postgresql import JSON, aggregate_order_by
+from sqlalchemy.orm import Session, aliased
+from api.v1.configurations.settings import settings
+from api.v1.models.data.users import Beneficiary, trigram_available
+
+# A keyset position: the (created_at, uuid_pk) of the last row of a page.
+Keyset = Tuple[datetime, str]
+# Whether each engine has the trigram extensions, looked up once.
+TRIGRAM: Dict[Any, bool] = {}
+
+
+def after_keyset(model, after: Keyset | None):
+    """Return the condition selecting rows past the keyset position."""
+    if after is None:
+        return true()
+    columns = (model.created_at, model.uuid_pk)
+    return tuple_(*columns) > tuple_(*(
+        literal(value, column.type) for value, column in zip(after, columns)
+    ))
+
+
+def keyset(
+    stmt: Select, model, after: Keyset | None = None, limit: int = None
+) -> Select:
+    """
+    Page a statement in (created_at, uuid_pk) order.
+
+    Args:
+        stmt (Select): The statement selecting model
+        model: The paged model
+        after (Keyset): Start after this position, from the beginning if None
+        limit (int): The page size; one extra row is fetched to tell
+            whether another page follows
+    Returns:
+        The paged statement
+    """
+    stmt = stmt.where(after_keyset(model, after)).order_by(
+        model.created_at, model.uuid_pk
+    )
+    if limit is not None:
+        stmt = stmt.limit(limit + 1)
+    return stmt
+
+
+def owned_by(
+    parent, child, foreign_key, parent_id: UUID,
+    after: Keyset | None = None, limit: int = None
+) -> Select:
+    """
+    Select a page of a parent's rows of child in a single round-trip.
+
+    The page of children is a LATERAL subquery outer joined to the
+    parent, so an existing parent without (more) children still yields one
+    row, telling it apart from a missing parent. Ordering and LIMIT live
+    inside the subquery, where the (foreign key, created_at, uuid_pk)
+    index turns each page into a range scan that stops after limit rows.
+
+    Args:
+        parent: The owning model, e.g. User
+        child: The owned model, e.g. Asset
+        foreign_key: The child column referencing the parent
+        parent_id (UUID): The parent unique identifier
+        after (Keyset): Start after this position, from the beginning if None
+        limit (int): The page size; one extra row is fetched to tell
+            whether another page follows
+    Returns:
+        The (parent uuid_pk, child) statement
+    """
+    page = keyset(
+        select(child).where(foreign_key == parent.uuid_pk),
+        child, after, limit
+    ).lateral()
+    rows = aliased(child, page)
+    return select(parent.uuid_pk, rows).select_from(parent).outerjoin(
+        page, true()
+    ).where(parent.uuid_pk == parent_id).order_by(
+        rows.created_at, rows.uuid_pk
+    )
+
+
+def plain_columns(model, excluded: Sequence[str] = ()) -> List[Any]:
+    """
+    List the columns of model returned to clients.
+
+    Generated columns, such as the full-text search vectors, only serve
+    queries and are left out.
+
+    Args:
+        model: The model, e.g. Asset
+        excluded (Sequence[str]): Further column names to leave out
+    Returns:
+        The table columns
+    """
+    return [
+        column for column in model.__table__.c
+        if column.computed is None and column.name not in excluded
+    ]
+
+
+def estate_json(model, owner_column, owner, excluded: Sequence[str] = ()):
+    """
+    Aggregate the rows of model owned by owner into a JSON array.
+
+    Args:
+        model: The aggregated model, e.g. Asset
+        owner_column: The model column referencing the owner
+        owner: The owner column of the enclosing query to correlate with
+        excluded (Sequence[str]): Column names left out of the objects
+    Returns:
+        The correlated scalar subquery, '[]' for an owner without rows
+    """
+    row = func.json_build_object(*chain.from_iterable(
+        (literal_column(f"'{column.name}'"), column)
+        for column in plain_columns(model, excluded)
+    ))
+    return select(func.coalesce(
+        func.json_agg(aggregate_order_by(row, model.created_at)),
+        text("'[]'::json"),
+        type_=JSON
+    )).where(owner_column == owner).scalar_subquery()
+
+
+def collect_owned(rows: Sequence[Row]) -> List[Any] | None:
+    """
+    Unpack the rows of an owned_by statement.
+
+    Args:
+        rows: The (parent uuid_pk, child) rows
+    Returns:
+        The list of children, or None if the parent does not exist
+    """
+    if not rows:
+        return None
+    return [child for _, child in rows if child is not None]
+
+
+def changed_values(model, data: BaseModel) -> Dict[str, Any]:
+    """
+    Collect the column values a client actually set.
+
+    Fields left unset, fields that are not columns (e.g. uploads) and
+    nulls for NOT NULL columns are dropped, and updated_at is stamped.
+
+    Args:
+        model: The model being updated
+        data (BaseModel): The validated request body
+    Returns:
+        The values for an UPDATE statement
+    """
+    columns = model.__table__.c
+    values = {
+        key: value for key, value in data.dict(exclude_unset=True).items()
+        if key in columns and (value is not None or columns[key].nullable)
+    }
+    values["updated_at"] = func.now()
+    return values
+
+
+def update_returning(model, data: BaseModel, **owner) -> Update:
+    """
+    Update an owned row and return it in a single round-trip.
+
+    The owner check is part of the WHERE clause, so a missing row and a
+    row belonging to someone else both yield no result.
+
+    Args:
+        model: The model being updated
+        data (BaseModel): The validated request body
+        owner: The primary key and owner columns to match
+    Returns:
+        The UPDATE ... RETURNING statement
+    """
+    return update(model).filter_by(**owner).values(
+        **changed_values(model, data)
+    ).returning(*plain_columns(model)).execution_options(
+        synchronize_session=False
+    )
+
+
+def delete_returning(model, ids: Sequence[str] = None, **owner) -> Delete:
+    """
+    Delete owned rows and return their ids in a single round-trip.
+
+    Args:
+        model: The model being deleted from
+        ids (Sequence[str]): Restrict the delete to these primary keys
+        owner: The primary key and owner columns to match
+    Returns:
+        The DELETE ... RETURNING uuid_pk statement
+    """
+    stmt = delete(model).filter_by(**owner)
+    if ids is not None:
+        stmt = stmt.where(model.uuid_pk.in_(ids))
+    return stmt.returning(model.uuid_pk).execution_options(
+        synchronize_session=False
+    )
+
+
+def missing_ids(requested: Sequence[str], deleted: Sequence[str]) -> List[str]:
+    """Return the requested ids that a bulk delete did not match."""
+    deleted = set(map(str, deleted))
+    return sorted({str(uuid_pk) for uuid_pk in requested} - deleted)
+
+
+def batch_insert(model) -> Insert:
+    """
+    Insert many rows with one round-trip per batch of parameters.
+
+    Executed with a list of parameter dictionaries, the dialect batches
+    the rows into multi-row INSERT ... VALUES statements (insertmanyvalues).
+    The rows carry their own uuid_pk (see batch_rows), so no RETURNING
+    is needed to report the new ids in item order.
+
+    Args:
+        model: The model being inserted into
+    Returns:
+        The INSERT statement
+    """
+    return insert(model)
+
+
+def normalize_ids(ids: Iterable[str]) -> List[str | None]:
+    """Canonicalize uuid strings, mapping malformed ones to None."""
+    normalized = []
+    for uuid_pk in ids:
+        try:
+            normalized.append(str(UUID(str(uuid_pk))))
+        except ValueError:
+            normalized.append(None)
+    return normalized
+
+
+def heirs_statement(owner_id: UUID, will_to: Iterable[str]) -> Select:
+    """Select which of will_to are beneficiaries added by owner_id."""
+    return select(Beneficiary.uuid_pk).where(
+        Beneficiary.added_by == owner_id,
+        Beneficiary.uuid_pk.in_(set(will_to) - {None})
+    )
+
+
+def heir_errors(
+    will_to: Sequence[str | None], owned: Set[str]
+) -> List[Dict[str, Any]]:
+    """
+    Report the batch items willed to someone the grantor did not add.
+
+    Args:
+        will_to (Sequence[str | None]): The normalized will_to of each item
+        owned (Set[str]): The grantor's beneficiaries among them
+    Returns:
+        The per item errors, empty if every item is valid
+    """
+    return [
+        {"index": index, "error": f"unknown beneficiary {heir or ''}"}
+        for index, heir in enumerate(will_to) if heir not in owned
+    ]
+
+
+def batch_rows(data: Sequence[BaseModel], **values) -> List[Dict[str, Any]]:
+    """Turn validated items into insert parameters with fresh uuid_pks."""
+    return [
+        {**item.dict(), **values, "uuid_pk": str(uuid4())}
+        for item in data
+    ]
+
+
+def created(rows: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Return the per item results of a successful batch insert."""
+    return [
+        {"index": index, "uuid_pk": row["uuid_pk"]}
+        for index, row in enumerate(rows)
+    ]
+
+
+def trigram_search(sess: Session) -> bool:
+    """
+    Tell whether the database of sess can run the trigram queries.
+
+    The answer is kept per engine, so only the first query asks the
+    catalog; async sessions call this through run_sync.
+    """
+    bind = sess.get_bind()
+    if bind not in TRIGRAM:
+        TRIGRAM[bind] = trigram_available(None, None, sess)
+    return TRIGRAM[bind]
+
+
+def fuzzy_statement(
+    model, searched, owner_id: UUID, terms: str, limit: int,
+    trigram: bool = True
+) -> Select:
+    """
+    Select the owner's rows with a word similar to terms, for typeahead.
+
+    pg_trgm's word similarity matches a partial or misspelt word anywhere
+    in the searched text. The %> operator is served by the trigram GIN
+    index on (added_by, searched), so only the owner's rows are scored.
+    Without pg_trgm, rows containing every typed word match, scored by
+    how much of their text the terms cover.
+
+    Args:
+        model: The searched model, with an added_by owner column
+        searched: The indexed searchable_text expression of model
+        owner_id (UUID): The grantor unique identifier
+        terms (str): What the user typed so far
+        limit (int): The number of matches
+        trigram (bool): Whether pg_trgm is installed, see trigram_search
+    Returns:
+        The statement of model's columns and score, best match first
+    """
+    if trigram:
+        score = func.word_similarity(terms, searched)
+        matched = searched.bool_op("%>")(terms)
+    else:
+        score = literal(len(terms), Float) / func.greatest(
+            func.length(searched), 1
+        )
+        matched = and_(true(), *(
+            searched.icontains(word, autoescape=True)
+            for word in terms.split()
+        ))
+    score = score.label("score")
+    return select(
+        *plain_columns(model, ("password",)), score
+    ).where(
+        model.added_by == owner_id, matched
+    ).order_by(score.desc(), model.uuid_pk).limit(limit)
+
+
+def duplicates_statement(
+    model, searched, owner_id: UUID, candidate: str, limit: int,
+    trigram: bool = True
+) -> Select:
+    """
+    Select the owner's rows similar enough to candidate to be the same.
+
+    The % operator uses pg_trgm's (loose) similarity threshold to find
+    candidates through the trigram index, and the stricter
+    DUPLICATE_SIMILARITY setting decides which are reported. Without
+    pg_trgm, only rows with the same text, ignoring case, are reported.
+
+    Args:
+        model: The searched model, with an added_by owner column
+        searched: The indexed searchable_text expression of model
+        owner_id (UUID): The grantor unique identifier
+        candidate (str): The new row's text, as searchable_text joins it
+        limit (int): The number of matches
+        trigram (bool): Whether pg_trgm is installed, see trigram_search
+    Returns:
+        The statement of model's columns and score, closest first
+    """
+    if trigram:
+        score = func.similarity(searched, candidate)
+        matched = and_(
+            searched.bool_op("%")(candidate),
+            score >= settings.DUPLICATE_SIMILARITY
+        )
+    else:
+        score = literal(1.0, Float)
+        matched = func.lower(searched) == func.lower(candidate)
+    score = score.label("score")
+    return select(
+        *plain_columns(model, ("password",)), score
+    ).where(
+        model.added_by == owner_id, matched
+    ).order_by(score.desc(), model.uuid_pk).limit(limit)
+
+
+def searchable_values(*values: str | None) -> str:
+    """Join values the way searchable_text joins their columns."""
+    return " ".join(value or "" for value in values)
@@ -1,11 +1,99 @@
 #!/usr/bin/python3
 """Beneficiaries repository for Estate Trust."""
 
-from typing import List
+from itertools import chain
+from typing import Any, AsyncIterator, Dict, Iterator, List
 from uuid import UUID
+from sqlalchemy import Row, Text, cast, func, literal_column, select, text
+from sqlalchemy.dialects.postgresql import JSON, aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncResult, AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import DataError
-from api.v1.models.data.users import Beneficiary, User
+from api.v1.configurations.settings import settings
+from api.v1.models.data.assets import Asset, Monetary
+from api.v1.models.data.users import BENEFICIARY_NAME, Beneficiary, User
+from api.v1.repositories.base import (
+    Keyset, batch_insert, batch_rows, collect_owned, created, delete_returning,
+    duplicates_statement, estate_json, fuzzy_statement, missing_ids, owned_by,
+    searchable_values, trigram_search, update_returning
+)
+
+# Beneficiary columns opening each entry of the distribution report.
+REPORT_COLUMNS = (
+    "uuid_pk", "first_name", "middle_name", "last_name", "relation"
+)
+
+
+def json_object(**values):
+    """Build a json_build_object() call from keyword arguments."""
+    return func.json_build_object(*chain.from_iterable(
+        (literal_column(f"'{key}'"), value) for key, value in values.items()
+    ))
+
+
+def monetary_totals():
+    """Sum the beneficiary's monetary assets per currency, as JSON."""
+    per_currency = select(
+        Monetary.currency,
+        func.sum(Monetary.amount).label("amount"),
+        func.count().label("accounts")
+    ).where(Monetary.will_to == Beneficiary.uuid_pk).group_by(
+        Monetary.currency
+    ).correlate(Beneficiary).subquery()
+    row = json_object(
+        currency=per_currency.c.currency,
+        amount=cast(per_currency.c.amount, Text),
+        accounts=per_currency.c.accounts
+    )
+    return select(func.coalesce(
+        func.json_agg(aggregate_order_by(row, per_currency.c.currency)),
+        text("'[]'::json"),
+        type_=JSON
+    )).select_from(per_currency).scalar_subquery()
+
+
+def distribution_statement(grantor_id: UUID):
+    """
+    Build the single query reporting what each beneficiary receives.
+
+    Every row is one beneficiary's entry already encoded as JSON text by
+    the database, so it can be streamed without being decoded. The outer
+    join from users yields a lone (NULL, NULL) row for a grantor without
+    beneficiaries and no row at all for a missing grantor.
+    """
+    report = json_object(
+        **{name: Beneficiary.__table__.c[name] for name in REPORT_COLUMNS},
+        asset_count=select(func.count()).where(
+            Asset.will_to == Beneficiary.uuid_pk
+        ).scalar_subquery(),
+        assets=estate_json(Asset, Asset.will_to, Beneficiary.uuid_pk),
+        monetary_totals=monetary_totals(),
+        monetaries=estate_json(
+            Monetary, Monetary.will_to, Beneficiary.uuid_pk
+        )
+    )
+    return select(
+        Beneficiary.uuid_pk, cast(report, Text).label("report")
+    ).select_from(User).outerjoin(
+        Beneficiary, Beneficiary.added_by == User.uuid_pk
+    ).where(User.uuid_pk == grantor_id).order_by(
+        Beneficiary.created_at, Beneficiary.uuid_pk
+    ).execution_options(yield_per=settings.STREAM_BATCH_SIZE)
+
+
+def report_entries(first: Row, rest) -> Iterator[str]:
+    """Yield the report entries, skipping a grantor's empty row."""
+    for uuid_pk, report in chain([first], rest):
+        if uuid_pk is not None:
+            yield report
+
+
+async def areport_entries(first: Row, rest: AsyncResult) -> AsyncIterator[str]:
+    """Yield the report entries of an async result."""
+    if first.uuid_pk is not None:
+        yield first.report
+    async for uuid_pk, report in rest:
+        yield report
 
 
 class BeneficiaryRepo:
@@ -22,6 +110,23 @@ class BeneficiaryRepo:
         self.sess.commit()
         return True
 
+    def add_beneficiaries(
+        self, added_by: UUID, data: List
+    ) -> List[Dict[str, Any]]:
+        """
+        Add several beneficiaries in one transaction.
+
+        Args:
+            added_by (UUID): The grantor unique identifier
+            data (List[AddBeneficiary]): The validated items
+        Returns:
+            The uuid_pk of every new row by item index
+        """
+        rows = batch_rows(data, added_by=added_by)
+        self.sess.execute(batch_insert(Beneficiary), rows)
+        self.sess.commit()
+        return created(rows)
+
     def get_beneficiary(
         self, uuid_pk: UUID, added_by: UUID
     ) -> Beneficiary | None:
@@ -34,26 +139,95 @@ class BeneficiaryRepo:
             return beneficiary
         return None
 
-    def get_all_beneficiaries(self, user_id: UUID) -> List[Beneficiary]:
+    def get_all_beneficiaries(
+        self, user_id: UUID, after: Keyset | None = None,
+        limit: int = None
+    ) -> List[Beneficiary] | None:
         """Retrieve all beneficiaries for a given user."""
-        user: User | None = self.sess.query(User).filter_by(
-            uuid_pk=user_id
-        ).first()
-        if user:
-            beneficiaries = user.beneficiaries
-            return beneficiaries
+        try:
+            return collect_owned(self.sess.execute(owned_by(
+                User, Beneficiary, Beneficiary.added_by, user_id, after, limit
+            )).all())
+        except DataError:
+            return None
+
+    def search_beneficiaries(
+        self, added_by: UUID, terms: str,
+        limit: int = settings.FUZZY_MATCH_LIMIT
+    ) -> List[Dict[str, Any]]:
+        """
+        Find a grantor's beneficiaries as their name is typed.
+
+        Args:
+            added_by (UUID): The grantor unique identifier
+            terms (str): What was typed so far
+            limit (int): The number of matches
+        Returns:
+            The matches and their score, best first
+        """
+        try:
+            trigram = trigram_search(self.sess)
+            result = self.sess.execute(fuzzy_statement(
+                Beneficiary, BENEFICIARY_NAME, added_by, terms, limit, trigram
+            ))
+            return [dict(row) for row in result.mappings()]
+        except DataError:
+            return []
+
+    def possible_duplicates(
+        self, added_by: UUID, data
+    ) -> List[Dict[str, Any]]:
+        """
+        Find the grantor's beneficiaries that look like the one being added.
+
+        Args:
+            added_by (UUID): The grantor unique identifier
+            data (AddBeneficiary): The beneficiary being added
+        Returns:
+            The look-alikes and their similarity, closest first
+        """
+        try:
+            trigram = trigram_search(self.sess)
+            result = self.sess.execute(duplicates_statement(
+                Beneficiary, BENEFICIARY_NAME, added_by, searchable_values(
+                    data.first_name, data.middle_name, data.last_name
+                ), settings.FUZZY_MATCH_LIMIT, trigram
+            ))
+            return [dict(row) for row in result.mappings()]
+        except DataError:
+            return []
+
+    def get_distribution(self, grantor_id: UUID) -> Iterator[str] | None:
+        """
+        Report what each of a grantor's beneficiaries receives.
+
+        Rows are fetched settings.STREAM_BATCH_SIZE at a time while the
+        returned iterator is consumed, so the session must stay open
+        until it is exhausted.
+
+        Args:
+            grantor_id (UUID): The grantor unique identifier
+        Returns:
+            The JSON encoded entries, None if the grantor does not exist
+        """
+        try:
+            result = self.sess.execute(distribution_statement(grantor_id))
+        except DataError:
+            return None
+        first = result.fetchone()
+        if first is None:
+            return None
+        return report_entries(first, result)
 
     def update_beneficiary(self, added_by: UUID, uuid_pk: UUID, data):
         """Update a beneficiary data."""
         try:
-            beneficiary = self.sess.query(Beneficiary).filter_by(
-                added_by=added_by,
-                uuid_pk=uuid_pk
-            )
-            if beneficiary.one():
-                beneficiary.update(data.dict(), synchronize_session=False)
+            beneficiary = self.sess.execute(update_returning(
+                Beneficiary, data, added_by=added_by, uuid_pk=uuid_pk
+            )).first()
+            if beneficiary:
                 self.sess.commit()
-                return beneficiary.one()
+                return beneficiary
             return None
         except DataError:
             return None
@@ -61,14 +235,216 @@ class BeneficiaryRepo:
     def delete_beneficiary(self, added_by: UUID, uuid_pk: UUID):
         """Delete a beneficiary."""
         try:
-            beneficiary = self.sess.query(Beneficiary).filter_by(
-                added_by=added_by,
-                uuid_pk=uuid_pk
-            )
-            if beneficiary.one():
-                beneficiary.delete()
+            deleted = self.sess.execute(delete_returning(
+                Beneficiary, added_by=added_by, uuid_pk=uuid_pk
+            )).first()
+            if deleted:
                 self.sess.commit()
                 return True
             return None
         except DataError:
             return None
+
+    def delete_beneficiaries(
+        self, added_by: UUID, uuid_pks: List[str]
+    ) -> List[str] | None:
+        """
+        Delete several beneficiaries in one transaction.
+
+        Args:
+            added_by (UUID): The grantor unique identifier
+            uuid_pks (List[str]): The beneficiary unique identifiers
+        Returns:
+            The ids that were not found, in which case nothing is deleted,
+            or None if an id is malformed
+        """
+        try:
+            deleted = self.sess.scalars(delete_returning(
+                Beneficiary, uuid_pks, added_by=added_by
+            )).all()
+        except DataError:
+            self.sess.rollback()
+            return None
+        missing = missing_ids(uuid_pks, deleted)
+        if missing:
+            self.sess.rollback()
+            return missing
+        self.sess.commit()
+        return missing
+
+
+class AsyncBeneficiaryRepo:
+    """Async beneficiary repository."""
+
+    def __init__(self, sess: AsyncSession) -> None:
+        """Initialize the repository."""
+        self.sess: AsyncSession = sess
+
+    async def add_beneficiary(self, beneficiary: Beneficiary) -> bool:
+        """Add a beneficiary."""
+        benef = Beneficiary(**beneficiary.dict())
+        self.sess.add(benef)
+        await self.sess.commit()
+        return True
+
+    async def add_beneficiaries(
+        self, added_by: UUID, data: List
+    ) -> List[Dict[str, Any]]:
+        """
+        Add several beneficiaries in one transaction.
+
+        Args:
+            added_by (UUID): The grantor unique identifier
+            data (List[AddBeneficiary]): The validated items
+        Returns:
+            The uuid_pk of every new row by item index
+        """
+        rows = batch_rows(data, added_by=added_by)
+        await self.sess.execute(batch_insert(Beneficiary), rows)
+        await self.sess.commit()
+        return created(rows)
+
+    async def get_beneficiary(
+        self, uuid_pk: UUID, added_by: UUID
+    ) -> Beneficiary | None:
+        """Retrieve a beneficiary for a given user."""
+        return await self.sess.scalar(
+            select(Beneficiary).filter_by(added_by=added_by, uuid_pk=uuid_pk)
+        )
+
+    async def get_all_beneficiaries(
+        self, user_id: UUID, after: Keyset | None = None,
+        limit: int = None
+    ) -> List[Beneficiary] | None:
+        """Retrieve all beneficiaries for a given user."""
+        try:
+            result = await self.sess.execute(owned_by(
+                User, Beneficiary, Beneficiary.added_by, user_id, after, limit
+            ))
+            return collect_owned(result.all())
+        except DataError:
+            return None
+
+    async def search_beneficiaries(
+        self, added_by: UUID, terms: str,
+        limit: int = settings.FUZZY_MATCH_LIMIT
+    ) -> List[Dict[str, Any]]:
+        """
+        Find a grantor's beneficiaries as their name is typed.
+
+        Args:
+            added_by (UUID): The grantor unique identifier
+            terms (str): What was typed so far
+            limit (int): The number of matches
+        Returns:
+            The matches and their score, best first
+        """
+        try:
+            trigram = await self.sess.run_sync(trigram_search)
+            result = await self.sess.execute(fuzzy_statement(
+                Beneficiary, BENEFICIARY_NAME, added_by, terms, limit, trigram
+            ))
+            return [dict(row) for row in result.mappings()]
+        except DataError:
+            return []
+
+    async def possible_duplicates(
+        self, added_by: UUID, data
+    ) -> List[Dict[str, Any]]:
+        """
+        Find the grantor's beneficiaries that look like the one being added.
+
+        Args:
+            added_by (UUID): The grantor unique identifier
+            data (AddBeneficiary): The beneficiary being added
+        Returns:
+            The look-alikes and their similarity, closest first
+        """
+        try:
+            trigram = await self.sess.run_sync(trigram_search)
+            result = await self.sess.execute(duplicates_statement(
+                Beneficiary, BENEFICIARY_NAME, added_by, searchable_values(
+                    data.first_name, data.middle_name, data.last_name
+                ), settings.FUZZY_MATCH_LIMIT, trigram
+            ))
+            return [dict(row) for row in result.mappings()]
+        except DataError:
+            return []
+
+    async def get_distribution(
+        self, grantor_id: UUID
+    ) -> AsyncIterator[str] | None:
+        """
+        Report what each of a grantor's beneficiaries receives.
+
+        Rows are streamed settings.STREAM_BATCH_SIZE at a time while the
+        returned iterator is consumed, so the session must stay open
+        until it is exhausted.
+
+        Args:
+            grantor_id (UUID): The grantor unique identifier
+        Returns:
+            The JSON encoded entries, None if the grantor does not exist
+        """
+        try:
+            result = await self.sess.stream(distribution_statement(grantor_id))
+        except DataError:
+            return None
+        first = await result.fetchone()
+        if first is None:
+            return None
+        return areport_entries(first, result)
+
+    async def update_beneficiary(self, added_by: UUID, uuid_pk: UUID, data):
+        """Update a beneficiary data."""
+        try:
+            result = await self.sess.execute(update_returning(
+                Beneficiary, data, added_by=added_by, uuid_pk=uuid_pk
+            ))
+            beneficiary = result.first()
+            if beneficiary:
+                await self.sess.commit()
+                return beneficiary
+            return None
+        except DataError:
+            return None
+
+    async def delete_beneficiary(self, added_by: UUID, uuid_pk: UUID):
+        """Delete a beneficiary."""
+        try:
+            result = await self.sess.execute(delete_returning(
+                Beneficiary, added_by=added_by, uuid_pk=uuid_pk
+            ))
+            if result.first():
+                await self.sess.commit()
+                return True
+            return None
+        except DataError:
+            return None
+
+    async def delete_beneficiaries(
+        self, added_by: UUID, uuid_pks: List[str]
+    ) -> List[str] | None:
+        """
+        Delete several beneficiaries in one transaction.
+
+        Args:
+            added_by (UUID): The grantor unique identifier
+            uuid_pks (List[str]): The beneficiary unique identifiers
+        Returns:
+            The ids that were not found, in which case nothing is deleted,
+            or None if an id is malformed
+        """
+        try:
+            deleted = (await self.sess.scalars(delete_returning(
+                Beneficiary, uuid_pks, added_by=added_by
+            ))).all()
+        except DataError:
+            await self.sess.rollback()
+            return None
+        missing = missing_ids(uuid_pks, deleted)
+        if missing:
+            await self.sess.rollback()
+            return missing
+        await self.sess.commit()
+        return missing
@@ -0,0 +1,385 @@
+#!/usr/bin/python3
+"""
+Document metadata for Estate Trust.
+
+Every document has a row in the documents table naming its owner, its
+asset or monetary asset and where it is stored, so a download is one
+index lookup on the storage key rather than a scan of the upload
+directory. backfill_documents indexes the files stored before the table
+existed.
+
+Uploads are stored once per content, under the ab/cd/<sha256> key of
+their blob. The document rows are the blob's references, counted by the
+triggers of the DocumentBlob model: uploading a duplicate only adds a
+reference, and a blob whose last reference is gone is swept, its file
+removed, right away on a re-upload and by "documents gc" otherwise.
+"""
+
+import hashlib
+import mimetypes
+import os
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Tuple
+from uuid import UUID
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import (
+    BigInteger, Delete, Insert, Row, Select, String, case, cast, column,
+    delete, exists, func, insert, literal, select, update, values
+)
+from sqlalchemy.exc import DataError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from api.v1.models.data.assets import Asset, Monetary
+from api.v1.models.data.documents import Document, DocumentBlob, PgUUID
+from api.v1.models.data.users import User
+from api.v1.utils.documents import PARTIAL_PREFIX, remove_blob, store_blob
+
+# kind: (parent model, documents column referencing it)
+PARENTS = {
+    "assets": (Asset, "asset_id"),
+    "monetaries": (Monetary, "monetary_id"),
+}
+# Files indexed per statement, and transaction, by the backfill
+BACKFILL_BATCH = 500
+
+# A scanned file: storage key, owner named by the file, size, content
+# type and SHA-256.
+Found = Tuple[str, str | None, int, str, str]
+
+
+def attach_statement(
+    kind: str, owner_id: UUID, parent_id: UUID, document: Dict[str, Any]
+) -> Select:
+    """
+    Point the parent at a received document, in one statement.
+
+    The parent's previous document is dropped and the new one recorded
+    under the storage key of its content, that of an existing blob with
+    the same SHA-256 if there is one. The owner check is part of the
+    parent's UPDATE, so nothing changes for a missing parent or one
+    belonging to someone else.
+
+    Args:
+        kind (str): A key of PARENTS
+        owner_id (UUID): The grantor unique identifier
+        parent_id (UUID): The asset or monetary asset unique identifier
+        document (dict): The received filename, size, sha256 and
+            content_type
+    Returns:
+        The statement selecting the new document row, with the SHA-256
+        of the documents it replaced as released
+    """
+    model, parent_column = PARENTS[kind]
+    storage_key = func.coalesce(
+        select(DocumentBlob.storage_key).where(
+            DocumentBlob.sha256 == document["sha256"]
+        ).scalar_subquery(),
+        document["filename"]
+    )
+    parent = update(model).where(
+        model.uuid_pk == parent_id, model.owner_id == owner_id
+    ).values(
+        document=storage_key, updated_at=func.now()
+    ).returning(model.uuid_pk, model.owner_id, model.document).cte("parent")
+    released = delete(Document).where(
+        getattr(Document, parent_column).in_(select(parent.c.uuid_pk))
+    ).returning(Document.sha256).cte("released")
+    added = insert(Document).from_select(
+        [
+            "owner_id", parent_column, "storage_key", "size",
+            "content_type", "sha256"
+        ],
+        select(
+            parent.c.owner_id, parent.c.uuid_pk, parent.c.document,
+            literal(document["size"], BigInteger),
+            literal(document["content_type"]), literal(document["sha256"])
+        )
+    ).returning(*Document.__table__.c).cte("added")
+    return select(added, select(
+        func.array_agg(released.c.sha256)
+    ).scalar_subquery().label("released"))
+
+
+def find_statement(owner_id: UUID, storage_key: str):
+    """Select an owner's document by its storage key."""
+    return select(*Document.__table__.c).where(
+        Document.storage_key == storage_key,
+        Document.owner_id == owner_id
+    ).limit(1)
+
+
+def sweep_statement(sha256s: List[str] | None = None) -> Delete:
+    """Delete the blobs nothing references, all or among sha256s."""
+    stmt = delete(DocumentBlob).where(DocumentBlob.ref_count <= 0)
+    if sha256s is not None:
+        stmt = stmt.where(DocumentBlob.sha256.in_(sha256s))
+    return stmt.returning(DocumentBlob.storage_key)
+
+
+def named_owner(filename: str) -> str | None:
+    """Return the grantor a stored filename starts with, if any."""
+    prefix = filename.partition("_")[0]
+    try:
+        return str(UUID(prefix))
+    except ValueError:
+        return None
+
+
+def scan_documents(directory: str) -> Iterator[Found]:
+    """
+    Describe every complete file under directory, checksumming it.
+
+    Args:
+        directory (str): The upload directory
+    Returns:
+        The found files, their storage keys relative to directory
+    """
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.startswith(PARTIAL_PREFIX):
+                continue
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                sha256 = hashlib.file_digest(f, "sha256").hexdigest()
+            key = os.path.relpath(path, directory).replace(os.sep, "/")
+            yield (
+                key, named_owner(name), os.path.getsize(path),
+                mimetypes.guess_type(name)[0] or "application/octet-stream",
+                sha256
+            )
+
+
+def found_values(batch: List[Found]):
+    """Wrap scanned files in a VALUES list."""
+    return values(
+        column("storage_key", String), column("owner_id", PgUUID),
+        column("size", BigInteger), column("content_type", String),
+        column("sha256", String),
+        name="found"
+    ).data(batch)
+
+
+def backfill_statement(found) -> Insert:
+    """
+    Record the scanned files that are not indexed yet.
+
+    A file referenced by an asset or monetary asset belongs to its owner;
+    one referenced by neither to the grantor its name starts with, if
+    that grantor still exists, and is left out otherwise.
+    """
+    owner = func.coalesce(Asset.owner_id, Monetary.owner_id, User.uuid_pk)
+    return insert(Document).from_select(
+        [
+            "owner_id", "asset_id", "monetary_id", "storage_key", "size",
+            "content_type", "sha256"
+        ],
+        select(
+            owner, Asset.uuid_pk,
+            case((Asset.uuid_pk.is_(None), Monetary.uuid_pk)),
+            found.c.storage_key, found.c.size, found.c.content_type,
+            found.c.sha256
+        ).select_from(found).outerjoin(
+            Asset, Asset.document == found.c.storage_key
+        ).outerjoin(
+            Monetary, Monetary.document == found.c.storage_key
+        ).outerjoin(
+            # Cast, as a batch of NULLs leaves the column untyped
+            User, User.uuid_pk == cast(found.c.owner_id, PgUUID)
+        ).where(owner.is_not(None), ~exists().where(
+            Document.storage_key == found.c.storage_key
+        )).distinct(found.c.storage_key)
+    ).returning(Document.storage_key)
+
+
+def backfill_documents(sess: Session, directory: str) -> Dict[str, Any]:
+    """
+    Index the files of the upload directory.
+
+    Files already indexed are skipped, so the backfill can be run again,
+    e.g. after an interruption; each batch is committed as it goes.
+
+    Args:
+        sess (Session): The database session
+        directory (str): The upload directory
+    Returns:
+        The number of files scanned and indexed, and the storage keys of
+        the files no grantor could be found for
+    """
+    scanned, indexed, unattributed = 0, 0, []
+    files = scan_documents(directory)
+    while batch := list(islice(files, BACKFILL_BATCH)):
+        found = found_values(batch)
+        indexed += len(sess.scalars(backfill_statement(found)).all())
+        unattributed.extend(sess.scalars(
+            select(found.c.storage_key).where(~exists().where(
+                Document.storage_key == found.c.storage_key
+            ))
+        ))
+        sess.commit()
+        scanned += len(batch)
+    return {
+        "scanned": scanned, "indexed": indexed,
+        "unattributed": unattributed
+    }
+
+
+class DocumentRepository:
+    """Document metadata repository."""
+
+    def __init__(self, sess: Session) -> None:
+        """Initialize the repository."""
+        self.sess: Session = sess
+
+    def attach_document(
+        self, owner_id: UUID, kind: str, parent_id: UUID,
+        document: Dict[str, Any]
+    ) -> Row | None:
+        """
+        Attach a received document to an asset or monetary asset.
+
+        The file is stored while its blob row is locked, before the
+        reference is committed, unless the blob's file is already there;
+        the blob of the replaced document is swept if that was its last
+        reference.
+
+        Args:
+            owner_id (UUID): The grantor unique identifier
+            kind (str): A key of PARENTS
+            parent_id (UUID): The asset or monetary asset unique identifier
+            document (dict): The received upload, filename, size, sha256
+                and content_type
+        Returns:
+            The document row if successful, None if the grantor has no
+            such asset, in which case the upload is left in place
+        """
+        try:
+            row = self.sess.execute(attach_statement(
+                kind, owner_id, parent_id, document
+            )).first()
+        except DataError:
+            row = None
+        if row is None:
+            self.sess.rollback()
+            return None
+        store_blob(document["upload"], row.storage_key)
+        self.sess.commit()
+        if row.released:
+            self.sweep_blobs(row.released)
+        return row
+
+    def sweep_blobs(self, sha256s: List[str] | None = None) -> List[str]:
+        """
+        Remove the blobs nothing references any more, with their files.
+
+        Args:
+            sha256s (list): Only consider these blobs, all if None
+        Returns:
+            The storage keys removed
+        """
+        keys = self.sess.scalars(sweep_statement(sha256s)).all()
+        for key in keys:
+            remove_blob(key)
+        self.sess.commit()
+        return keys
+
+    def find_document(self, owner_id: UUID, storage_key: str) -> Row | None:
+        """
+        Look up a grantor's document by its storage key.
+
+        Args:
+            owner_id (UUID): The grantor unique identifier
+            storage_key (str): The document's storage key
+        Returns:
+            The document row if found, None otherwise
+        """
+        try:
+            return self.sess.execute(
+                find_statement(owner_id, storage_key)
+            ).first()
+        except DataError:
+            return None
+
+
+class AsyncDocumentRepository:
+    """Async document metadata repository."""
+
+    def __init__(self, sess: AsyncSession) -> None:
+        """Initialize the repository."""
+        self.sess: AsyncSession = sess
+
+    async def attach_document(
+        self, owner_id: UUID, kind: str, parent_id: UUID,
+        document: Dict[str, Any]
+    ) -> Row | None:
+        """
+        Attach a received document to an asset or monetary asset.
+
+        The file is stored on the threadpool while its blob row is
+        locked, before the reference is committed, unless the blob's
+        file is already there; the blob of the replaced document is swept
+        if that was its last reference.
+
+        Args:
+            owner_id (UUID): The grantor unique identifier
+            kind (str): A key of PARENTS
+            parent_id (UUID): The asset or monetary asset unique identifier
+            document (dict): The received upload, filename, size, sha256
+                and content_type
+        Returns:
+            The document row if successful, None if the grantor has no
+            such asset, in which case the upload is left in place
+        """
+        try:
+            result = await self.sess.execute(attach_statement(
+                kind, owner_id, parent_id, document
+            ))
+            row = result.first()
+        except DataError:
+            row = None
+        if row is None:
+            await self.sess.rollback()
+            return None
+        await run_in_threadpool(
+            store_blob, document["upload"], row.storage_key
+        )
+        await self.sess.commit()
+        if row.released:
+            await self.sweep_blobs(row.released)
+        return row
+
+    async def sweep_blobs(
+        self, sha256s: List[str] | None = None
+    ) -> List[str]:
+        """
+        Remove the blobs nothing references any more, with their files.
+
+        Args:
+            sha256s (list): Only consider these blobs, all if None
+        Returns:
+            The storage keys removed
+        """
+        keys = (await self.sess.scalars(sweep_statement(sha256s))).all()
+        for key in keys:
+            await run_in_threadpool(remove_blob, key)
+        await self.sess.commit()
+        return keys
+
+    async def find_document(
+        self, owner_id: UUID, storage_key: str
+    ) -> Row | None:
+        """
+        Look up a grantor's document by its storage key.
+
+        Args:
+            owner_id (UUID): The grantor unique identifier
+            storage_key (str): The document's storage key
+        Returns:
+            The document row if found, None otherwise
+        """
+        try:
+            result = await self.sess.execute(
+                find_statement(owner_id, storage_key)
+            )
+            return result.first()
+        except DataError:
+            return None
@@ -0,0 +1,311 @@
+#!/usr/bin/python3
+"""
+Bulk CSV imports for Estate Trust.
+
+An import reads the CSV a chunk of settings.IMPORT_CHUNK_SIZE rows at a
+time, validates every row against the schema of the create routes, and
+COPYs the valid ones into a temporary staging table. The staged rows are
+checked against the grantor's beneficiaries, then merged into the real
+table in one INSERT ... SELECT. Any invalid row fails the whole import,
+so a corrected file can simply be imported again.
+"""
+
+import csv
+from enum import Enum
+from io import StringIO
+from itertools import islice
+from types import NoneType
+from typing import Any, Dict, Iterator, List, TextIO, Tuple, get_args
+from uuid import UUID
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from api.v1.configurations.settings import settings
+from api.v1.models.data.assets import Asset, Monetary
+from api.v1.models.data.users import Beneficiary
+from api.v1.models.schemas.assets import AddAsset, AddMonetary
+from api.v1.models.schemas.users import AddBeneficiary
+
+# kind: (imported model, row schema, imported columns, owner column)
+IMPORTS = {
+    "assets": (
+        Asset, AddAsset, ("name", "location", "will_to", "note"),
+        "owner_id"
+    ),
+    "monetaries": (
+        Monetary, AddMonetary, (
+            "acc_name", "acc_number", "amount", "currency", "bank_name",
+            "will_to", "note"
+        ), "owner_id"
+    ),
+    "beneficiaries": (
+        Beneficiary, AddBeneficiary,
+        ("first_name", "middle_name", "last_name", "relation"), "added_by"
+    ),
+}
+STAGING = "import_staging"
+
+# A staged row: its line in the file, then the imported columns.
+Record = Tuple[Any, ...]
+
+
+def row_error(line: int, field: str | None, message: str) -> Dict[str, Any]:
+    """Build one entry of the error report."""
+    return {"line": line, "errors": [{"field": field, "message": message}]}
+
+
+def staged_value(name: str, value: Any) -> Any:
+    """Convert a validated field to the value COPYed into staging."""
+    if isinstance(value, Enum):
+        return value.value
+    if name == "will_to":
+        return UUID(value)
+    return value
+
+
+def validate_row(
+    schema: type[BaseModel], columns: Tuple[str, ...],
+    line: int, row: Dict[str, str | None]
+) -> Record:
+    """
+    Validate one CSV row against the create schema.
+
+    A blank or missing cell leaves an optional field empty and a
+    required one missing.
+
+    Args:
+        schema (type): The create schema, e.g. AddAsset
+        columns (tuple): The imported columns
+        line (int): The line the row ends on
+        row (dict): The row by lower-cased header
+    Returns:
+        The staged record
+    Raises:
+        ValidationError: If the row does not validate
+        ValueError: If will_to is not a UUID
+    """
+    values = {}
+    for name in columns:
+        value = (row.get(name) or "").strip()
+        if value:
+            values[name] = value
+        elif NoneType in get_args(schema.model_fields[name].annotation):
+            values[name] = ""
+    item = schema(**values)
+    return (line,) + tuple(
+        staged_value(name, getattr(item, name)) for name in columns
+    )
+
+
+def validate_chunks(
+    stream: TextIO, kind: str
+) -> Iterator[Tuple[List[Record], List[Dict[str, Any]]]]:
+    """
+    Parse and validate a CSV a chunk at a time.
+
+    Args:
+        stream (TextIO): The CSV, opened with newline=""
+        kind (str): A key of IMPORTS
+    Returns:
+        The (valid records, errors) of every chunk of rows, blank lines
+        skipped; a malformed file ends with the error of the line it
+        stopped at
+    """
+    _, schema, columns, _ = IMPORTS[kind]
+    reader = csv.reader(stream)
+    try:
+        header = [name.strip().lower() for name in next(reader, [])]
+        while True:
+            records, errors, read = [], [], 0
+            for cells in islice(reader, settings.IMPORT_CHUNK_SIZE):
+                read += 1
+                if not any(cells):
+                    continue
+                row = dict(zip(header, cells))
+                try:
+                    records.append(
+                        validate_row(schema, columns, reader.line_num, row)
+                    )
+                except ValidationError as exc:
+                    errors.append({"line": reader.line_num, "errors": [
+                        {"field": ".".join(map(str, error["loc"])),
+                         "message": error["msg"]}
+                        for error in exc.errors()
+                    ]})
+                except ValueError:
+                    errors.append(row_error(
+                        reader.line_num, "will_to", "not a valid UUID"
+                    ))
+            if not read:
+                return
+            yield records, errors
+    except (csv.Error, UnicodeDecodeError) as exc:
+        yield [], [row_error(reader.line_num + 1, None, str(exc))]
+
+
+def staging_statement(kind: str):
+    """Create the staging table, typed like the imported columns."""
+    model, _, columns, _ = IMPORTS[kind]
+    return text(
+        f"CREATE TEMP TABLE {STAGING} ON COMMIT DROP AS "
+        f"SELECT 0 AS line, {', '.join(columns)} "
+        f"FROM {model.__tablename__} WITH NO DATA"
+    )
+
+
+def copy_statement(kind: str) -> str:
+    """COPY CSV into staging, empty fields staying empty strings."""
+    columns = ", ".join(IMPORTS[kind][2])
+    return (
+        f"COPY {STAGING} (line, {columns}) FROM STDIN "
+        f"WITH (FORMAT csv, FORCE_NOT_NULL ({columns}))"
+    )
+
+
+def unowned_statement(kind: str):
+    """Select the lines willed to someone the grantor did not add."""
+    if "will_to" not in IMPORTS[kind][2]:
+        return None
+    return text(
+        f"SELECT line FROM {STAGING} AS staged WHERE NOT EXISTS ("
+        f"SELECT 1 FROM {Beneficiary.__tablename__} AS heir "
+        "WHERE heir.uuid_pk = staged.will_to AND heir.added_by = :owner"
+        ") ORDER BY line"
+    )
+
+
+def merge_statement(kind: str):
+    """Insert the staged rows for the grantor, in file order."""
+    model, _, columns, owner_column = IMPORTS[kind]
+    columns = ", ".join(columns)
+    return text(
+        f"INSERT INTO {model.__tablename__} ({columns}, {owner_column}) "
+        f"SELECT {columns}, :owner FROM {STAGING} ORDER BY line"
+    )
+
+
+def csv_buffer(records: List[Record]) -> StringIO:
+    """Write records as CSV, ready to be COPYed."""
+    buffer = StringIO()
+    csv.writer(buffer).writerows(records)
+    buffer.seek(0)
+    return buffer
+
+
+def import_report(
+    imported: int, errors: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Summarize an import.
+
+    Args:
+        imported (int): The number of rows imported
+        errors (list): The errors of every invalid row, in line order
+    Returns:
+        The imported and invalid row counts, with the first
+        settings.IMPORT_ERROR_LIMIT errors
+    """
+    return {
+        "imported": imported,
+        "invalid": len(errors),
+        "errors": errors[:settings.IMPORT_ERROR_LIMIT],
+    }
+
+
+class ImportRepository:
+    """CSV import repository."""
+
+    def __init__(self, sess: Session) -> None:
+        """Initialize the repository."""
+        self.sess: Session = sess
+
+    def import_csv(
+        self, owner_id: UUID, kind: str, stream: TextIO
+    ) -> Dict[str, Any]:
+        """
+        Import a CSV of assets, monetary assets or beneficiaries.
+
+        Args:
+            owner_id (UUID): The grantor unique identifier
+            kind (str): A key of IMPORTS
+            stream (TextIO): The CSV, header first, opened with newline=""
+        Returns:
+            The import report; nothing is imported if any row is invalid
+        """
+        self.sess.execute(staging_statement(kind))
+        cursor = self.sess.connection().connection.cursor()
+        errors = []
+        for records, chunk_errors in validate_chunks(stream, kind):
+            errors.extend(chunk_errors)
+            if records and not errors:
+                cursor.copy_expert(copy_statement(kind), csv_buffer(records))
+        unowned = unowned_statement(kind)
+        if not errors and unowned is not None:
+            errors = [
+                row_error(line, "will_to", "unknown beneficiary")
+                for line in self.sess.scalars(unowned, {"owner": owner_id})
+            ]
+        if errors:
+            self.sess.rollback()
+            return import_report(0, errors)
+        imported = self.sess.execute(
+            merge_statement(kind), {"owner": owner_id}
+        ).rowcount
+        self.sess.commit()
+        return import_report(imported, [])
+
+
+class AsyncImportRepository:
+    """Async CSV import repository."""
+
+    def __init__(self, sess: AsyncSession) -> None:
+        """Initialize the repository."""
+        self.sess: AsyncSession = sess
+
+    async def import_csv(
+        self, owner_id: UUID, kind: str, stream: TextIO
+    ) -> Dict[str, Any]:
+        """
+        Import a CSV of assets, monetary assets or beneficiaries.
+
+        The file is parsed and validated on the threadpool, a chunk per
+        hop, and the records are COPYed in asyncpg's binary format.
+
+        Args:
+            owner_id (UUID): The grantor unique identifier
+            kind (str): A key of IMPORTS
+            stream (TextIO): The CSV, header first, opened with newline=""
+        Returns:
+            The import report; nothing is imported if any row is invalid
+        """
+        await self.sess.execute(staging_statement(kind))
+        conn = await self.sess.connection()
+        raw = await conn.get_raw_connection()
+        columns = ("line",) + IMPORTS[kind][2]
+        chunks = validate_chunks(stream, kind)
+        errors = []
+        while chunk := await run_in_threadpool(next, chunks, None):
+            records, chunk_errors = chunk
+            errors.extend(chunk_errors)
+            if records and not errors:
+                await raw.driver_connection.copy_records_to_table(
+                    STAGING, records=records, columns=columns
+                )
+        unowned = unowned_statement(kind)
+        if not errors and unowned is not None:
+            errors = [
+                row_error(line, "will_to", "unknown beneficiary")
+                for line in await self.sess.scalars(
+                    unowned, {"owner": owner_id}
+                )
+            ]
+        if errors:
+            await self.sess.rollback()
+            return import_report(0, errors)
+        result = await self.sess.execute(
+            merge_statement(kind), {"owner": owner_id}
+        )
+        await self.sess.commit()
+        return import_report(result.rowcount, [])
@@ -1,12 +1,71 @@
 #!/usr/bin/python3
 """Monetaries repository for Estate Trust."""
 
-from typing import List
+from typing import Any, Dict, List
 from uuid import UUID
+from sqlalchemy import Row, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import DataError, IntegrityError
 from api.v1.models.data.users import Beneficiary, User
 from api.v1.models.data.assets import Monetary
+from api.v1.repositories.base import (
+    Keyset, batch_insert, batch_rows, collect_owned, created, delete_returning,
+    heir_errors, heirs_statement, missing_ids, normalize_ids, owned_by,
+    update_returning
+)
+
+
+def totals_statement(owner_id: UUID):
+    """
+    Sum a grantor's monetary assets per currency and per beneficiary.
+
+    Both levels come from one scan through GROUPING SETS; grouping()
+    tells the per-currency rows from the per-beneficiary ones. The outer
+    join from users keeps a grantor without accounts apart from a
+    missing grantor, who yields no rows at all.
+    """
+    return select(
+        func.grouping(Monetary.will_to).label("grantor_level"),
+        Monetary.will_to, Monetary.currency,
+        func.sum(Monetary.amount).label("amount"),
+        func.count(Monetary.uuid_pk).label("accounts")
+    ).select_from(User).outerjoin(
+        Monetary, Monetary.owner_id == User.uuid_pk
+    ).where(User.uuid_pk == owner_id).group_by(func.grouping_sets(
+        tuple_(Monetary.currency),
+        tuple_(Monetary.will_to, Monetary.currency)
+    )).order_by(Monetary.will_to, Monetary.currency)
+
+
+def collect_totals(
+    owner_id: UUID, rows: List[Row]
+) -> Dict[str, Any] | None:
+    """
+    Shape the rows of totals_statement like EstateTotals.
+
+    Args:
+        owner_id (UUID): The grantor unique identifier
+        rows: The grouped rows
+    Returns:
+        The totals, or None if the grantor does not exist
+    """
+    if not rows:
+        return None
+    totals = {"grantor_id": str(owner_id), "totals": [], "beneficiaries": []}
+    for row in rows:
+        if not row.accounts:
+            continue
+        total = {
+            "currency": row.currency, "amount": row.amount,
+            "accounts": row.accounts
+        }
+        if row.grantor_level:
+            totals["totals"].append(total)
+        else:
+            total["beneficiary_id"] = row.will_to
+            totals["beneficiaries"].append(total)
+    return totals
 
 
 class MonetaryRepository:
@@ -33,43 +92,89 @@ class MonetaryRepository:
         except IntegrityError:
             return False
 
+    def add_monetary_assets(
+        self, owner_id: UUID, data: List
+    ) -> List[Dict[str, Any]]:
+        """
+        Add several monetary assets in one transaction.
+
+        Every item must be willed to one of the grantor's beneficiaries.
+
+        Args:
+            owner_id (UUID): The grantor unique identifier
+            data (List[AddMonetary]): The validated items
+        Returns:
+            The uuid_pk of every new row by item index, or the errors of the
+            invalid items, in which case nothing is inserted
+        """
+        will_to = normalize_ids(item.will_to for item in data)
+        owned = set(self.sess.scalars(
+            heirs_statement(owner_id, will_to)
+        ))
+        errors = heir_errors(will_to, owned)
+        if errors:
+            return errors
+        rows = batch_rows(data, owner_id=owner_id)
+        self.sess.execute(batch_insert(Monetary), rows)
+        self.sess.commit()
+        return created(rows)
+
     def get_all_monetary_assets_for_grantor(
-        self, grantor_id: UUID
+        self, grantor_id: UUID, after: Keyset | None = None,
+        limit: int = None
     ) -> List[Monetary] | None:
         """
         Retrieve all the assets for a given grantor.
 
         Args:
             grantor_id (UUID): The grantor unique identifier
+            after (Keyset): Start after this (created_at, uuid_pk)
+            limit (int): The page size, plus one lookahead row
         Returns:
             Return list of monetary assets, None otherwise.
         """
         try:
-            user = self.sess.query(User).filter(
-                User.uuid_pk == grantor_id
-            ).first()
-            monetaries = user.monetaries
-            return monetaries
+            return collect_owned(self.sess.execute(owned_by(
+                User, Monetary, Monetary.owner_id, grantor_id, after, limit
+            )).all())
         except DataError:
             return None
 
     def get_all_monetary_assets_for_beneficiary(
-        self, will_to: UUID
+        self, will_to: UUID, after: Keyset | None = None,
+        limit: int = None
     ) -> List[Monetary] | None:
         """
         Retrieve all the monetary assets for a beneficiary.
 
         Args:
             will_to (UUID): The beneficiary unique identifier
+            after (Keyset): Start after this (created_at, uuid_pk)
+            limit (int): The page size, plus one lookahead row
         Returns:
             Return list of monetary assets, None otherwise.
         """
         try:
-            beneficiary = self.sess.query(Beneficiary).filter_by(
-                uuid_pk=will_to
-            ).first()
-            monetaries = beneficiary.money
-            return monetaries
+            return collect_owned(self.sess.execute(owned_by(
+                Beneficiary, Monetary, Monetary.will_to, will_to, after, limit
+            )).all())
+        except DataError:
+            return None
+
+    def get_estate_totals(self, grantor_id: UUID) -> Dict[str, Any] | None:
+        """
+        Sum a grantor's monetary assets in a single query.
+
+        Args:
+            grantor_id (UUID): The grantor unique identifier
+        Returns:
+            The per currency and per beneficiary totals, None if the
+            grantor does not exist
+        """
+        try:
+            return collect_totals(grantor_id, self.sess.execute(
+                totals_statement(grantor_id)
+            ).all())
         except DataError:
             return None
 
@@ -101,16 +206,16 @@ class MonetaryRepository:
             asset_id (UUID): The asset identifier
             data (dict): The data to be updated
         Returns:
-            Return True if the asset was successfully updated, False otherwise
+            Return the updated asset if successful, False otherwise
         """
         try:
-            monetary = self.sess.query(Monetary).filter_by(
-                owner_id=grantor_id,
-                uuid_pk=asset_id
-            )
-            monetary.update(data.dict(), synchronize_session=False)
-            self.sess.commit()
-            return monetary.first()
+            monetary = self.sess.execute(update_returning(
+                Monetary, data, owner_id=grantor_id, uuid_pk=asset_id
+            )).first()
+            if monetary:
+                self.sess.commit()
+                return monetary
+            return False
         except DataError:
             return False
 
@@ -125,12 +230,245 @@ class MonetaryRepository:
             Return True if the asset was successfully deleted, False otherwise
         """
         try:
-            monetary = self.sess.query(Monetary).filter_by(
-                owner_id=grantor_id,
-                uuid_pk=asset_id
-            )
-            monetary.delete()
-            self.sess.commit()
+            deleted = self.sess.execute(delete_returning(
+                Monetary, owner_id=grantor_id, uuid_pk=asset_id
+            )).first()
+            if deleted:
+                self.sess.commit()
+                return True
+            return False
+        except DataError:
+            return False
+
+    def delete_assets(
+        self, grantor_id: UUID, asset_ids: List[str]
+    ) -> List[str] | None:
+        """
+        Delete several monetary assets in one transaction.
+
+        Args:
+            grantor_id (UUID): The grantor unique identifier
+            asset_ids (List[str]): The asset unique identifiers
+        Returns:
+            The ids that were not found, in which case nothing is deleted,
+            or None if an id is malformed
+        """
+        try:
+            deleted = self.sess.scalars(delete_returning(
+                Monetary, asset_ids, owner_id=grantor_id
+            )).all()
+        except DataError:
+            self.sess.rollback()
+            return None
+        missing = missing_ids(asset_ids, deleted)
+        if missing:
+            self.sess.rollback()
+            return missing
+        self.sess.commit()
+        return missing
+
+
+class AsyncMonetaryRepository:
+    """Async monetary repository."""
+
+    def __init__(self, sess: AsyncSession) -> None:
+        """Initialize the repository."""
+        self.sess: AsyncSession = sess
+
+    async def add_monetary_asset(self, data) -> bool:
+        """
+        Add a new monetary asset.
+
+        Args:
+            data (dict): The data to add
+        Returns:
+            return True if successful, False otherwise
+        """
+        try:
+            asset = Monetary(**data.dict())
+            self.sess.add(asset)
+            await self.sess.commit()
             return True
+        except IntegrityError:
+            return False
+
+    async def add_monetary_assets(
+        self, owner_id: UUID, data: List
+    ) -> List[Dict[str, Any]]:
+        """
+        Add several monetary assets in one transaction.
+
+        Every item must be willed to one of the grantor's beneficiaries.
+
+        Args:
+            owner_id (UUID): The grantor unique identifier
+            data (List[AddMonetary]): The validated items
+        Returns:
+            The uuid_pk of every new row by item index, or the errors of the
+            invalid items, in which case nothing is inserted
+        """
+        will_to = normalize_ids(item.will_to for item in data)
+        owned = set(await self.sess.scalars(
+            heirs_statement(owner_id, will_to)
+        ))
+        errors = heir_errors(will_to, owned)
+        if errors:
+            return errors
+        rows = batch_rows(data, owner_id=owner_id)
+        await self.sess.execute(batch_insert(Monetary), rows)
+        await self.sess.commit()
+        return created(rows)
+
+    async def get_all_monetary_assets_for_grantor(
+        self, grantor_id: UUID, after: Keyset | None = None,
+        limit: int = None
+    ) -> List[Monetary] | None:
+        """
+        Retrieve all the assets for a given grantor.
+
+        Args:
+            grantor_id (UUID): The grantor unique identifier
+            after (Keyset): Start after this (created_at, uuid_pk)
+            limit (int): The page size, plus one lookahead row
+        Returns:
+            Return list of monetary assets, None otherwise.
+        """
+        try:
+            result = await self.sess.execute(owned_by(
+                User, Monetary, Monetary.owner_id, grantor_id, after, limit
+            ))
+            return collect_owned(result.all())
+        except DataError:
+            return None
+
+    async def get_all_monetary_assets_for_beneficiary(
+        self, will_to: UUID, after: Keyset | None = None,
+        limit: int = None
+    ) -> List[Monetary] | None:
+        """
+        Retrieve all the monetary assets for a beneficiary.
+
+        Args:
+            will_to (UUID): The beneficiary unique identifier
+            after (Keyset): Start after this (created_at, uuid_pk)
+            limit (int): The page size, plus one lookahead row
+        Returns:
+            Return list of monetary assets, None otherwise.
+        """
+        try:
+            result = await self.sess.execute(owned_by(
+                Beneficiary, Monetary, Monetary.will_to, will_to, after, limit
+            ))
+            return collect_owned(result.all())
+        except DataError:
+            return None
+
+    async def get_estate_totals(
+        self, grantor_id: UUID
+    ) -> Dict[str, Any] | None:
+        """
+        Sum a grantor's monetary assets in a single query.
+
+        Args:
+            grantor_id (UUID): The grantor unique identifier
+        Returns:
+            The per currency and per beneficiary totals, None if the
+            grantor does not exist
+        """
+        try:
+            result = await self.sess.execute(totals_statement(grantor_id))
+            return collect_totals(grantor_id, result.all())
+        except DataError:
+            return None
+
+    async def get_asset(
+        self, grantor_id: UUID, asset_id: UUID
+    ) -> Monetary | None:
+        """
+        Retrieve a monetary asset data.
+
+        Args:
+            grantor_id (UUID): The grantor unique identifier
+            asset_id (UUID): The asset identifier
+        Returns:
+            Return monetary, None otherwise
+        """
+        try:
+            return await self.sess.scalar(
+                select(Monetary).filter_by(
+                    owner_id=grantor_id, uuid_pk=asset_id
+                )
+            )
+        except DataError:
+            return None
+
+    async def update_asset(self, grantor_id: UUID, asset_id: UUID, data):
+        """
+        Update monetary asset data.
+
+        Args:
+            grantor_id (UUID): The grantor unique identifier
+            asset_id (UUID): The asset identifier
+            data (dict): The data to be updated
+        Returns:
+            Return the updated asset if successful, False otherwise
+        """
+        try:
+            result = await self.sess.execute(update_returning(
+                Monetary, data, owner_id=grantor_id, uuid_pk=asset_id
+            ))
+            monetary = result.first()
+            if monetary:
+                await self.sess.commit()
+                return monetary
+            return False
+        except DataError:
+            return False
+
+    async def delete_asset(self, grantor_id: UUID, asset_id: UUID) -> bool:
+        """
+        Delete monetary asset data.
+
+        Args:
+            grantor_id (UUID): The grantor unique identifier
+            asset_id (UUID): The asset identifier
+        Returns:
+            Return True if the asset was successfully deleted, False otherwise
+        """
+        try:
+            result = await self.sess.execute(delete_returning(
+                Monetary, owner_id=grantor_id, uuid_pk=asset_id
+            ))
+            if result.first():
+                await self.sess.commit()
+                return True
+            return False
         except DataError:
             return False
+
+    async def delete_assets(
+        self, grantor_id: UUID, asset_ids: List[str]
+    ) -> List[str] | None:
+        """
+        Delete several monetary assets in one transaction.
+
+        Args:
+            grantor_id (UUID): The grantor unique identifier
+            asset_ids (List[str]): The asset unique identifiers
+        Returns:
+            The ids that were not found, in which case nothing is deleted,
+            or None if an id is malformed
+        """
+        try:
+            deleted = (await self.sess.scalars(delete_returning(
+                Monetary, asset_ids, owner_id=grantor_id
+            ))).all()
+        except DataError:
+            await self.sess.rollback()
+            return None
+        missing = missing_ids(asset_ids, deleted)
+        if missing:
+            await self.sess.rollback()
+            return missing
+        await self.sess.commit()
+        return missing
@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+"""Repository dependencies for Estate Trust."""
+
+from typing import Any, Callable
+from fastapi import Depends
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from api.v1.configurations.database import get_async_db, get_db
+from api.v1.configurations.settings import settings
+from api.v1.repositories.assets import AssetRepository, AsyncAssetRepository
+from api.v1.repositories.beneficiaries import (
+    AsyncBeneficiaryRepo, BeneficiaryRepo
+)
+from api.v1.repositories.documents import (
+    AsyncDocumentRepository, DocumentRepository
+)
+from api.v1.repositories.imports import (
+    AsyncImportRepository, ImportRepository
+)
+from api.v1.repositories.monetaries import (
+    AsyncMonetaryRepository, MonetaryRepository
+)
+from api.v1.repositories.search import (
+    AsyncSearchRepository, SearchRepository
+)
+from api.v1.repositories.trustees import (
+    AsyncTrusteeRepository, TrusteeRepository
+)
+from api.v1.repositories.users import AsyncUserRepository, UserRepository
+
+
+class ThreadedRepository:
+    """Expose a sync repository's methods as coroutines on the threadpool."""
+
+    def __init__(self, repo: Any) -> None:
+        """Wrap the given repository."""
+        self._repo = repo
+
+    def __getattr__(self, name: str) -> Callable:
+        """Return the named method offloaded to the threadpool."""
+        method = getattr(self._repo, name)
+
+        async def call(*args, **kwargs):
+            """Run the repository method on the threadpool."""
+            return await run_in_threadpool(method, *args, **kwargs)
+
+        return call
+
+
+def threaded_provider(sync_repo: type) -> Callable:
+    """Build a dependency running a sync repository on the threadpool."""
+    async def provide(sess: Session = Depends(get_db)):
+        """Provide the sync repository run on the threadpool."""
+        return ThreadedRepository(sync_repo(sess))
+    return provide
+
+
+def async_provider(async_repo: type) -> Callable:
+    """Build a dependency returning an AsyncSession repository."""
+    async def provide(sess: AsyncSession = Depends(get_async_db)):
+        """Provide the async repository."""
+        return async_repo(sess)
+    return provide
+
+
+def repository(sync_repo: type, async_repo: type) -> Callable:
+    """
+    Build a dependency returning the repository for settings.DB_ENGINE.
+
+    Args:
+        sync_repo (type): Repository class built on a Session
+        async_repo (type): Repository class built on an AsyncSession
+    Returns:
+        A dependency whose methods are always awaited by the routes
+    """
+    if settings.DB_ENGINE == "async":
+        return async_provider(async_repo)
+    return threaded_provider(sync_repo)
+
+
+asset_repository = repository(AssetRepository, AsyncAssetRepository)
+beneficiary_repository = repository(BeneficiaryRepo, AsyncBeneficiaryRepo)
+document_repository = repository(
+    DocumentRepository, AsyncDocumentRepository
+)
+import_repository = repository(ImportRepository, AsyncImportRepository)
+monetary_repository = repository(
+    MonetaryRepository, AsyncMonetaryRepository
+)
+search_repository = repository(SearchRepository, AsyncSearchRepository)
+trustee_repository = repository(TrusteeRepository, AsyncTrusteeRepository)
+user_repository = repository(UserRepository, AsyncUserRepository)
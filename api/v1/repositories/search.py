@@ -0,0 +1,141 @@
+#!/usr/bin/python3
+"""Estate full-text search repository for Estate Trust."""
+
+from typing import Any, Dict, List, Tuple
+from uuid import UUID
+from sqlalchemy import (
+    Float, cast, func, literal, literal_column, select, true, tuple_,
+    union_all
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import TSQUERY
+from sqlalchemy.exc import DataError
+from api.v1.models.data.assets import (
+    OWNER_TAG, SEARCH_CONFIG, Asset, Monetary
+)
+
+# A ranked keyset position: the (rank, uuid_pk) of the last hit of a page.
+RankKeyset = Tuple[float, str]
+# (hit kind, searched model, title column, detail column)
+SEARCHED = (
+    ("asset", Asset, Asset.name, Asset.location),
+    ("monetary", Monetary, Monetary.acc_name, Monetary.bank_name),
+)
+
+
+def search_statement(
+    owner_id: UUID, terms: str,
+    after: RankKeyset | None = None, limit: int = None
+):
+    """
+    Rank a grantor's assets and monetary assets matching the terms.
+
+    Each branch is served by the GIN index on the generated search
+    column, the terms being ANDed with the grantor's owner lexeme, so
+    only the grantor's matches are read and ranked. Terms made of stop
+    words only match nothing. Hits come best first, ties broken by
+    uuid_pk, and are paged by keyset on that order.
+
+    Args:
+        owner_id (UUID): The grantor unique identifier
+        terms (str): Web search syntax: words, "phrases", or, -negation
+        after (RankKeyset): Start after this position, from the top if None
+        limit (int): The page size; one extra hit is fetched to tell
+            whether another page follows
+    Returns:
+        The (kind, uuid_pk, title, detail, note, rank) statement
+    Raises:
+        ValueError: If owner_id is not a UUID
+    """
+    query = func.websearch_to_tsquery(
+        literal_column(f"'{SEARCH_CONFIG}'::regconfig"), terms
+    )
+    owner = cast(literal(f"'{OWNER_TAG}{UUID(str(owner_id)).hex}'"), TSQUERY)
+    hits = union_all(*(
+        select(
+            literal_column(f"'{kind}'").label("kind"),
+            model.uuid_pk,
+            title.label("title"),
+            detail.label("detail"),
+            model.note,
+            cast(func.ts_rank_cd(model.search, query), Float).label("rank")
+        ).where(
+            model.owner_id == str(owner_id),
+            model.search.bool_op("@@")(query.op("&&")(owner)),
+            func.numnode(query) > 0
+        ) for kind, model, title, detail in SEARCHED
+    )).subquery()
+    position = true()
+    if after is not None:
+        position = tuple_(hits.c.rank, hits.c.uuid_pk) < tuple_(
+            literal(after[0], Float), literal(after[1], hits.c.uuid_pk.type)
+        )
+    stmt = select(hits).where(position).order_by(
+        hits.c.rank.desc(), hits.c.uuid_pk.desc()
+    )
+    if limit is not None:
+        stmt = stmt.limit(limit + 1)
+    return stmt
+
+
+class SearchRepository:
+    """Estate search repository."""
+
+    def __init__(self, sess: Session):
+        """Initialize the search repository."""
+        self.sess = sess
+
+    def search_estate(
+        self, owner_id: UUID, terms: str,
+        after: RankKeyset | None = None, limit: int = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Search a grantor's estate.
+
+        Args:
+            owner_id (UUID): The grantor unique identifier
+            terms (str): The search terms
+            after (RankKeyset): Start after this position
+            limit (int): The page size
+        Returns:
+            The hits, best first, or [] if owner_id is malformed
+        """
+        try:
+            rows = self.sess.execute(search_statement(
+                owner_id, terms, after, limit
+            )).mappings()
+            return [dict(row) for row in rows]
+        except (DataError, ValueError):
+            return []
+
+
+class AsyncSearchRepository:
+    """Async estate search repository."""
+
+    def __init__(self, sess: AsyncSession):
+        """Initialize the async search repository."""
+        self.sess = sess
+
+    async def search_estate(
+        self, owner_id: UUID, terms: str,
+        after: RankKeyset | None = None, limit: int = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Search a grantor's estate.
+
+        Args:
+            owner_id (UUID): The grantor unique identifier
+            terms (str): The search terms
+            after (RankKeyset): Start after this position
+            limit (int): The page size
+        Returns:
+            The hits, best first, or [] if owner_id is malformed
+        """
+        try:
+            result = await self.sess.execute(search_statement(
+                owner_id, terms, after, limit
+            ))
+            return [dict(row) for row in result.mappings()]
+        except (DataError, ValueError):
+            return []
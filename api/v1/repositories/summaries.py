@@ -0,0 +1,165 @@
+#!/usr/bin/python3
+"""
+Estate summary recounts for Estate Trust.
+
+The summary rows are maintained by the triggers installed with the
+EstateSummary model; these statements recount them from the estate
+tables to detect and repair drift.
+"""
+
+from typing import Any, Dict, List
+from uuid import UUID
+from sqlalchemy import (
+    Insert, Text, cast, delete, exists, func, or_, select, text
+)
+from sqlalchemy.dialects.postgresql import JSONB, insert
+from sqlalchemy.orm import Session
+from api.v1.models.data.assets import Asset, Monetary
+from api.v1.models.data.summaries import EstateSummary
+from api.v1.models.data.users import Beneficiary, Trustee, User
+
+# (summary column, counted model, column referencing the grantor)
+COUNTS = (
+    ("beneficiaries", Beneficiary, Beneficiary.added_by),
+    ("trustees", Trustee, Trustee.added_by),
+    ("assets", Asset, Asset.owner_id),
+    ("monetaries", Monetary, Monetary.owner_id),
+)
+# The summary columns derived from the estate tables.
+FIELDS = tuple(name for name, _, _ in COUNTS) + ("monetary_totals",)
+
+
+def monetary_totals():
+    """Sum the grantor's monetary assets per currency, as JSONB."""
+    per_currency = select(
+        Monetary.currency, func.sum(Monetary.amount).label("amount")
+    ).where(Monetary.owner_id == User.uuid_pk).group_by(
+        Monetary.currency
+    ).having(func.sum(Monetary.amount) != 0).correlate(User).subquery()
+    return select(func.coalesce(
+        func.jsonb_object_agg(
+            per_currency.c.currency, cast(per_currency.c.amount, Text)
+        ),
+        text("'{}'::jsonb"),
+        type_=JSONB
+    )).select_from(per_currency).scalar_subquery()
+
+
+def last_modified():
+    """Return the latest write time recorded anywhere in the estate."""
+    latest = [
+        select(func.max(
+            func.coalesce(model.updated_at, model.created_at)
+        )).where(owner_column == User.uuid_pk).scalar_subquery()
+        for _, model, owner_column in COUNTS
+    ]
+    return func.greatest(
+        func.coalesce(User.updated_at, User.created_at), *latest
+    )
+
+
+def summary_select(grantor_id: UUID = None, updated_at=None):
+    """
+    Compute estate summary rows from the estate tables.
+
+    Args:
+        grantor_id (UUID): Restrict to this grantor, every grantor if None
+        updated_at: The last-modified expression, now() by default
+    Returns:
+        The (grantor_id, *FIELDS, updated_at) statement
+    """
+    stmt = select(
+        User.uuid_pk.label("grantor_id"),
+        *(
+            select(func.count()).where(
+                owner_column == User.uuid_pk
+            ).scalar_subquery().label(name)
+            for name, _, owner_column in COUNTS
+        ),
+        monetary_totals().label("monetary_totals"),
+        (func.now() if updated_at is None else updated_at).label(
+            "updated_at"
+        )
+    )
+    if grantor_id is not None:
+        stmt = stmt.where(User.uuid_pk == grantor_id)
+    return stmt
+
+
+def fill_statement(missing_only: bool = False) -> Insert:
+    """
+    Insert recounted summary rows carrying each estate's last write time.
+
+    Args:
+        missing_only (bool): Only count the grantors without a summary
+            row, e.g. those created before the summary table existed
+    Returns:
+        The INSERT, leaving the summary rows already there untouched
+    """
+    fresh = summary_select(updated_at=last_modified())
+    if missing_only:
+        fresh = fresh.where(~exists().where(
+            EstateSummary.grantor_id == User.uuid_pk
+        ))
+    return insert(EstateSummary).from_select(
+        ("grantor_id",) + FIELDS + ("updated_at",), fresh
+    ).on_conflict_do_nothing()
+
+
+def drift_statement():
+    """Select the grantors whose stored summary differs from the tables."""
+    fresh = summary_select().subquery()
+    stored = EstateSummary.__table__.c
+    return select(
+        fresh.c.grantor_id,
+        *(fresh.c[name].label(f"expected_{name}") for name in FIELDS),
+        *(stored[name].label(f"stored_{name}") for name in FIELDS)
+    ).select_from(fresh).outerjoin(
+        EstateSummary, EstateSummary.grantor_id == fresh.c.grantor_id
+    ).where(or_(
+        stored.grantor_id.is_(None),
+        *(fresh.c[name].is_distinct_from(stored[name]) for name in FIELDS)
+    )).order_by(fresh.c.grantor_id)
+
+
+def check_summaries(sess: Session) -> List[Dict[str, Any]]:
+    """
+    Compare every stored summary with a recount of the estate tables.
+
+    Args:
+        sess (Session): The database session
+    Returns:
+        One entry per drifted grantor, with the stored and expected value
+        of each differing field; stored is None for a missing row
+    """
+    drift = []
+    for row in sess.execute(drift_statement()).mappings():
+        entry = {"grantor_id": row["grantor_id"]}
+        for name in FIELDS:
+            stored = row[f"stored_{name}"]
+            expected = row[f"expected_{name}"]
+            if stored != expected:
+                entry[name] = {"stored": stored, "expected": expected}
+        drift.append(entry)
+    return drift
+
+
+def rebuild_summaries(sess: Session) -> List[Dict[str, Any]]:
+    """
+    Rebuild every summary from scratch in one transaction.
+
+    Writers are held off by an EXCLUSIVE lock while the table is
+    refilled; readers keep seeing the old rows until the commit.
+    Rebuilt rows carry the latest write time found in each estate.
+
+    Args:
+        sess (Session): The database session
+    Returns:
+        The drift found before the rebuild, as from check_summaries
+    """
+    sess.execute(text("LOCK TABLE estate_summary IN EXCLUSIVE MODE"))
+    drift = check_summaries(sess)
+    sess.execute(delete(EstateSummary))
+    sess.execute(fill_statement())
+    sess.commit()
+    return drift
@@ -1,11 +1,20 @@
 #!/usr/bin/python3
 """Trustees repository for Estate Trust."""
 
-from typing import List
+from typing import Any, Dict, List
 from uuid import UUID
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import DataError, IntegrityError
-from api.v1.models.data.users import Trustee, User
+from api.v1.authorizations.cache import principal_cache
+from api.v1.configurations.settings import settings
+from api.v1.models.data.users import TRUSTEE_CONTACT, Trustee, User
+from api.v1.repositories.base import (
+    Keyset, collect_owned, delete_returning, duplicates_statement,
+    fuzzy_statement, missing_ids, owned_by, searchable_values,
+    trigram_search, update_returning
+)
 
 
 class TrusteeRepository:
@@ -53,18 +62,73 @@ class TrusteeRepository:
         except DataError:
             return None
 
-    def get_trustees(self, user_id) -> List[Trustee]:
+    def get_trustees(
+        self, user_id, after: Keyset | None = None,
+        limit: int = None
+    ) -> List[Trustee] | None:
         """
         Get the list of trustees for a given user.
 
         Args:
             user_id: The ID of the user that added the trustees
+            after (Keyset): Start after this (created_at, uuid_pk)
+            limit (int): The page size, plus one lookahead row
         Returns:
-            list of Trustees
+            list of Trustees, None if the user does not exist
         """
-        user = self.sess.query(User).filter(User.uuid_pk == user_id).first()
-        truestees = user.executors
-        return truestees
+        try:
+            return collect_owned(self.sess.execute(owned_by(
+                User, Trustee, Trustee.added_by, user_id, after, limit
+            )).all())
+        except DataError:
+            return None
+
+    def search_trustees(
+        self, added_by: UUID, terms: str,
+        limit: int = settings.FUZZY_MATCH_LIMIT
+    ) -> List[Dict[str, Any]]:
+        """
+        Find a grantor's trustees as a name, email or phone is typed.
+
+        Args:
+            added_by (UUID): The grantor unique identifier
+            terms (str): What was typed so far
+            limit (int): The number of matches
+        Returns:
+            The matches and their score, best first
+        """
+        try:
+            trigram = trigram_search(self.sess)
+            result = self.sess.execute(fuzzy_statement(
+                Trustee, TRUSTEE_CONTACT, added_by, terms, limit, trigram
+            ))
+            return [dict(row) for row in result.mappings()]
+        except DataError:
+            return []
+
+    def possible_duplicates(
+        self, added_by: UUID, data
+    ) -> List[Dict[str, Any]]:
+        """
+        Find the grantor's trustees that look like the one being added.
+
+        Args:
+            added_by (UUID): The grantor unique identifier
+            data (AddTrustee): The trustee being added
+        Returns:
+            The look-alikes and their similarity, closest first
+        """
+        try:
+            trigram = trigram_search(self.sess)
+            result = self.sess.execute(duplicates_statement(
+                Trustee, TRUSTEE_CONTACT, added_by, searchable_values(
+                    data.first_name, data.middle_name, data.last_name,
+                    data.email, data.phone_number
+                ), settings.FUZZY_MATCH_LIMIT, trigram
+            ))
+            return [dict(row) for row in result.mappings()]
+        except DataError:
+            return []
 
     def update_trustee(self, user_id: UUID, trustee_id: UUID, data):
         """
@@ -75,17 +139,16 @@ class TrusteeRepository:
             trustee_id (UUID): The identifier of the trustee to update
             data (dict): The dictionary containing data to update
         Returns:
-            Return True if successful, False otherwise
+            Return the updated trustee if successful, False otherwise
         """
         try:
-            trustee = self.sess.query(Trustee).filter_by(
-                uuid_pk=trustee_id,
-                added_by=user_id
-            )
-            if trustee.first():
-                trustee.update(data.dict(), synchronize_session=False)
+            trustee = self.sess.execute(update_returning(
+                Trustee, data, uuid_pk=trustee_id, added_by=user_id
+            )).first()
+            if trustee:
                 self.sess.commit()
-                return trustee.first()
+                principal_cache.invalidate(trustee_id)
+                return trustee
             return False
         except IntegrityError:
             return False
@@ -103,14 +166,234 @@ class TrusteeRepository:
             Return True if successful, False otherwise
         """
         try:
-            trustee = self.sess.query(Trustee).filter_by(
-                uuid_pk=trustee_id,
-                added_by=user_id
-            )
-            if trustee.first():
-                trustee.delete()
+            deleted = self.sess.execute(delete_returning(
+                Trustee, uuid_pk=trustee_id, added_by=user_id
+            )).first()
+            if deleted:
                 self.sess.commit()
+                principal_cache.invalidate(trustee_id)
                 return True
             return False
         except DataError:
             return None
+
+    def delete_trustees(
+        self, user_id: UUID, trustee_ids: List[str]
+    ) -> List[str] | None:
+        """
+        Delete several trustees in one transaction.
+
+        Args:
+            user_id (UUID): The identifier of the user that added the trustees
+            trustee_ids (List[str]): The trustee unique identifiers
+        Returns:
+            The ids that were not found, in which case nothing is deleted,
+            or None if an id is malformed
+        """
+        try:
+            deleted = self.sess.scalars(delete_returning(
+                Trustee, trustee_ids, added_by=user_id
+            )).all()
+        except DataError:
+            self.sess.rollback()
+            return None
+        missing = missing_ids(trustee_ids, deleted)
+        if missing:
+            self.sess.rollback()
+            return missing
+        self.sess.commit()
+        for trustee_id in deleted:
+            principal_cache.invalidate(trustee_id)
+        return missing
+
+
+class AsyncTrusteeRepository:
+    """Async trustee repository."""
+
+    def __init__(self, sess: AsyncSession) -> None:
+        """Initialize the trustee repository."""
+        self.sess: AsyncSession = sess
+
+    async def add_trustee(self, data) -> bool:
+        """
+        Add a new trustee.
+
+        Args:
+            data: A dictionary containing the data
+        Returns:
+            Return True if successful, False otherwise
+        """
+        try:
+            trustee = Trustee(**data.dict())
+            self.sess.add(trustee)
+            await self.sess.commit()
+            return True
+        except IntegrityError:
+            return False
+
+    async def get_trustee(
+        self, trustee_id: UUID, user_id: UUID
+    ) -> Trustee | None:
+        """
+        Retrieve a specific trustee.
+
+        Args:
+            trustee_id (UUID): The identifier of the trustee to retrieve
+            user_id (UUID): The identifier of the user that added the trustee
+        Returns:
+            The trustee information
+        """
+        try:
+            return await self.sess.scalar(
+                select(Trustee).filter_by(
+                    added_by=user_id, uuid_pk=trustee_id
+                )
+            )
+        except DataError:
+            return None
+
+    async def get_trustees(
+        self, user_id, after: Keyset | None = None,
+        limit: int = None
+    ) -> List[Trustee] | None:
+        """
+        Get the list of trustees for a given user.
+
+        Args:
+            user_id: The ID of the user that added the trustees
+            after (Keyset): Start after this (created_at, uuid_pk)
+            limit (int): The page size, plus one lookahead row
+        Returns:
+            list of Trustees, None if the user does not exist
+        """
+        try:
+            result = await self.sess.execute(owned_by(
+                User, Trustee, Trustee.added_by, user_id, after, limit
+            ))
+            return collect_owned(result.all())
+        except DataError:
+            return None
+
+    async def search_trustees(
+        self, added_by: UUID, terms: str,
+        limit: int = settings.FUZZY_MATCH_LIMIT
+    ) -> List[Dict[str, Any]]:
+        """
+        Find a grantor's trustees as a name, email or phone is typed.
+
+        Args:
+            added_by (UUID): The grantor unique identifier
+            terms (str): What was typed so far
+            limit (int): The number of matches
+        Returns:
+            The matches and their score, best first
+        """
+        try:
+            trigram = await self.sess.run_sync(trigram_search)
+            result = await self.sess.execute(fuzzy_statement(
+                Trustee, TRUSTEE_CONTACT, added_by, terms, limit, trigram
+            ))
+            return [dict(row) for row in result.mappings()]
+        except DataError:
+            return []
+
+    async def possible_duplicates(
+        self, added_by: UUID, data
+    ) -> List[Dict[str, Any]]:
+        """
+        Find the grantor's trustees that look like the one being added.
+
+        Args:
+            added_by (UUID): The grantor unique identifier
+            data (AddTrustee): The trustee being added
+        Returns:
+            The look-alikes and their similarity, closest first
+        """
+        try:
+            trigram = await self.sess.run_sync(trigram_search)
+            result = await self.sess.execute(duplicates_statement(
+                Trustee, TRUSTEE_CONTACT, added_by, searchable_values(
+                    data.first_name, data.middle_name, data.last_name,
+                    data.email, data.phone_number
+                ), settings.FUZZY_MATCH_LIMIT, trigram
+            ))
+            return [dict(row) for row in result.mappings()]
+        except DataError:
+            return []
+
+    async def update_trustee(self, user_id: UUID, trustee_id: UUID, data):
+        """
+        Update a trustee data.
+
+        Args:
+            user_id (UUID): The identifier of the user that added the trustee
+            trustee_id (UUID): The identifier of the trustee to update
+            data (dict): The dictionary containing data to update
+        Returns:
+            Return the updated trustee if successful, False otherwise
+        """
+        try:
+            result = await self.sess.execute(update_returning(
+                Trustee, data, uuid_pk=trustee_id, added_by=user_id
+            ))
+            trustee = result.first()
+            if trustee:
+                await self.sess.commit()
+                principal_cache.invalidate(trustee_id)
+                return trustee
+            return False
+        except IntegrityError:
+            return False
+        except DataError:
+            return None
+
+    async def delete_trustee(self, user_id: UUID, trustee_id: UUID) -> bool:
+        """
+        Delete a trustee.
+
+        Args:
+            user_id (UUID): The identifier of the user that added the trustee
+            trustee_id (UUID): The identifier of the trustee to delete
+        Returns:
+            Return True if successful, False otherwise
+        """
+        try:
+            result = await self.sess.execute(delete_returning(
+                Trustee, uuid_pk=trustee_id, added_by=user_id
+            ))
+            if result.first():
+                await self.sess.commit()
+                principal_cache.invalidate(trustee_id)
+                return True
+            return False
+        except DataError:
+            return None
+
+    async def delete_trustees(
+        self, user_id: UUID, trustee_ids: List[str]
+    ) -> List[str] | None:
+        """
+        Delete several trustees in one transaction.
+
+        Args:
+            user_id (UUID): The identifier of the user that added the trustees
+            trustee_ids (List[str]): The trustee unique identifiers
+        Returns:
+            The ids that were not found, in which case nothing is deleted,
+            or None if an id is malformed
+        """
+        try:
+            deleted = (await self.sess.scalars(delete_returning(
+                Trustee, trustee_ids, added_by=user_id
+            ))).all()
+        except DataError:
+            await self.sess.rollback()
+            return None
+        missing = missing_ids(trustee_ids, deleted)
+        if missing:
+            await self.sess.rollback()
+            return missing
+        await self.sess.commit()
+        for trustee_id in deleted:
+            principal_cache.invalidate(trustee_id)
+        return missing
@@ -1,11 +1,147 @@
 #!/usr/bin/python3
 """Users repository for Estate Trust."""
 
-from typing import Any, Dict, List
-from sqlalchemy import desc
+from itertools import chain
+from typing import Any, AsyncIterator, Dict, Iterator, List
+from sqlalchemy import (
+    Integer, Row, Text, cast, desc, func, literal, literal_column, null,
+    select, union_all
+)
+from sqlalchemy.ext.asyncio import AsyncResult, AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import DataError, IntegrityError
-from api.v1.models.data.users import User
+from api.v1.authorizations.cache import principal_cache
+from api.v1.configurations.settings import settings
+from api.v1.models.data.assets import Asset, Monetary
+from api.v1.models.data.summaries import EstateSummary
+from api.v1.models.data.users import Beneficiary, Trustee, User
+from api.v1.repositories.base import (
+    Keyset, delete_returning, estate_json, keyset, plain_columns,
+    update_returning
+)
+
+# Columns never shipped to the dashboard.
+DASHBOARD_EXCLUDED = ("password",)
+# (record kind, exported model, column referencing the grantor), in the
+# order the records are exported.
+EXPORTED = (
+    ("grantor", User, User.uuid_pk),
+    ("beneficiary", Beneficiary, Beneficiary.added_by),
+    ("trustee", Trustee, Trustee.added_by),
+    ("asset", Asset, Asset.owner_id),
+    ("monetary", Monetary, Monetary.owner_id),
+)
+# The sort keys of the exported records, left out of the export.
+EXPORT_ORDER = ("export_position", "export_created_at", "export_uuid_pk")
+# The CSV export header: the record kind, then every exported column name.
+EXPORT_FIELDS = ("kind",) + tuple(dict.fromkeys(
+    column.name for _, model, _ in EXPORTED
+    for column in plain_columns(model, DASHBOARD_EXCLUDED)
+))
+
+
+def dashboard_statement(uuid_pk: str, data=None):
+    """
+    Build the single query loading a grantor with their whole estate.
+
+    Args:
+        uuid_pk (str): The grantor unique identifier
+        data: The validated UpdateUser body; the grantor is then updated
+            by the same statement, and the updated row is loaded
+    Returns:
+        The SELECT statement, yielding no row for a missing grantor
+    """
+    grantor = User.__table__
+    if data is not None:
+        grantor = update_returning(User, data, uuid_pk=uuid_pk).cte("grantor")
+    columns = [
+        column for column in grantor.c
+        if column.name not in DASHBOARD_EXCLUDED
+    ]
+    stmt = select(
+        *columns,
+        *(
+            estate_json(
+                model, owner_column, grantor.c.uuid_pk, DASHBOARD_EXCLUDED
+            ).label(name) for name, model, owner_column in (
+                ("beneficiaries", Beneficiary, Beneficiary.added_by),
+                ("executors", Trustee, Trustee.added_by),
+                ("assets", Asset, Asset.owner_id),
+                ("monetaries", Monetary, Monetary.owner_id),
+            )
+        ),
+    )
+    if data is None:
+        stmt = stmt.where(grantor.c.uuid_pk == uuid_pk)
+    return stmt
+
+
+def export_statement(uuid_pk: str, as_csv: bool = False):
+    """
+    Build the single query exporting a grantor's whole estate.
+
+    Records come grantor first, then beneficiaries, trustees, assets and
+    monetary assets, each in (created_at, uuid_pk) order, and are fetched
+    settings.STREAM_BATCH_SIZE at a time through a server-side cursor.
+
+    Args:
+        uuid_pk (str): The grantor unique identifier
+        as_csv (bool): One text column per EXPORT_FIELDS, blank where a
+            kind lacks the field, instead of one JSON encoded object
+    Returns:
+        The statement, yielding no row for a missing grantor
+    """
+    branches = []
+    for position, (kind, model, owner_column) in enumerate(EXPORTED):
+        columns = plain_columns(model, DASHBOARD_EXCLUDED)
+        if as_csv:
+            present = {column.name: column for column in columns}
+            record = [literal(kind).label("kind")] + [
+                cast(present[name], Text).label(name)
+                if name in present else null().label(name)
+                for name in EXPORT_FIELDS[1:]
+            ]
+        else:
+            record = [cast(func.json_build_object(
+                literal_column("'kind'"), literal(kind),
+                *chain.from_iterable(
+                    (literal_column(f"'{column.name}'"), column)
+                    for column in columns
+                )
+            ), Text).label("record")]
+        branches.append(select(*record, *(
+            value.label(name) for name, value in zip(EXPORT_ORDER, (
+                literal(position, Integer), model.created_at, model.uuid_pk
+            ))
+        )).where(owner_column == uuid_pk))
+    records = union_all(*branches).subquery()
+    return select(*(
+        column for column in records.c if column.name not in EXPORT_ORDER
+    )).order_by(
+        *(records.c[name] for name in EXPORT_ORDER)
+    ).execution_options(yield_per=settings.STREAM_BATCH_SIZE)
+
+
+def export_rows(first: Row, rest) -> Iterator[Row]:
+    """Yield the exported rows, the first one already fetched."""
+    return chain([first], rest)
+
+
+async def aexport_rows(first: Row, rest: AsyncResult) -> AsyncIterator[Row]:
+    """Yield the exported rows of an async result."""
+    yield first
+    async for row in rest:
+        yield row
+
+
+def users_by_username(after: str | None = None, limit: int = None):
+    """Page users in descending username order, after the given username."""
+    stmt = select(User).order_by(desc(User.username))
+    if after is not None:
+        stmt = stmt.where(User.username < after)
+    if limit is not None:
+        stmt = stmt.limit(limit + 1)
+    return stmt
 
 
 class UserRepository:
@@ -25,9 +161,25 @@ class UserRepository:
             return False
         return True
 
-    def retrieve_user(self, uuid_pk: str) -> User | None:
-        """Retrieve the user associated with the given uuid."""
+    def retrieve_user(
+        self, uuid_pk: str, dashboard: bool = False
+    ) -> User | Dict[str, Any] | None:
+        """
+        Retrieve the user associated with the given uuid.
+
+        Args:
+            uuid_pk (str): The grantor unique identifier
+            dashboard (bool): Load the user with their whole estate in a
+                single round-trip, as a mapping shaped like UserRes
+        Returns:
+            The user if found, None otherwise
+        """
         try:
+            if dashboard:
+                row = self.sess.execute(
+                    dashboard_statement(uuid_pk)
+                ).mappings().one_or_none()
+                return dict(row) if row else None
             user: User | None = self.sess.query(User).filter(
                 User.uuid_pk == uuid_pk
             ).one_or_none()
@@ -35,37 +187,219 @@ class UserRepository:
             return None
         return user
 
-    def retrieve_users(self) -> List[User]:
-        """Retrieve users."""
-        users: List[User] = self.sess.query(User).all()
+    def retrieve_users(
+        self, after: Keyset | None = None, limit: int = None
+    ) -> List[User]:
+        """Retrieve a page of users in (created_at, uuid_pk) order."""
+        users: List[User] = self.sess.scalars(
+            keyset(select(User), User, after, limit)
+        ).all()
         return users
 
-    def retrieve_users_sorted_desc(self) -> List[User]:
-        """Retrieve all the users in descending order."""
-        users: List[User] = self.sess.query(User).order_by(
-            desc(User.username)
+    def retrieve_users_sorted_desc(
+        self, after: str | None = None, limit: int = None
+    ) -> List[User]:
+        """Retrieve a page of users in descending username order."""
+        users: List[User] = self.sess.scalars(
+            users_by_username(after, limit)
         ).all()
         return users
 
     def update_user(self, uuid_pk: str, data):
-        """Update a user data in the database."""
+        """
+        Update a user data in the database.
+
+        Args:
+            uuid_pk (str): The grantor unique identifier
+            data: The validated UpdateUser body
+        Returns:
+            The updated dashboard, loaded by the UPDATE statement itself,
+            False if the user was not found or not updated
+        """
         try:
-            user = self.sess.query(User).filter(User.uuid_pk == uuid_pk)
-            if user.one():
-                user.update(data.dict(), synchronize_session=False)
+            row = self.sess.execute(
+                dashboard_statement(uuid_pk, data)
+            ).mappings().one_or_none()
+            if row:
                 self.sess.commit()
-                return user.one()
+                principal_cache.invalidate(uuid_pk)
+                return dict(row)
             return False
         except DataError:
             return False
 
+    def get_summary(self, uuid_pk: str) -> EstateSummary | None:
+        """Retrieve a grantor's estate summary by primary key."""
+        try:
+            return self.sess.get(EstateSummary, uuid_pk)
+        except DataError:
+            return None
+
+    def export_estate(
+        self, uuid_pk: str, as_csv: bool = False
+    ) -> Iterator[Row] | None:
+        """
+        Export a grantor's whole estate.
+
+        Rows are fetched settings.STREAM_BATCH_SIZE at a time while the
+        returned iterator is consumed, so the session must stay open
+        until it is exhausted.
+
+        Args:
+            uuid_pk (str): The grantor unique identifier
+            as_csv (bool): Export EXPORT_FIELDS columns instead of JSON
+        Returns:
+            The exported rows, None if the grantor does not exist
+        """
+        try:
+            result = self.sess.execute(export_statement(uuid_pk, as_csv))
+            first = result.fetchone()
+        except DataError:
+            return None
+        if first is None:
+            return None
+        return export_rows(first, result)
+
     def delete_user(self, uuid_pk: str) -> bool:
         """Delete user."""
         try:
-            user = self.sess.query(User).filter(User.uuid_pk == uuid_pk)
-            if user.one():
-                user.delete()
+            deleted = self.sess.execute(
+                delete_returning(User, uuid_pk=uuid_pk)
+            ).first()
+            if deleted:
                 self.sess.commit()
+                principal_cache.invalidate(uuid_pk)
+                return True
+            return False
+        except DataError:
+            return False
+
+
+class AsyncUserRepository:
+    """Async user repository for Estate Trust."""
+
+    def __init__(self, sess: AsyncSession) -> None:
+        """Initialize the repository."""
+        self.sess: AsyncSession = sess
+
+    async def insert_user(self, user) -> bool:
+        """Insert a user into the database."""
+        try:
+            user = User(**user.dict())
+            self.sess.add(user)
+            await self.sess.commit()
+        except IntegrityError:
+            return False
+        return True
+
+    async def retrieve_user(
+        self, uuid_pk: str, dashboard: bool = False
+    ) -> User | Dict[str, Any] | None:
+        """
+        Retrieve the user associated with the given uuid.
+
+        Args:
+            uuid_pk (str): The grantor unique identifier
+            dashboard (bool): Load the user with their whole estate in a
+                single round-trip, as a mapping shaped like UserRes
+        Returns:
+            The user if found, None otherwise
+        """
+        try:
+            if dashboard:
+                result = await self.sess.execute(
+                    dashboard_statement(uuid_pk)
+                )
+                row = result.mappings().one_or_none()
+                return dict(row) if row else None
+            result = await self.sess.execute(
+                select(User).where(User.uuid_pk == uuid_pk)
+            )
+        except DataError:
+            return None
+        return result.scalar_one_or_none()
+
+    async def retrieve_users(
+        self, after: Keyset | None = None, limit: int = None
+    ) -> List[User]:
+        """Retrieve a page of users in (created_at, uuid_pk) order."""
+        result = await self.sess.scalars(
+            keyset(select(User), User, after, limit)
+        )
+        return list(result.all())
+
+    async def retrieve_users_sorted_desc(
+        self, after: str | None = None, limit: int = None
+    ) -> List[User]:
+        """Retrieve a page of users in descending username order."""
+        result = await self.sess.scalars(users_by_username(after, limit))
+        return list(result.all())
+
+    async def update_user(self, uuid_pk: str, data):
+        """
+        Update a user data in the database.
+
+        Args:
+            uuid_pk (str): The grantor unique identifier
+            data: The validated UpdateUser body
+        Returns:
+            The updated dashboard, loaded by the UPDATE statement itself,
+            False if the user was not found or not updated
+        """
+        try:
+            result = await self.sess.execute(
+                dashboard_statement(uuid_pk, data)
+            )
+            row = result.mappings().one_or_none()
+            if row:
+                await self.sess.commit()
+                principal_cache.invalidate(uuid_pk)
+                return dict(row)
+            return False
+        except DataError:
+            return False
+
+    async def get_summary(self, uuid_pk: str) -> EstateSummary | None:
+        """Retrieve a grantor's estate summary by primary key."""
+        try:
+            return await self.sess.get(EstateSummary, uuid_pk)
+        except DataError:
+            return None
+
+    async def export_estate(
+        self, uuid_pk: str, as_csv: bool = False
+    ) -> AsyncIterator[Row] | None:
+        """
+        Export a grantor's whole estate.
+
+        Rows are streamed settings.STREAM_BATCH_SIZE at a time while the
+        returned iterator is consumed, so the session must stay open
+        until it is exhausted.
+
+        Args:
+            uuid_pk (str): The grantor unique identifier
+            as_csv (bool): Export EXPORT_FIELDS columns instead of JSON
+        Returns:
+            The exported rows, None if the grantor does not exist
+        """
+        try:
+            result = await self.sess.stream(export_statement(uuid_pk, as_csv))
+            first = await result.fetchone()
+        except DataError:
+            return None
+        if first is None:
+            return None
+        return aexport_rows(first, result)
+
+    async def delete_user(self, uuid_pk: str) -> bool:
+        """Delete user."""
+        try:
+            result = await self.sess.execute(
+                delete_returning(User, uuid_pk=uuid_pk)
+            )
+            if result.first():
+                await self.sess.commit()
+                principal_cache.invalidate(uuid_pk)
                 return True
             return False
         except DataError:
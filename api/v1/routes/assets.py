@@ -2,14 +2,23 @@
 """Assets router for Estate Trust."""
 
 from typing import List
-from fastapi import APIRouter, HTTPException, Depends, status
-from sqlalchemy.orm import Session
-from api.v1.authorizations.oauth import get_current_user
-from api.v1.configurations.database import get_db
-from api.v1.models.data.users import User
-from api.v1.models.schemas.assets import AddAsset, AssetRes, UpdateAsset
-from api.v1.repositories.assets import AssetRepository
-from api.v1.utils.documents import download_file, upload_file
+from fastapi import (
+    APIRouter, Body, HTTPException, Depends, Request, Response, status
+)
+from fastapi.concurrency import run_in_threadpool
+from api.v1.authorizations.oauth import (
+    get_current_user, get_token_principal
+)
+from api.v1.models.schemas.assets import (
+    AddAsset, AssetRes, BatchItem, BulkDelete, DocumentRes, UpdateAsset
+)
+from api.v1.repositories.providers import (
+    asset_repository, document_repository
+)
+from api.v1.utils.documents import (
+    discard_upload, download_file, receive_document
+)
+from api.v1.utils.pagination import Pagination
 
 asset_router = APIRouter(
     prefix="/assets",
@@ -24,7 +33,7 @@ asset_router = APIRouter(
 async def create_asset(
     grantor_id: str, data: AddAsset,
     current_user: str = Depends(get_current_user),
-    sess: Session = Depends(get_db)
+    repo=Depends(asset_repository)
 ):
     """
     Add asset to database.
@@ -36,17 +45,9 @@ async def create_asset(
     Returns:
         Status code 201 on successful, otherwise 422.
     """
-    repo = AssetRepository(sess)
     if current_user.uuid_pk == grantor_id:
         data.owner_id = grantor_id
-        if data.document is not None:
-            up_file = await upload_file(
-                uuid_pk=grantor_id,
-                file=data.document
-            )
-            data.document = up_file["filename"]
-            added = repo.add_asset(data=data)
-        added = repo.add_asset(data=data)
+        added = await repo.add_asset(data=data)
         if added:
             return {
                 "message": "asset added successfully"
@@ -57,15 +58,75 @@ async def create_asset(
         )
 
 
-@asset_router.get("/asset/download/{file_name}")
+@asset_router.post(
+    "/{grantor_id}/create/assets",
+    status_code=status.HTTP_201_CREATED,
+    response_model=List[BatchItem],
+    response_model_exclude_none=True
+)
+async def create_assets(
+    grantor_id: str,
+    data: List[AddAsset] = Body(min_length=1, max_length=500),
+    current_user: str = Depends(get_current_user),
+    repo=Depends(asset_repository)
+):
+    """
+    Add several assets in one transaction.
+
+    Method: POST
+    Args:
+        grantor_id (str): ID of the grantor
+        data (list): the assets to add
+    Returns:
+        return 201 with the uuid_pk of every item, 422 with the errors of
+        the invalid items, in which case nothing is added
+    """
+    if current_user.uuid_pk != grantor_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="not allowed to add assets for this grantor"
+        )
+    results = await repo.add_assets(grantor_id, data)
+    errors = [item for item in results if "error" in item]
+    if errors:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=errors
+        )
+    return results
+
+
+@asset_router.get("/asset/download/{file_name:path}")
 async def download_file_route(
     file_name: str, grantor_id: str,
-    current_user: str = Depends(get_current_user)
+    current_user: str = Depends(get_token_principal),
+    repo=Depends(document_repository)
 ):
-    """Download file route."""
-    if current_user.uuid_pk == grantor_id:
-        file = await download_file(file_name)
-        return file
+    """
+    Download a grantor's document.
+
+    Methods:
+        GET
+    Args:
+        file_name (str): The stored name of the document
+        grantor_id (str): ID of the grantor
+    Returns:
+        The document, 404 if the grantor has no such document.
+    """
+    if current_user.uuid_pk != grantor_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="not allowed to download this grantor's documents"
+        )
+    document = await repo.find_document(
+        owner_id=grantor_id, storage_key=file_name
+    )
+    if document is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="document not found"
+        )
+    return await download_file(document.storage_key, document.content_type)
 
 
 @asset_router.get(
@@ -73,60 +134,65 @@ async def download_file_route(
     response_model=List[AssetRes]
 )
 async def retrieve_assets(
-    grantor_id: str, current_user: str = Depends(get_current_user),
-    sess: Session = Depends(get_db)
+    grantor_id: str, response: Response,
+    current_user: str = Depends(get_token_principal),
+    page: Pagination = Depends(), repo=Depends(asset_repository)
 ):
     """
-    Retrieve all assets for a specific grantor.
+    Retrieve a page of assets for a specific grantor.
 
     Methods:
         GET
     Returns:
         Status code 200 on successful, otherwise 204.
+        X-Next-Cursor is set when another page follows.
     """
-    repo = AssetRepository(sess)
     if current_user.uuid_pk == grantor_id:
-        assets = repo.get_all_assests_for_grantor(user_id=grantor_id)
+        assets = await repo.get_all_assests_for_grantor(
+            user_id=grantor_id, after=page.after, limit=page.limit
+        )
         if assets is None:
             raise HTTPException(
                 status_code=status.HTTP_204_NO_CONTENT,
                 detail="no assets found"
             )
-        return assets
+        return page.page(assets, response)
 
 
 @asset_router.get(
     "/beneficiary/{bene_id}/assets", response_model=List[AssetRes]
 )
 async def retrieve_assets_for_beneficiary(
-    bene_id: str,
+    bene_id: str, response: Response,
     current_user: str = Depends(get_current_user),
-    sess: Session = Depends(get_db)
+    page: Pagination = Depends(), repo=Depends(asset_repository)
 ):
     """
-    Retrieve all assets for a specific beneficiary.
+    Retrieve a page of assets for a specific beneficiary.
 
     Methods:
         GET
     Returns:
         Status code 200 on successful, otherwise 204.
+        X-Next-Cursor is set when another page follows.
     """
-    repo = AssetRepository(sess)
     if current_user:
-        assets = repo.get_all_assests_for_beneficiary(user_id=bene_id)
+        assets = await repo.get_all_assests_for_beneficiary(
+            user_id=bene_id, after=page.after, limit=page.limit
+        )
         if assets is None:
             raise HTTPException(
                 status_code=status.HTTP_204_NO_CONTENT,
                 detail="no assets found"
             )
-        return assets
+        return page.page(assets, response)
 
 
 @asset_router.get("/{grantor_id}/assets/{asset_id}", response_model=AssetRes)
 async def retrieve_asset(
     grantor_id: str, asset_id: str,
     current_user: str = Depends(get_current_user),
-    sess: Session = Depends(get_db)
+    repo=Depends(asset_repository)
 ):
     """
     Retrieve an asset.
@@ -136,9 +202,8 @@ async def retrieve_asset(
     Returns:
         Status code 200 on successful, otherwise 404.
     """
-    repo = AssetRepository(sess)
     if current_user:
-        asset = repo.get_asset(user_id=grantor_id, asset_id=asset_id)
+        asset = await repo.get_asset(user_id=grantor_id, asset_id=asset_id)
         if asset:
             return asset
         raise HTTPException(
@@ -154,7 +219,7 @@ async def retrieve_asset(
 async def update_asset(
     grantor_id: str, asset_id: str, data: UpdateAsset,
     current_user: str = Depends(get_current_user),
-    sess: Session = Depends(get_db)
+    repo=Depends(asset_repository)
 ):
     """
     Update an asset.
@@ -162,28 +227,72 @@ async def update_asset(
     Methods:
         PATCH
     Returns:
-        Status code 200 on successful, otherwise 304.
+        Status code 200 on successful, 403 for another grantor's asset,
+        otherwise 304.
     """
-    repo = AssetRepository(sess)
-    if current_user:
-        if data.document is not None:
-            up_file = await upload_file(
-                uuid_pk=grantor_id,
-                file=data.document
-            )
-            data.document = up_file["filename"]
-            asset = repo.update_asset(
-                user_id=grantor_id, asset_id=asset_id, data=data
-            )
-        asset = repo.update_asset(
-            user_id=grantor_id, asset_id=asset_id, data=data
+    if current_user.uuid_pk != grantor_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="not allowed to update this asset"
         )
-        if asset:
-            return asset
+    asset = await repo.update_asset(
+        user_id=grantor_id, asset_id=asset_id, data=data
+    )
+    if asset:
+        return asset
+    raise HTTPException(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        detail="error occurred while updating asset data"
+    )
+
+
+@asset_router.put(
+    "/{grantor_id}/assets/{asset_id}/document", response_model=DocumentRes
+)
+async def upload_asset_document(
+    grantor_id: str, asset_id: str, request: Request,
+    current_user: str = Depends(get_current_user),
+    repo=Depends(document_repository)
+):
+    """
+    Upload the document of an asset as multipart/form-data.
+
+    The file field is streamed to storage as it arrives, so large scans
+    are never held in memory, and the asset is only looked up once the
+    upload is complete, so no database connection waits on the client.
+    Content already stored is only referenced, not stored again.
+
+    Methods:
+        PUT
+    Args:
+        grantor_id (str): ID of the grantor
+        asset_id (str): ID of the asset
+    Returns:
+        Status code 200 with the stored document, 404 if the grantor has
+        no such asset, 413 past settings.DOCUMENT_MAX_SIZE.
+    """
+    if current_user.uuid_pk != grantor_id:
         raise HTTPException(
-            status_code=status.HTTP_304_NOT_MODIFIED,
-            detail="error occurred while updating asset data"
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="not allowed to upload documents for this grantor"
+        )
+    document = await receive_document(request)
+    try:
+        attached = await repo.attach_document(
+            owner_id=grantor_id, kind="assets", parent_id=asset_id,
+            document=document
+        )
+    finally:
+        await run_in_threadpool(discard_upload, document["upload"])
+    if not attached:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="asset not found"
         )
+    return DocumentRes(
+        filename=attached.storage_key, size=attached.size,
+        sha256=attached.sha256, content_type=attached.content_type
+    )
 
 
 @asset_router.delete(
@@ -193,7 +302,7 @@ async def update_asset(
 async def delete_asset(
     grantor_id: str, asset_id: str,
     current_user: str = Depends(get_current_user),
-    sess: Session = Depends(get_db)
+    repo=Depends(asset_repository)
 ):
     """
     Delete an asset.
@@ -201,16 +310,59 @@ async def delete_asset(
     Methods:
         DELETE
     Returns:
-        Status code 204 on successful, otherwise 304.
+        Status code 204 on successful, 403 for another grantor's asset,
+        otherwise 304.
     """
-    repo = AssetRepository(sess)
-    if current_user:
-        asset = repo.delete_asset(
-            user_id=grantor_id, asset_id=asset_id
+    if current_user.uuid_pk != grantor_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="not allowed to delete this asset"
         )
-        if asset:
-            return
+    asset = await repo.delete_asset(
+        user_id=grantor_id, asset_id=asset_id
+    )
+    if asset:
+        return
+    raise HTTPException(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        detail="error occurred while deleting asset"
+    )
+
+
+@asset_router.post(
+    "/{grantor_id}/assets/bulk/delete",
+    status_code=status.HTTP_204_NO_CONTENT
+)
+async def delete_assets(
+    grantor_id: str, data: BulkDelete,
+    current_user: str = Depends(get_current_user),
+    repo=Depends(asset_repository)
+):
+    """
+    Delete several assets in one transaction.
+
+    Method: POST
+    Args:
+        grantor_id (str): ID of the grantor
+        data: IDs of the assets to delete
+    Returns:
+        return 204 on success, 404 listing the ids not found
+    """
+    if current_user.uuid_pk != grantor_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="not allowed to delete these assets"
+        )
+    missing = await repo.delete_assets(
+        user_id=grantor_id, asset_ids=[str(uuid_pk) for uuid_pk in data.ids]
+    )
+    if missing:
         raise HTTPException(
-            status_code=status.HTTP_304_NOT_MODIFIED,
-            detail="error occurred while deleting asset"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"missing": missing}
+        )
+    if missing is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="error occurred while deleting assets"
         )
@@ -2,12 +2,13 @@
 """Authenticate API routes for Estate Trust."""
 
 from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from api.v1.authorizations.oauth import create_token
 from api.v1.configurations.database import get_db
 from api.v1.models.data.users import User, Trustee
 from api.v1.models.schemas.users import SignInUser
-from api.v1.utils.passwd import verify_pwd
+from api.v1.utils.passwd import averify_pwd
 
 auths_routers = APIRouter(prefix="/auths", tags=["Authenticate",])
 
@@ -25,21 +26,25 @@ async def login(data: SignInUser, sess: Session = Depends(get_db)):
         Status code 200 on successful, otherwise 401.
     """
     if data.account_type == "grantor":
-        q_user: User | None = sess.query(User).filter(
-            User.username == data.username
-        ).first()
+        q_user: User | None = await run_in_threadpool(
+            sess.query(User).filter(User.username == data.username).first
+        )
     elif data.account_type == "trustee":
-        q_user: Trustee | None = sess.query(Trustee).filter(
-            Trustee.username == data.username
-        ).first()
+        q_user: Trustee | None = await run_in_threadpool(
+            sess.query(Trustee).filter(
+                Trustee.username == data.username
+            ).first
+        )
     try:
-        if q_user and verify_pwd(data.password, q_user.password):
-            access_token = create_token(
-                data={
-                    "uuid_pk": q_user.uuid_pk,
-                    "username": q_user.username
-                }
-            )
+        if q_user and await averify_pwd(data.password, q_user.password):
+            claims = {
+                "uuid_pk": q_user.uuid_pk,
+                "username": q_user.username,
+                "account_type": data.account_type
+            }
+            if data.account_type == "trustee":
+                claims["added_by"] = q_user.added_by
+            access_token = create_token(data=claims)
             return {
                 "access_token": access_token,
                 "token_type": "bearer",
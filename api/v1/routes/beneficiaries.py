@@ -2,15 +2,22 @@
 """Beneficiaries router for Estate Trust."""
 
 from typing import List
-from fastapi import APIRouter, HTTPException, Depends, status
-from sqlalchemy.orm import Session
-from api.v1.authorizations.oauth import get_current_user
-from api.v1.configurations.database import get_db
-from api.v1.models.data.users import User
+from fastapi import (
+    APIRouter, Body, HTTPException, Depends, Query, Response, status
+)
+from fastapi.responses import StreamingResponse
+from api.v1.authorizations.oauth import (
+    get_current_user, get_token_principal
+)
+from api.v1.configurations.settings import settings
+from api.v1.models.schemas.assets import BatchItem, BulkDelete
 from api.v1.models.schemas.users import (
-    AddBeneficiary, BeneficiaryRes, UpdateBeneficiary
+    AddBeneficiary, BeneficiaryMatch, BeneficiaryRes, UpdateBeneficiary
 )
-from api.v1.repositories.beneficiaries import BeneficiaryRepo
+from api.v1.repositories.providers import beneficiary_repository
+from api.v1.utils.duplicates import refuse_duplicates
+from api.v1.utils.pagination import Pagination
+from api.v1.utils.streaming import json_array
 
 beneficiary_router = APIRouter(
     prefix="/beneficiaries",
@@ -24,8 +31,9 @@ beneficiary_router = APIRouter(
 )
 async def create_beneficiary(
     grantor_id: str, data: AddBeneficiary,
+    check_duplicates: bool = False,
     current_user: str = Depends(get_current_user),
-    sess: Session = Depends(get_db)
+    repo=Depends(beneficiary_repository)
 ):
     """
     Add new beneficiary to the database.
@@ -33,14 +41,20 @@ async def create_beneficiary(
     Method: POST
     Args:
         data (dict): dictionary containing beneficiary's information
+        check_duplicates (bool): refuse to add a beneficiary resembling
+            one the grantor already has
     Returns:
-        return 201 if successful, 422 otherwise
+        return 201 if successful, 409 with the possible duplicates,
+        422 otherwise
     """
-    repo = BeneficiaryRepo(sess)
     if current_user.uuid_pk == grantor_id:
-        grantor = sess.query(User).filter(User.uuid_pk == grantor_id).first()
-        data.added_by = grantor.uuid_pk
-        add_beneficiary = repo.add_beneficiary(data)
+        data.added_by = grantor_id
+        if check_duplicates:
+            refuse_duplicates(
+                await repo.possible_duplicates(grantor_id, data),
+                BeneficiaryMatch
+            )
+        add_beneficiary = await repo.add_beneficiary(data)
         if add_beneficiary:
             return {
                 "message": "Beneficiary added successfully"
@@ -51,43 +65,148 @@ async def create_beneficiary(
         )
 
 
+@beneficiary_router.post(
+    "/account/{grantor_id}/create/beneficiaries",
+    status_code=status.HTTP_201_CREATED,
+    response_model=List[BatchItem],
+    response_model_exclude_none=True
+)
+async def create_beneficiaries(
+    grantor_id: str,
+    data: List[AddBeneficiary] = Body(min_length=1, max_length=500),
+    current_user: str = Depends(get_current_user),
+    repo=Depends(beneficiary_repository)
+):
+    """
+    Add several beneficiaries in one transaction.
+
+    Method: POST
+    Args:
+        grantor_id (str): ID of the grantor
+        data (list): the beneficiaries to add
+    Returns:
+        return 201 with the uuid_pk of every item, 422 with the errors of
+        the invalid items, in which case nothing is added
+    """
+    if current_user.uuid_pk != grantor_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="not allowed to add beneficiaries for this grantor"
+        )
+    results = await repo.add_beneficiaries(grantor_id, data)
+    errors = [item for item in results if "error" in item]
+    if errors:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=errors
+        )
+    return results
+
+
 @beneficiary_router.get(
     "/account/{user_id}/beneficiaries",
     response_model=List[BeneficiaryRes]
 )
 async def retrieve_beneficiaries(
-    user_id: str,
-    current_user: str = Depends(get_current_user),
-    sess: Session = Depends(get_db)
+    user_id: str, response: Response,
+    current_user: str = Depends(get_token_principal),
+    page: Pagination = Depends(), repo=Depends(beneficiary_repository)
 ):
     """
-    Retrieve all the beneficiaries information associated with a given grantor.
+    Retrieve a page of the beneficiaries associated with a given grantor.
 
     Method: GET
     Args:
         user_id (str): ID of the grantor
     Returns:
-        list of beneficiaries information
+        list of beneficiaries information, with X-Next-Cursor set when
+        another page follows
     """
-    repo = BeneficiaryRepo(sess)
     if current_user.uuid_pk == user_id:
-        beneficiaries = repo.get_all_beneficiaries(user_id=user_id)
+        beneficiaries = await repo.get_all_beneficiaries(
+            user_id=user_id, after=page.after, limit=page.limit
+        )
         if beneficiaries:
-            return beneficiaries
+            return page.page(beneficiaries, response)
         raise HTTPException(
             status_code=status.HTTP_204_NO_CONTENT,
             detail="no beneficiaries found"
         )
 
 
+@beneficiary_router.get(
+    "/account/{grantor_id}/search", response_model=List[BeneficiaryMatch]
+)
+async def search_beneficiaries(
+    grantor_id: str,
+    q: str = Query(min_length=1, max_length=100),
+    limit: int = Query(settings.FUZZY_MATCH_LIMIT, ge=1, le=50),
+    current_user: str = Depends(get_token_principal),
+    repo=Depends(beneficiary_repository)
+):
+    """
+    Suggest a grantor's beneficiaries as their name is typed.
+
+    Method: GET
+    Args:
+        grantor_id (str): ID of the grantor
+        q (str): the name, or part of it, misspellings allowed
+    Returns:
+        the closest matches first, 403 unless requested by the grantor
+    """
+    if current_user.uuid_pk != grantor_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="not allowed to search these beneficiaries"
+        )
+    return await repo.search_beneficiaries(grantor_id, q, limit)
+
+
+@beneficiary_router.get(
+    "/account/{grantor_id}/distribution",
+    response_class=StreamingResponse
+)
+async def retrieve_distribution(
+    grantor_id: str,
+    current_user: str = Depends(get_token_principal),
+    repo=Depends(beneficiary_repository)
+):
+    """
+    Report what each beneficiary of a grantor receives.
+
+    Every entry carries the beneficiary, their asset count and assets,
+    and their monetary assets with totals per currency. The report is
+    computed in one query and streamed as a JSON array.
+
+    Method: GET
+    Args:
+        grantor_id (str): ID of the grantor
+    Returns:
+        the report, 403 unless requested by the grantor or one of their
+        trustees, 404 if the grantor does not exist
+    """
+    if grantor_id not in (current_user.uuid_pk, current_user.added_by):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="not allowed to view this estate"
+        )
+    report = await repo.get_distribution(grantor_id)
+    if report is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="grantor not found"
+        )
+    return StreamingResponse(json_array(report), media_type="application/json")
+
+
 @beneficiary_router.get(
     "/account/{user_id}/beneficiaries/{bene_id}",
     response_model=BeneficiaryRes
 )
 async def get_beneficiary(
     user_id: str, bene_id: str,
-    current_user: str = Depends(get_current_user),
-    sess: Session = Depends(get_db)
+    current_user: str = Depends(get_token_principal),
+    repo=Depends(beneficiary_repository)
 ):
     """
     Retrieve a beneficiary information for a given user.
@@ -99,9 +218,8 @@ async def get_beneficiary(
     Returns:
         dictionary of beneficiary's information
     """
-    repo = BeneficiaryRepo(sess)
     if current_user.uuid_pk == user_id:
-        beneficiary = repo.get_beneficiary(
+        beneficiary = await repo.get_beneficiary(
             uuid_pk=bene_id, added_by=user_id
         )
         if beneficiary:
@@ -119,7 +237,7 @@ async def get_beneficiary(
 async def update_beneficiary(
     grantor_id: str, bene_id: str, data: UpdateBeneficiary,
     current_user: str = Depends(get_current_user),
-    sess: Session = Depends(get_db)
+    repo=Depends(beneficiary_repository)
 ):
     """
     Update the beneficiary data in the database.
@@ -132,9 +250,8 @@ async def update_beneficiary(
     Returns:
         dictionary of beneficiary's information
     """
-    repo = BeneficiaryRepo(sess)
     if current_user.uuid_pk == grantor_id:
-        beneficiary = repo.update_beneficiary(
+        beneficiary = await repo.update_beneficiary(
             added_by=grantor_id, uuid_pk=bene_id, data=data
         )
         if beneficiary:
@@ -152,7 +269,7 @@ async def update_beneficiary(
 async def delete_beneficiary(
     grantor_id: str, bene_id: str,
     current_user: str = Depends(get_current_user),
-    sess: Session = Depends(get_db)
+    repo=Depends(beneficiary_repository)
 ):
     """
     Delete a beneficiary from the database.
@@ -164,9 +281,8 @@ async def delete_beneficiary(
     Returns:
         return 204 on success, 304 on failure
     """
-    repo = BeneficiaryRepo(sess)
     if current_user.uuid_pk == grantor_id:
-        del_beneficiary = repo.delete_beneficiary(
+        del_beneficiary = await repo.delete_beneficiary(
             added_by=grantor_id, uuid_pk=bene_id
         )
         if not del_beneficiary:
@@ -174,3 +290,43 @@ async def delete_beneficiary(
                 status_code=status.HTTP_304_NOT_MODIFIED,
                 detail="error occurred while deleting beneficiary"
             )
+
+
+@beneficiary_router.post(
+    "/account/{grantor_id}/beneficiaries/bulk/delete",
+    status_code=status.HTTP_204_NO_CONTENT
+)
+async def delete_beneficiaries(
+    grantor_id: str, data: BulkDelete,
+    current_user: str = Depends(get_current_user),
+    repo=Depends(beneficiary_repository)
+):
+    """
+    Delete several beneficiaries in one transaction.
+
+    Method: POST
+    Args:
+        grantor_id (str): ID of the grantor
+        data: IDs of the beneficiaries to delete
+    Returns:
+        return 204 on success, 404 listing the ids not found
+    """
+    if current_user.uuid_pk != grantor_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="not allowed to delete these beneficiaries"
+        )
+    missing = await repo.delete_beneficiaries(
+        added_by=grantor_id,
+        uuid_pks=[str(uuid_pk) for uuid_pk in data.ids]
+    )
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"missing": missing}
+        )
+    if missing is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="error occurred while deleting beneficiaries"
+        )
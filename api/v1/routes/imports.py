@@ -0,0 +1,59 @@
+#!/usr/bin/python3
+"""Import router for Estate Trust."""
+
+from io import TextIOWrapper
+from typing import Literal
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from api.v1.authorizations.oauth import get_current_user
+from api.v1.repositories.providers import import_repository
+
+import_router = APIRouter(
+    prefix="/imports",
+    tags=["imports"]
+)
+
+
+@import_router.post(
+    "/grantor/{grantor_id}/{kind}", status_code=status.HTTP_201_CREATED
+)
+async def import_csv(
+    grantor_id: str,
+    kind: Literal["assets", "monetaries", "beneficiaries"],
+    file: UploadFile = File(),
+    current_user: str = Depends(get_current_user),
+    repo=Depends(import_repository)
+):
+    """
+    Import assets, monetary assets or beneficiaries from a CSV file.
+
+    The header names the fields of the matching create route; assets and
+    monetary assets are willed to the uuid_pk of one of the grantor's
+    beneficiaries.
+
+    Methods:
+        POST
+    Args:
+        grantor_id (str): ID of the grantor
+        kind (str): What the rows are
+        file (UploadFile): The UTF-8 CSV file
+    Returns:
+        Status code 201 with the number of rows imported, 422 with the
+        row-level error report, in which case nothing is imported, 403
+        unless requested by the grantor.
+    """
+    if current_user.uuid_pk != grantor_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="not allowed to import for this grantor"
+        )
+    stream = TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        report = await repo.import_csv(grantor_id, kind, stream)
+    finally:
+        stream.detach()
+    if report["invalid"]:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=report
+        )
+    return report
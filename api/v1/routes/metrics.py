@@ -0,0 +1,32 @@
+#!/usr/bin/python3
+"""Metrics router for Estate Trust."""
+
+from fastapi import APIRouter, Depends
+from api.v1.authorizations.cache import principal_cache
+from api.v1.authorizations.oauth import get_metrics_scraper
+from api.v1.configurations.database import pool_stats, read_router
+from api.v1.utils.passwd import password_service
+
+metrics_router = APIRouter(
+    prefix="/metrics", tags=["metrics"],
+    dependencies=[Depends(get_metrics_scraper)]
+)
+
+
+@metrics_router.get("/")
+def get_metrics() -> dict:
+    """
+    Report in-process counters to the monitoring system.
+
+    Methods:
+        GET
+    Returns:
+        Dictionary of counters keyed by component, 401 without the
+        metrics token, 404 while none is configured.
+    """
+    return {
+        "principal_cache": principal_cache.stats(),
+        "password_pool": password_service.stats(),
+        "db_pool": pool_stats(),
+        "read_routing": read_router.stats()
+    }
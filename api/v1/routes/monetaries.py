@@ -2,15 +2,22 @@
 """Monetaries router for Estate Trust."""
 
 from typing import List
-from fastapi import APIRouter, HTTPException, Depends, status
-from sqlalchemy.orm import Session
-from api.v1.authorizations.oauth import get_current_user
-from api.v1.configurations.database import get_db
+from fastapi import (
+    APIRouter, Body, HTTPException, Depends, Request, Response, status
+)
+from fastapi.concurrency import run_in_threadpool
+from api.v1.authorizations.oauth import (
+    get_current_user, get_token_principal
+)
 from api.v1.models.schemas.assets import (
-    AddMonetary, MonetaryRes, UpdateMonetary
+    AddMonetary, BatchItem, BulkDelete, DocumentRes, EstateTotals,
+    MonetaryRes, UpdateMonetary
+)
+from api.v1.repositories.providers import (
+    document_repository, monetary_repository
 )
-from api.v1.repositories.monetaries import MonetaryRepository
-from api.v1.utils.documents import upload_file
+from api.v1.utils.documents import discard_upload, receive_document
+from api.v1.utils.pagination import Pagination
 
 monetary_router = APIRouter(
     prefix="/monetaries",
@@ -25,7 +32,7 @@ monetary_router = APIRouter(
 async def create_monetary_asset(
     grantor_id: str, data: AddMonetary,
     current_user: str = Depends(get_current_user),
-    sess: Session = Depends(get_db)
+    repo=Depends(monetary_repository)
 ):
     """
     Add a new monetary asset.
@@ -36,17 +43,9 @@ async def create_monetary_asset(
     Returns:
         return 201 if successful, 422 otherwise
     """
-    repo = MonetaryRepository(sess)
     if current_user.uuid_pk == grantor_id:
         data.owner_id = grantor_id
-        if data.document is not None:
-            up_file = await upload_file(
-                grantor_id,
-                data.document
-            )
-            data.document = up_file["filename"]
-            added = repo.add_monetary_asset(data=data)
-        added = repo.add_monetary_asset(data=data)
+        added = await repo.add_monetary_asset(data=data)
         if added:
             return {
                 "message": "monetary asset added successfully"
@@ -57,62 +56,135 @@ async def create_monetary_asset(
         )
 
 
+@monetary_router.post(
+    "/asset/{grantor_id}/create/monetaries",
+    status_code=status.HTTP_201_CREATED,
+    response_model=List[BatchItem],
+    response_model_exclude_none=True
+)
+async def create_monetary_assets(
+    grantor_id: str,
+    data: List[AddMonetary] = Body(min_length=1, max_length=500),
+    current_user: str = Depends(get_current_user),
+    repo=Depends(monetary_repository)
+):
+    """
+    Add several monetary assets in one transaction.
+
+    Method: POST
+    Args:
+        grantor_id (str): ID of the grantor
+        data (list): the monetary assets to add
+    Returns:
+        return 201 with the uuid_pk of every item, 422 with the errors of
+        the invalid items, in which case nothing is added
+    """
+    if current_user.uuid_pk != grantor_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="not allowed to add monetary assets for this grantor"
+        )
+    results = await repo.add_monetary_assets(grantor_id, data)
+    errors = [item for item in results if "error" in item]
+    if errors:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=errors
+        )
+    return results
+
+
 @monetary_router.get(
     "/asset/grantor/{grantor_id}/assets",
     response_model=List[MonetaryRes]
 )
 async def retrieve_monetary_assets(
-    grantor_id: str, current_user: str = Depends(get_current_user),
-    sess: Session = Depends(get_db)
+    grantor_id: str, response: Response,
+    current_user: str = Depends(get_token_principal),
+    page: Pagination = Depends(), repo=Depends(monetary_repository)
 ):
     """
-    Retrieve all assets for a specific grantor.
+    Retrieve a page of assets for a specific grantor.
 
     Method: GET
     Args:
         grantor_id (str): ID of the grantor
     Returns:
-        list of monentary assets information
+        list of monentary assets information, with X-Next-Cursor set
+        when another page follows
     """
-    repo = MonetaryRepository(sess)
     if current_user.uuid_pk == grantor_id:
-        assets = repo.get_all_monetary_assets_for_grantor(
-            grantor_id=grantor_id
+        assets = await repo.get_all_monetary_assets_for_grantor(
+            grantor_id=grantor_id, after=page.after, limit=page.limit
         )
         if assets is None:
             raise HTTPException(
                 status_code=status.HTTP_204_NO_CONTENT,
                 detail="no assets found"
             )
-        return assets
+        return page.page(assets, response)
+
+
+@monetary_router.get(
+    "/asset/grantor/{grantor_id}/totals", response_model=EstateTotals
+)
+async def retrieve_estate_totals(
+    grantor_id: str,
+    current_user: str = Depends(get_token_principal),
+    repo=Depends(monetary_repository)
+):
+    """
+    Retrieve the monetary valuation of a grantor's estate.
+
+    Method: GET
+    Args:
+        grantor_id (str): ID of the grantor
+    Returns:
+        the sums per currency and per beneficiary and currency, 403 for
+        another grantor, 404 if the grantor does not exist
+    """
+    if current_user.uuid_pk != grantor_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="not allowed to view this estate"
+        )
+    totals = await repo.get_estate_totals(grantor_id)
+    if totals is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="grantor not found"
+        )
+    return totals
 
 
 @monetary_router.get(
     "/asset/beneficiary/{bene_id}/assets", response_model=List[MonetaryRes]
 )
 async def retrieve_monetary_assets_for_beneficiary(
-    bene_id: str,
+    bene_id: str, response: Response,
     current_user: str = Depends(get_current_user),
-    sess: Session = Depends(get_db)
+    page: Pagination = Depends(), repo=Depends(monetary_repository)
 ):
     """
-    Retrieve all assets for a specific beneficiary.
+    Retrieve a page of assets for a specific beneficiary.
 
     Method: GET
     Args:
         bene_id (str): ID of the beneficiary
     Returns:
-        list of monentary assets information
+        list of monentary assets information, with X-Next-Cursor set
+        when another page follows
     """
-    repo = MonetaryRepository(sess)
     if current_user:
-        assets = repo.get_all_monetary_assets_for_beneficiary(will_to=bene_id)
+        assets = await repo.get_all_monetary_assets_for_beneficiary(
+            will_to=bene_id, after=page.after, limit=page.limit
+        )
         if assets is None:
             raise HTTPException(
                 status_code=status.HTTP_204_NO_CONTENT,
                 detail="no assets found"
             )
-        return assets
+        return page.page(assets, response)
 
 
 @monetary_router.get(
@@ -122,7 +194,7 @@ async def retrieve_monetary_assets_for_beneficiary(
 async def retrieve_monetary_asset(
     grantor_id: str, asset_id: str,
     current_user: str = Depends(get_current_user),
-    sess: Session = Depends(get_db)
+    repo=Depends(monetary_repository)
 ):
     """
     Retrieve a monetary asset.
@@ -134,9 +206,8 @@ async def retrieve_monetary_asset(
     Returns:
         dictionary of asset's information
     """
-    repo = MonetaryRepository(sess)
     if current_user:
-        asset = repo.get_asset(grantor_id=grantor_id, asset_id=asset_id)
+        asset = await repo.get_asset(grantor_id=grantor_id, asset_id=asset_id)
         if asset:
             return asset
         raise HTTPException(
@@ -152,7 +223,7 @@ async def retrieve_monetary_asset(
 async def update_asset(
     grantor_id: str, asset_id: str, data: UpdateMonetary,
     current_user: str = Depends(get_current_user),
-    sess: Session = Depends(get_db)
+    repo=Depends(monetary_repository)
 ):
     """
     Update an asset.
@@ -163,28 +234,74 @@ async def update_asset(
         asset_id (str): ID of the asset to be updated
         data: dictionary containing asset's data to be updated
     Returns:
-        dictionary of asset's information
+        dictionary of asset's information, 403 for another grantor's
+        asset
     """
-    repo = MonetaryRepository(sess)
-    if current_user:
-        if data.document is not None:
-            up_file = await upload_file(
-                grantor_id,
-                data.document
-            )
-            data.document = up_file["filename"]
-            asset = repo.update_asset(
-                grantor_id=grantor_id, asset_id=asset_id, data=data
-            )
-        asset = repo.update_asset(
-            grantor_id=grantor_id, asset_id=asset_id, data=data
+    if current_user.uuid_pk != grantor_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="not allowed to update this asset"
         )
-        if asset:
-            return asset
+    asset = await repo.update_asset(
+        grantor_id=grantor_id, asset_id=asset_id, data=data
+    )
+    if asset:
+        return asset
+    raise HTTPException(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        detail="error occurred while updating asset data"
+    )
+
+
+@monetary_router.put(
+    "/asset/grantor/{grantor_id}/assets/{asset_id}/document",
+    response_model=DocumentRes
+)
+async def upload_monetary_document(
+    grantor_id: str, asset_id: str, request: Request,
+    current_user: str = Depends(get_current_user),
+    repo=Depends(document_repository)
+):
+    """
+    Upload the document of a monetary asset as multipart/form-data.
+
+    The file field is streamed to storage as it arrives, so large
+    statements are never held in memory, and the monetary asset is only
+    looked up once the upload is complete, so no database connection
+    waits on the client. Content already stored is only referenced, not
+    stored again.
+
+    Methods:
+        PUT
+    Args:
+        grantor_id (str): ID of the grantor
+        asset_id (str): ID of the monetary asset
+    Returns:
+        Status code 200 with the stored document, 404 if the grantor has
+        no such monetary asset, 413 past settings.DOCUMENT_MAX_SIZE.
+    """
+    if current_user.uuid_pk != grantor_id:
         raise HTTPException(
-            status_code=status.HTTP_304_NOT_MODIFIED,
-            detail="error occurred while updating asset data"
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="not allowed to upload documents for this grantor"
         )
+    document = await receive_document(request)
+    try:
+        attached = await repo.attach_document(
+            owner_id=grantor_id, kind="monetaries", parent_id=asset_id,
+            document=document
+        )
+    finally:
+        await run_in_threadpool(discard_upload, document["upload"])
+    if not attached:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="monetary asset not found"
+        )
+    return DocumentRes(
+        filename=attached.storage_key, size=attached.size,
+        sha256=attached.sha256, content_type=attached.content_type
+    )
 
 
 @monetary_router.delete(
@@ -194,7 +311,7 @@ async def update_asset(
 async def delete_asset(
     grantor_id: str, asset_id: str,
     current_user: str = Depends(get_current_user),
-    sess: Session = Depends(get_db)
+    repo=Depends(monetary_repository)
 ):
     """
     Delete an asset.
@@ -204,16 +321,60 @@ async def delete_asset(
         grantor_id (str): ID of the grantor
         asset_id (str): ID of the monetary asset
     Returns:
-        return 204 on success, 304 on failure
+        return 204 on success, 403 for another grantor's asset, 304 on
+        failure
     """
-    repo = MonetaryRepository(sess)
-    if current_user:
-        asset = repo.delete_asset(
-            grantor_id=grantor_id, asset_id=asset_id
+    if current_user.uuid_pk != grantor_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="not allowed to delete this asset"
         )
-        if asset:
-            return
+    asset = await repo.delete_asset(
+        grantor_id=grantor_id, asset_id=asset_id
+    )
+    if asset:
+        return
+    raise HTTPException(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        detail="error occurred while deleting asset"
+    )
+
+
+@monetary_router.post(
+    "/asset/grantor/{grantor_id}/assets/bulk/delete",
+    status_code=status.HTTP_204_NO_CONTENT
+)
+async def delete_assets(
+    grantor_id: str, data: BulkDelete,
+    current_user: str = Depends(get_current_user),
+    repo=Depends(monetary_repository)
+):
+    """
+    Delete several monetary assets in one transaction.
+
+    Method: POST
+    Args:
+        grantor_id (str): ID of the grantor
+        data: IDs of the monetary assets to delete
+    Returns:
+        return 204 on success, 404 listing the ids not found
+    """
+    if current_user.uuid_pk != grantor_id:
         raise HTTPException(
-            status_code=status.HTTP_304_NOT_MODIFIED,
-            detail="error occurred while deleting asset"
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="not allowed to delete these monetary assets"
+        )
+    missing = await repo.delete_assets(
+        grantor_id=grantor_id,
+        asset_ids=[str(uuid_pk) for uuid_pk in data.ids]
+    )
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"missing": missing}
+        )
+    if missing is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="error occurred while deleting monetary assets"
         )
@@ -0,0 +1,47 @@
+#!/usr/bin/python3
+"""Search router for Estate Trust."""
+
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from api.v1.authorizations.oauth import get_token_principal
+from api.v1.models.schemas.assets import SearchHit
+from api.v1.repositories.providers import search_repository
+from api.v1.utils.pagination import RankedPagination
+
+search_router = APIRouter(
+    prefix="/search",
+    tags=["search"]
+)
+
+
+@search_router.get(
+    "/grantor/{grantor_id}/estate", response_model=List[SearchHit]
+)
+async def search_estate(
+    grantor_id: str, response: Response,
+    q: str = Query(min_length=1, max_length=200),
+    current_user: str = Depends(get_token_principal),
+    page: RankedPagination = Depends(), repo=Depends(search_repository)
+):
+    """
+    Search the names, locations, banks and notes of an estate.
+
+    Methods:
+        GET
+    Args:
+        grantor_id (str): ID of the grantor
+        q (str): Words, "quoted phrases", or and -excluded words
+    Returns:
+        Status code 200 with a page of hits, best first, for the grantor
+        or their trustee, otherwise 403.
+        X-Next-Cursor is set when another page follows.
+    """
+    if grantor_id not in (current_user.uuid_pk, current_user.added_by):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied"
+        )
+    hits = await repo.search_estate(
+        grantor_id, q, after=page.after, limit=page.limit
+    )
+    return page.page(hits, response)
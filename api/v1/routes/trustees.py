@@ -2,16 +2,21 @@
 """Trustees routers for Estate Trust."""
 
 from typing import List
-from fastapi import APIRouter, HTTPException, Depends, status
-from sqlalchemy.orm import Session
-from api.v1.authorizations.oauth import get_current_user
-from api.v1.configurations.database import get_db
-from api.v1.models.data.users import Trustee, User
+from fastapi import (
+    APIRouter, HTTPException, Depends, Query, Response, status
+)
+from api.v1.authorizations.oauth import (
+    get_current_user, get_token_principal
+)
+from api.v1.configurations.settings import settings
+from api.v1.models.schemas.assets import BulkDelete
 from api.v1.models.schemas.users import (
-    AddTrustee, TrusteeRes, UpdateTrustee
+    AddTrustee, TrusteeMatch, TrusteeRes, UpdateTrustee
 )
-from api.v1.repositories.trustees import TrusteeRepository
-from api.v1.utils.passwd import hash_pwd
+from api.v1.repositories.providers import trustee_repository
+from api.v1.utils.duplicates import refuse_duplicates
+from api.v1.utils.pagination import Pagination
+from api.v1.utils.passwd import ahash_pwd
 
 trustee_router = APIRouter(prefix="/trustees", tags=["trustees"])
 
@@ -23,16 +28,25 @@ trustee_router = APIRouter(prefix="/trustees", tags=["trustees"])
 async def create_trustee(
     grantor_id: str,
     trustee: AddTrustee,
+    check_duplicates: bool = False,
     current_user: str = Depends(get_current_user),
-    sess: Session = Depends(get_db)
+    repo=Depends(trustee_repository)
 ):
-    """Create a new trustee."""
-    repo = TrusteeRepository(sess)
-    get_grantor = sess.query(User).filter(User.uuid_pk == grantor_id).first()
-    if get_grantor and current_user.uuid_pk == grantor_id:
-        trustee.added_by = get_grantor.uuid_pk
-        trustee.password = hash_pwd(trustee.password)
-        add_trustee = repo.add_trustee(trustee)
+    """
+    Create a new trustee.
+
+    With check_duplicates, a trustee resembling one the grantor already
+    has is refused with 409 and the possible duplicates.
+    """
+    if current_user.uuid_pk == grantor_id:
+        trustee.added_by = grantor_id
+        if check_duplicates:
+            refuse_duplicates(
+                await repo.possible_duplicates(grantor_id, trustee),
+                TrusteeMatch
+            )
+        trustee.password = await ahash_pwd(trustee.password)
+        add_trustee = await repo.add_trustee(trustee)
         if add_trustee:
             return {
                 "message": "Trustee added successfully"
@@ -43,19 +57,39 @@ async def create_trustee(
         )
 
 
+@trustee_router.get(
+    "/account/{grantor_id}/search", response_model=List[TrusteeMatch]
+)
+async def search_trustees(
+    grantor_id: str,
+    q: str = Query(min_length=1, max_length=100),
+    limit: int = Query(settings.FUZZY_MATCH_LIMIT, ge=1, le=50),
+    current_user: str = Depends(get_token_principal),
+    repo=Depends(trustee_repository)
+):
+    """Suggest a grantor's trustees as a name, email or phone is typed."""
+    if current_user.uuid_pk != grantor_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="not allowed to search these trustees"
+        )
+    return await repo.search_trustees(grantor_id, q, limit)
+
+
 @trustee_router.get(
     "/account/{grantor_id}/trustees/{trustee_id}",
     response_model=TrusteeRes
 )
 async def retrieve_trustee(
     grantor_id: str, trustee_id: str,
-    current_user: str = Depends(get_current_user),
-    sess: Session = Depends(get_db)
+    current_user: str = Depends(get_token_principal),
+    repo=Depends(trustee_repository)
 ):
     """Retrieve the specified trustee for the specified grantor."""
-    repo = TrusteeRepository(sess)
     if current_user.uuid_pk == grantor_id:
-        trustee = repo.get_trustee(trustee_id=trustee_id, user_id=grantor_id)
+        trustee = await repo.get_trustee(
+            trustee_id=trustee_id, user_id=grantor_id
+        )
         if trustee:
             return trustee
         raise HTTPException(
@@ -69,19 +103,21 @@ async def retrieve_trustee(
     response_model=List[TrusteeRes]
 )
 async def retrieve_trustees(
-    grantor_id, current_user: str = Depends(get_current_user),
-    sess: Session = Depends(get_db)
+    grantor_id, response: Response,
+    current_user: str = Depends(get_token_principal),
+    page: Pagination = Depends(), repo=Depends(trustee_repository)
 ):
-    """Retrieve the list of trustees for the given grantor."""
-    repo = TrusteeRepository(sess)
+    """Retrieve a page of the trustees for the given grantor."""
     if current_user.uuid_pk == grantor_id:
-        trustees = repo.get_trustees(user_id=grantor_id)
-        if len(trustees) == 0:
+        trustees = await repo.get_trustees(
+            user_id=grantor_id, after=page.after, limit=page.limit
+        )
+        if not trustees:
             raise HTTPException(
                 status_code=status.HTTP_204_NO_CONTENT,
                 detail="You do not have any trustees"
             )
-        return trustees
+        return page.page(trustees, response)
 
 
 @trustee_router.put(
@@ -91,12 +127,11 @@ async def retrieve_trustees(
 async def update_trustee_account(
     grantor_id, trustee_id, data: UpdateTrustee,
     current_user: str = Depends(get_current_user),
-    sess: Session = Depends(get_db)
+    repo=Depends(trustee_repository)
 ):
     """Update the trustee data for the specified grantor."""
-    repo = TrusteeRepository(sess)
     if current_user.uuid_pk == grantor_id:
-        trustee = repo.update_trustee(
+        trustee = await repo.update_trustee(
             user_id=grantor_id,
             trustee_id=trustee_id, data=data
         )
@@ -112,12 +147,11 @@ async def update_trustee_account(
 async def delete_trustee_account(
     grantor_id: str, trustee_id: str,
     current_user: str = Depends(get_current_user),
-    sess: Session = Depends(get_db)
+    repo=Depends(trustee_repository)
 ):
     """Delete a trustee account from the database."""
-    repo = TrusteeRepository(sess)
     if current_user.uuid_pk == grantor_id:
-        del_trustee = repo.delete_trustee(
+        del_trustee = await repo.delete_trustee(
             user_id=grantor_id, trustee_id=trustee_id
         )
         if not del_trustee:
@@ -131,18 +165,57 @@ async def delete_trustee_account(
         )
 
 
+@trustee_router.post(
+    "/account/{grantor_id}/trustees/bulk/delete",
+    status_code=status.HTTP_204_NO_CONTENT
+)
+async def delete_trustee_accounts(
+    grantor_id: str, data: BulkDelete,
+    current_user: str = Depends(get_current_user),
+    repo=Depends(trustee_repository)
+):
+    """
+    Delete several trustees in one transaction.
+
+    Method: POST
+    Args:
+        grantor_id (str): ID of the grantor
+        data: IDs of the trustees to delete
+    Returns:
+        return 204 on success, 404 listing the ids not found
+    """
+    if current_user.uuid_pk != grantor_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="not allowed to delete these trustees"
+        )
+    missing = await repo.delete_trustees(
+        user_id=grantor_id,
+        trustee_ids=[str(uuid_pk) for uuid_pk in data.ids]
+    )
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"missing": missing}
+        )
+    if missing is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="error occurred while deleting trustees"
+        )
+
+
 @trustee_router.get(
     "/account/trustee/{trustee_id}/dashboard",
     response_model=TrusteeRes
 )
 async def trustee_dashboard(
     trustee_id: str,
-    current_user: str = Depends(get_current_user),
-    sess: Session = Depends(get_db)
+    current_user: str = Depends(get_token_principal),
+    repo=Depends(trustee_repository)
 ):
     """Trustee dashboard with unlimited access."""
     if current_user.uuid_pk == trustee_id:
-        q_trustee = sess.query(Trustee).filter(
-            Trustee.uuid_pk == trustee_id
-        ).first()
-        return q_trustee
+        return await repo.get_trustee(
+            trustee_id=trustee_id, user_id=current_user.added_by
+        )
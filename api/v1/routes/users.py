@@ -1,23 +1,26 @@
 #!/usr/bin/python3
 """Users API routes for Estate Trust."""
 
-from fastapi import APIRouter, HTTPException, Depends, status
-from sqlalchemy.orm import Session
-from api.v1.authorizations.oauth import get_current_user
-from api.v1.configurations.database import get_db
+from typing import Literal
+from fastapi import APIRouter, HTTPException, Depends, Query, status
+from fastapi.responses import StreamingResponse
+from api.v1.authorizations.oauth import (
+    get_current_user, get_token_principal
+)
 from api.v1.models.schemas.users import (
-    RegisterUser, UserRes, UpdateUser
+    EstateSummaryRes, RegisterUser, UserRes, UpdateUser
 )
-from api.v1.repositories.users import UserRepository
-from api.v1.utils.passwd import hash_pwd
+from api.v1.repositories.providers import user_repository
+from api.v1.repositories.users import EXPORT_FIELDS
+from api.v1.utils.passwd import ahash_pwd
+from api.v1.utils.streaming import csv_lines, ndjson
 
 user_routers = APIRouter(prefix="/grantors", tags=["grantor",])
 
 
 @user_routers.post("/account/create", status_code=201)
 async def create_grantor_account(
-    grantor: RegisterUser,
-    sess: Session = Depends(get_db)
+    grantor: RegisterUser, repo=Depends(user_repository)
 ):
     """
     Create grantor account.
@@ -29,10 +32,9 @@ async def create_grantor_account(
     Returns:
         Status code 201 on successful, otherwise 422.
     """
-    repo = UserRepository(sess)
-    password = hash_pwd(grantor.password)
+    password = await ahash_pwd(grantor.password)
     grantor.password = password
-    data: bool = repo.insert_user(grantor)
+    data: bool = await repo.insert_user(grantor)
     if data:
         return {
             "status_code": status.HTTP_201_CREATED,
@@ -47,13 +49,14 @@ async def create_grantor_account(
 @user_routers.get("/account/dashboard/{uuid_pk}", response_model=UserRes)
 async def get_dashboard(
     uuid_pk: str,
-    current_user: str = Depends(get_current_user),
-    sess: Session = Depends(get_db)
+    current_user: str = Depends(get_token_principal),
+    repo=Depends(user_repository)
 ):
     """Retrieve grantor's dashboard."""
-    repo = UserRepository(sess)
     if current_user.uuid_pk == uuid_pk:
-        grantor = repo.retrieve_user(uuid_pk=current_user.uuid_pk)
+        grantor = await repo.retrieve_user(
+            uuid_pk=current_user.uuid_pk, dashboard=True
+        )
         if grantor:
             return grantor
         raise HTTPException(
@@ -66,6 +69,79 @@ async def get_dashboard(
     )
 
 
+@user_routers.get(
+    "/account/dashboard/{uuid_pk}/summary", response_model=EstateSummaryRes
+)
+async def get_summary(
+    uuid_pk: str,
+    current_user: str = Depends(get_token_principal),
+    repo=Depends(user_repository)
+):
+    """Retrieve the estate summary of a grantor for them or a trustee."""
+    if uuid_pk not in (current_user.uuid_pk, current_user.added_by):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied"
+        )
+    summary = await repo.get_summary(uuid_pk)
+    if summary:
+        return summary
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Summary not found"
+    )
+
+
+@user_routers.get(
+    "/account/dashboard/{uuid_pk}/export", response_class=StreamingResponse
+)
+async def export_estate(
+    uuid_pk: str,
+    export_format: Literal["ndjson", "csv"] = Query(
+        "ndjson", alias="format"
+    ),
+    current_user: str = Depends(get_token_principal),
+    repo=Depends(user_repository)
+):
+    """
+    Export a grantor's whole estate.
+
+    The grantor, then their beneficiaries, trustees, assets and monetary
+    assets are streamed from a server-side cursor, so memory use does
+    not grow with the estate.
+
+    Methods:
+        GET
+    Args:
+        uuid_pk (str): ID of the grantor
+        export_format (str): ndjson, one object with its kind per line,
+            or csv, one row per record under the union of their columns
+    Returns:
+        Status code 200 with the export, 403 unless requested by the
+        grantor, 404 if the grantor does not exist.
+    """
+    if current_user.uuid_pk != uuid_pk:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied"
+        )
+    as_csv = export_format == "csv"
+    rows = await repo.export_estate(uuid_pk, as_csv)
+    if rows is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    if as_csv:
+        body, media_type = csv_lines(EXPORT_FIELDS, rows), "text/csv"
+    else:
+        body, media_type = ndjson(rows), "application/x-ndjson"
+    return StreamingResponse(body, media_type=media_type, headers={
+        "Content-Disposition":
+            f'attachment; filename="estate-{uuid_pk}.{export_format}"'
+    })
+
+
 @user_routers.put(
     "/account/dashboard/{uuid_pk}/update",
     response_model=UserRes
@@ -73,12 +149,13 @@ async def get_dashboard(
 async def update_account(
     uuid_pk: str, data: UpdateUser,
     current_user: str = Depends(get_current_user),
-    sess: Session = Depends(get_db)
+    repo=Depends(user_repository)
 ):
     """Update grantor account."""
-    repo = UserRepository(sess)
     if current_user.uuid_pk == uuid_pk:
-        update = repo.update_user(uuid_pk=current_user.uuid_pk, data=data)
+        update = await repo.update_user(
+            uuid_pk=current_user.uuid_pk, data=data
+        )
         if update:
             return update
         raise HTTPException(
@@ -94,12 +171,11 @@ async def update_account(
 async def delete_account(
     uuid_pk: str,
     current_user: str = Depends(get_current_user),
-    sess: Session = Depends(get_db)
+    repo=Depends(user_repository)
 ):
     """Delete a user account."""
-    repo = UserRepository(sess)
     if current_user.uuid_pk == uuid_pk:
-        deleted = repo.delete_user(current_user.uuid_pk)
+        deleted = await repo.delete_user(current_user.uuid_pk)
         if not deleted:
             raise HTTPException(
                 status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
@@ -6,9 +6,10 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from fastapi.testclient import TestClient
 from api.v1.main import app
-from api.v1.models.data.users import Base
+from api.v1.models.data.users import Base, trigram_available
 from api.v1.models.data.assets import Base as B_asset
 from api.v1.configurations.database import get_db
+from api.v1.configurations.migrations import migrate
 from api.v1.configurations.settings import settings
 
 PASSW = settings.DB_USER_PASSW
@@ -29,6 +30,7 @@ def session():
     Base.metadata.create_all(bind=engine)
     B_asset.metadata.drop_all(bind=engine)
     B_asset.metadata.create_all(bind=engine)
+    migrate(bind=engine)
     db = testing_session_local()
     try:
         yield db
@@ -36,6 +38,20 @@ def session():
         db.close()
 
 
+@pytest.fixture(scope="package")
+def trigram(session):
+    """Fixture: Skip unless pg_trgm and btree_gin can be installed."""
+    if not trigram_available(None, None, session.connection()):
+        pytest.skip("pg_trgm and btree_gin are not available")
+
+
+@pytest.fixture(scope="package")
+def no_trigram(session):
+    """Fixture: Skip if pg_trgm and btree_gin are installed."""
+    if trigram_available(None, None, session.connection()):
+        pytest.skip("pg_trgm and btree_gin are installed")
+
+
 @pytest.fixture(scope="package")
 def client(session):
     """Fixture: Return TestClient."""
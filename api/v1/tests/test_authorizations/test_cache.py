@@ -0,0 +1,65 @@
+#!/usr/bin/python3
+"""Test the principal cache for EstateTrust."""
+
+from time import sleep
+from api.v1.authorizations.cache import PrincipalCache
+from api.v1.models.schemas.users import Principal
+
+
+def make_principal(uuid_pk: str, added_by: str = None) -> Principal:
+    """Build a principal for the cache tests."""
+    return Principal(
+        uuid_pk=uuid_pk, username=uuid_pk[:10],
+        account_type="trustee" if added_by else "grantor",
+        added_by=added_by
+    )
+
+
+def test_cache_hit_and_miss():
+    """Test that lookups are counted."""
+    cache = PrincipalCache(max_size=2, ttl=60)
+    assert cache.get("grantor") is None
+    cache.set("grantor", make_principal("grantor"))
+    assert cache.get("grantor").uuid_pk == "grantor"
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_cache_lru_eviction():
+    """Test that the least recently used principal is evicted."""
+    cache = PrincipalCache(max_size=2, ttl=60)
+    cache.set("first", make_principal("first"))
+    cache.set("second", make_principal("second"))
+    cache.get("first")
+    cache.set("third", make_principal("third"))
+    assert cache.get("second") is None
+    assert cache.get("first") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_ttl():
+    """Test that expired principals are not served."""
+    cache = PrincipalCache(max_size=2, ttl=0.01)
+    cache.set("grantor", make_principal("grantor"))
+    sleep(0.02)
+    assert cache.get("grantor") is None
+
+
+def test_cache_invalidate_grantor_drops_trustees():
+    """Test that invalidating a grantor drops its trustees."""
+    cache = PrincipalCache(max_size=4, ttl=60)
+    cache.set("grantor", make_principal("grantor"))
+    cache.set("trustee", make_principal("trustee", added_by="grantor"))
+    cache.set("other", make_principal("other"))
+    cache.invalidate("grantor")
+    assert cache.get("grantor") is None
+    assert cache.get("trustee") is None
+    assert cache.get("other") is not None
+
+
+def test_cache_disabled():
+    """Test that a disabled cache never stores principals."""
+    cache = PrincipalCache(max_size=2, ttl=60, enabled=False)
+    cache.set("grantor", make_principal("grantor"))
+    assert cache.get("grantor") is None
@@ -0,0 +1,248 @@
+#!/usr/bin/python3
+"""Test the in-place schema migrations for EstateTrust."""
+
+from decimal import Decimal
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from api.v1.configurations.database import ensure_indexes
+from api.v1.configurations.migrations import apply_migrations
+from api.v1.models.data.users import User
+from api.v1.configurations.settings import settings
+from api.v1.tests.conftest import engine
+
+LEGACY = [
+    ("$300,000.00", Decimal("300000.00"), "USD"),
+    ("NGN 5,000", Decimal("5000.00"), "NGN"),
+    ("1500.5", Decimal("1500.50"), settings.DEFAULT_CURRENCY),
+    ("0", Decimal("0.00"), settings.DEFAULT_CURRENCY),
+    ("1.250.000", Decimal("1250000.00"), settings.DEFAULT_CURRENCY),
+]
+UNREADABLE = ["", "1.2.3", "12345678901234567890"]
+
+
+def legacy_monetaries(conn, username: str, phone: str, amounts) -> str:
+    """
+    Rewind monetaries to free text amounts and add a grantor with them.
+
+    Args:
+        username (str): The grantor's username, also their email
+        phone (str): The grantor's phone number
+        amounts: The text amounts, one monetary asset each
+    Returns:
+        The grantor's uuid_pk
+    """
+    # The legacy schema predates the estate summary triggers, installed
+    # by the migrations once the amounts are NUMERIC.
+    conn.execute(text(
+        "DROP FUNCTION estate_summary_open, estate_summary_apply CASCADE"
+    ))
+    conn.execute(text("ALTER TABLE monetaries DROP COLUMN currency CASCADE"))
+    conn.execute(text(
+        "ALTER TABLE monetaries ALTER COLUMN amount TYPE VARCHAR(150)"
+    ))
+    grantor = conn.execute(text(
+        "INSERT INTO users (username, first_name, last_name, email, "
+        "phone_number, password, date_of_birth, gender) VALUES "
+        "(:username, 'Mig', 'Rate', :username || '@example.com', :phone, "
+        "'unused', '2000-07-18', 'male') RETURNING uuid_pk"
+    ), {"username": username, "phone": phone}).scalar()
+    heir = conn.execute(text(
+        "INSERT INTO beneficiaries (first_name, last_name, relation, "
+        "added_by) VALUES ('Mig', 'Heir', 'son', :grantor) "
+        "RETURNING uuid_pk"
+    ), {"grantor": grantor}).scalar()
+    for number, amount in enumerate(amounts):
+        conn.execute(text(
+            "INSERT INTO monetaries (acc_name, acc_number, amount, "
+            "bank_name, owner_id, will_to) VALUES "
+            "('Mig', :number, :amount, 'Bank', :grantor, :heir)"
+        ), {
+            "number": str(number), "amount": amount,
+            "grantor": grantor, "heir": heir
+        })
+    return grantor
+
+
+def test_migrate_text_amounts(session):
+    """Test that free text amounts become NUMERIC with a currency."""
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            grantor = legacy_monetaries(
+                conn, "migrate", "+2340000000030",
+                [amount for amount, _, _ in LEGACY]
+            )
+            apply_migrations(conn)
+            apply_migrations(conn)
+            rows = conn.execute(text(
+                "SELECT amount, currency FROM monetaries "
+                "WHERE owner_id = :grantor ORDER BY acc_number"
+            ), {"grantor": grantor}).all()
+            assert [tuple(row) for row in rows] == [
+                (amount, currency) for _, amount, currency in LEGACY
+            ]
+            assert conn.execute(text(
+                "SELECT count(*) FROM pg_trigger WHERE tgname LIKE "
+                "'estate_summary_%' AND tgrelid = 'monetaries'::regclass"
+            )).scalar() == 3
+            totals = {}
+            for _, amount, currency in LEGACY:
+                totals[currency] = totals.get(currency, 0) + amount
+            assert conn.execute(text(
+                "SELECT beneficiaries, monetaries, monetary_totals "
+                "FROM estate_summary WHERE grantor_id = :grantor"
+            ), {"grantor": grantor}).one() == (1, len(LEGACY), {
+                currency: str(total)
+                for currency, total in totals.items() if total
+            })
+        finally:
+            trans.rollback()
+
+
+def test_migrate_unreadable_amounts(session):
+    """Test that unreadable amounts stop the migration, listed."""
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            legacy_monetaries(
+                conn, "migrateBad", "+2340000000037",
+                ["$300,000.00"] + UNREADABLE
+            )
+            with pytest.raises(DBAPIError) as error:
+                apply_migrations(conn)
+            diagnostic = error.value.orig.diag
+            assert diagnostic.message_primary == (
+                f"{len(UNREADABLE)} monetary amounts cannot be read"
+            )
+            listed = diagnostic.message_detail.splitlines()
+            assert sorted(line.split(": ")[1] for line in listed) == sorted(
+                f"'{amount}'" for amount in UNREADABLE
+            )
+        finally:
+            trans.rollback()
+
+
+def test_migrate_document_blobs(session):
+    """Test that documents become counted references to shared blobs."""
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            # Documents as first recorded, before the blobs.
+            conn.execute(text(
+                "ALTER TABLE documents DISABLE TRIGGER USER;"
+                "ALTER TABLE documents "
+                "DROP CONSTRAINT documents_asset_id_fkey, "
+                "ADD CONSTRAINT documents_asset_id_fkey FOREIGN KEY "
+                "(asset_id) REFERENCES assets (uuid_pk) ON DELETE SET NULL;"
+                "CREATE UNIQUE INDEX ix_documents_storage_key "
+                "ON documents (storage_key)"
+            ))
+            grantor = conn.execute(text(
+                "INSERT INTO users (username, first_name, last_name, email, "
+                "phone_number, password, date_of_birth, gender) VALUES "
+                "('migrateDoc', 'Mig', 'Rate', 'migratedoc@example.com', "
+                "'+2340000000032', 'unused', '2000-07-18', 'male') "
+                "RETURNING uuid_pk"
+            )).scalar()
+            for key in ("will.pdf", "copy-of-will.pdf"):
+                conn.execute(text(
+                    "INSERT INTO documents (owner_id, storage_key, size, "
+                    "content_type, sha256) VALUES (:grantor, :key, 4, "
+                    "'application/pdf', 'migrated')"
+                ), {"grantor": grantor, "key": key})
+            conn.execute(text("ALTER TABLE documents ENABLE TRIGGER USER"))
+            apply_migrations(conn)
+            apply_migrations(conn)
+            assert conn.execute(text(
+                "SELECT storage_key, ref_count FROM document_blobs "
+                "WHERE sha256 = 'migrated'"
+            )).one() == ("copy-of-will.pdf", 2)
+            assert conn.execute(text(
+                "SELECT confdeltype FROM pg_constraint "
+                "WHERE conname = 'documents_asset_id_fkey'"
+            )).scalar() == "c"
+            assert conn.execute(text(
+                "SELECT to_regclass('ix_documents_storage_key')"
+            )).scalar() is None
+        finally:
+            trans.rollback()
+
+
+def test_triggers_installed_once(session):
+    """Test that triggers are only recreated when their DDL changes."""
+    triggers = text(
+        "SELECT tgname, oid FROM pg_trigger "
+        "WHERE tgrelid = 'documents'::regclass AND NOT tgisinternal"
+    )
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            installed = dict(conn.execute(triggers).all())
+            assert len(installed) == 2
+            apply_migrations(conn)
+            assert dict(conn.execute(triggers).all()) == installed
+            conn.execute(text(
+                "COMMENT ON FUNCTION document_blobs_apply IS 'older'"
+            ))
+            apply_migrations(conn)
+            upgraded = dict(conn.execute(triggers).all())
+            assert upgraded.keys() == installed.keys()
+            assert upgraded != installed
+            conn.execute(text(
+                "DROP TRIGGER document_blobs_insert ON documents"
+            ))
+            apply_migrations(conn)
+            reinstalled = dict(conn.execute(triggers).all())
+            assert reinstalled.keys() == installed.keys()
+        finally:
+            trans.rollback()
+
+
+def test_ensure_indexes(session):
+    """Test that missing or invalid indexes are built concurrently."""
+    valid = text(
+        "SELECT indisvalid, indisunique FROM pg_index "
+        "WHERE indexrelid = to_regclass('ix_users_page')"
+    )
+    session.rollback()
+    with engine.connect() as conn:
+        conn.execute(text(
+            "INSERT INTO users (username, first_name, last_name, email, "
+            "phone_number, password, date_of_birth, gender) VALUES "
+            "('indexOne', 'In', 'Dex', 'indexone@example.com', "
+            "'+2340000000035', 'unused', '2000-07-18', 'male'), "
+            "('indexTwo', 'In', 'Dex', 'indextwo@example.com', "
+            "'+2340000000036', 'unused', '2000-07-18', 'male')"
+        ))
+        conn.execute(text("DROP INDEX ix_users_page"))
+        conn.commit()
+    try:
+        ensure_indexes(bind=engine)
+        assert session.execute(valid).one() == (True, False)
+        session.rollback()
+        # An interrupted build leaves an invalid index behind
+        with engine.connect().execution_options(
+            isolation_level="AUTOCOMMIT"
+        ) as conn:
+            conn.execute(text("DROP INDEX ix_users_page"))
+            with pytest.raises(IntegrityError):
+                conn.execute(text(
+                    "CREATE UNIQUE INDEX CONCURRENTLY ix_users_page "
+                    "ON users ((1))"
+                ))
+        assert session.execute(valid).one() == (False, True)
+        session.rollback()
+        ensure_indexes(bind=engine)
+        assert session.execute(valid).one() == (True, False)
+        # The models still build their indexes within create_all
+        assert all(
+            index.dialect_options["postgresql"]["concurrently"] is False
+            for index in User.__table__.indexes
+        )
+    finally:
+        session.rollback()
+        session.execute(text(
+            "DELETE FROM users WHERE username IN ('indexOne', 'indexTwo')"
+        ))
+        session.commit()
@@ -0,0 +1,54 @@
+#!/usr/bin/python3
+"""Test the instrumented connection pool for EstateTrust."""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from api.v1.configurations.database import (
+    SQLALCHEMY_DATABASE_URL, engine, warm_pool
+)
+from api.v1.configurations.pool import TimedQueuePool
+from api.v1.configurations.settings import settings
+
+
+def test_pool_records_checkouts_and_timeouts():
+    """Test that checkout waits and timeouts are counted."""
+    small = create_engine(
+        SQLALCHEMY_DATABASE_URL, poolclass=TimedQueuePool,
+        pool_size=1, max_overflow=0, pool_timeout=0.1
+    )
+    held = small.connect()
+    with pytest.raises(PoolTimeoutError):
+        small.connect()
+    stats = small.pool.snapshot()
+    held.close()
+    small.dispose()
+    assert stats["checked_out"] == 1
+    assert stats["checkouts"] == 2
+    assert stats["timeouts"] == 1
+    assert stats["wait_max_ms"] >= 100
+
+
+def test_pool_stats_survive_dispose():
+    """Test that counters carry over when the pool is recreated."""
+    small = create_engine(SQLALCHEMY_DATABASE_URL, poolclass=TimedQueuePool)
+    small.connect().close()
+    small.dispose()
+    assert small.pool.snapshot()["checkouts"] == 1
+    small.dispose()
+
+
+def test_warm_pool():
+    """Test that warmup leaves idle connections in the pool."""
+    warm_pool(2)
+    assert engine.pool.snapshot()["checked_in"] >= 2
+
+
+def test_metrics_db_pool(client, monkeypatch):
+    """Test that pool counters are exported."""
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape")
+    res = client.get(
+        '/api/v1/metrics/', headers={'Authorization': 'Bearer scrape'}
+    )
+    assert res.status_code == 200
+    assert "checked_out" in res.json()["db_pool"]["sync"]
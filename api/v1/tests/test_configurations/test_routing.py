@@ -0,0 +1,203 @@
+#!/usr/bin/python3
+"""Test read-replica routing for EstateTrust."""
+
+import asyncio
+import threading
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+from api.v1.configurations import database
+from api.v1.configurations.routing import (
+    STICKY_COOKIE, PinWrites, ReadRouter
+)
+from api.v1.configurations.settings import settings
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self) -> None:
+        """Start at zero."""
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        """Return the current time."""
+        return self.now
+
+
+def make_request(
+    method: str, token: str = "Bearer token", cookie: str = None
+) -> Request:
+    """Build a bare request with the given method and credentials."""
+    headers = [(b"authorization", token.encode())] if token else []
+    if cookie:
+        headers.append((b"cookie", cookie.encode()))
+    return Request({"type": "http", "method": method, "headers": headers})
+
+
+def test_router_sticks_to_primary_after_write():
+    """Test read-your-writes stickiness and its expiry."""
+    clock = FakeClock()
+    router = ReadRouter(
+        sticky_seconds=5, max_lag=1, lag_check_interval=1,
+        probe=lambda: 0.0, clock=clock
+    )
+    key = router.key(make_request("PUT"))
+    assert router.use_replica(key)
+    router.mark_write(key)
+    assert not router.use_replica(key)
+    assert router.use_replica(router.key(make_request("GET", "Bearer x")))
+    clock.now = 6
+    assert router.use_replica(key)
+    assert router.stats()["primary_reads"] == 1
+
+
+def test_pin_cookie_sticks_across_workers():
+    """Test a write pins reads on another worker through the cookie."""
+    wall = FakeClock()
+    wall.now = 1000.0
+    workers = [
+        ReadRouter(
+            sticky_seconds=5, max_lag=1, lag_check_interval=1,
+            probe=lambda: 0.0, wall_clock=wall
+        ) for _ in range(2)
+    ]
+    writer, reader = workers
+
+    async def app(scope, receive, send):
+        """Answer 201 on /ok, 422 elsewhere."""
+        status = 201 if scope["path"] == "/ok" else 422
+        await send({
+            "type": "http.response.start", "status": status, "headers": []
+        })
+        await send({"type": "http.response.body", "body": b""})
+
+    def respond(method: str, path: str) -> list:
+        """Return the cookies the writer's worker set on the response."""
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(PinWrites(app, writer)(
+            {"type": "http", "method": method, "path": path}, None, send
+        ))
+        return [
+            value.decode() for name, value in sent[0]["headers"]
+            if name == b"set-cookie"
+        ]
+
+    assert respond("GET", "/ok") == []
+    assert respond("POST", "/fail") == []
+    cookie, = respond("POST", "/ok")
+    assert "Max-Age=5" in cookie and "HttpOnly" in cookie
+    pin = cookie.split(";")[0]
+    assert pin == f"{STICKY_COOKIE}=1005.000"
+    request = make_request("GET", "Bearer elsewhere", cookie=pin)
+    assert reader.pinned(request)
+    assert not reader.use_replica(None, reader.pinned(request))
+    wall.now = 1005.0
+    assert not reader.pinned(request)
+    assert reader.use_replica(None, reader.pinned(request))
+    # Pins beyond the sticky window, or unreadable, are ignored
+    for value in ("1012.0", "soon"):
+        assert not reader.pinned(make_request(
+            "GET", cookie=f"{STICKY_COOKIE}={value}"
+        ))
+
+
+def test_router_avoids_lagging_or_unreachable_replica():
+    """Test that replica lag and failures route reads to the primary."""
+    clock = FakeClock()
+    lags = [0.5, 10.0]
+
+    def probe():
+        if not lags:
+            raise OperationalError("SELECT 1", {}, Exception("down"))
+        return lags.pop(0)
+
+    router = ReadRouter(
+        sticky_seconds=5, max_lag=1, lag_check_interval=1,
+        probe=probe, clock=clock
+    )
+    assert router.use_replica(None)
+    clock.now = 1
+    assert not router.use_replica(None)
+    assert router.stats()["replica_lag_seconds"] == 10.0
+    clock.now = 2
+    assert not router.use_replica(None)
+    assert router.stats()["replica_lag_seconds"] is None
+
+
+def test_async_router_probes_off_the_loop():
+    """Test the async path probes on the threadpool, one probe at a time."""
+    release = threading.Event()
+    probes = []
+
+    def probe():
+        probes.append(threading.get_ident())
+        release.wait(5)
+        return 0.0
+
+    router = ReadRouter(
+        sticky_seconds=5, max_lag=1, lag_check_interval=1, probe=probe
+    )
+
+    async def reads():
+        first = asyncio.create_task(router.use_replica_async(None))
+        while not probes:
+            await asyncio.sleep(0.01)
+        # The loop is free while the first probe runs; a concurrent read
+        # uses the last measured lag, still unknown, instead of probing.
+        assert not await router.use_replica_async(None)
+        release.set()
+        return await first
+
+    assert asyncio.run(reads())
+    assert probes != [threading.get_ident()] and len(probes) == 1
+    assert router.stats()["replica_lag_seconds"] == 0.0
+
+
+def test_get_db_routes_reads_to_stand_in_replica(monkeypatch):
+    """Test get_db against a stand-in replica on the primary server."""
+    replica = sessionmaker(bind=database.engine)
+    router = ReadRouter(
+        sticky_seconds=5, max_lag=1, lag_check_interval=1,
+        probe=lambda: 0.0
+    )
+    monkeypatch.setattr(database, "replica_session_local", replica)
+    monkeypatch.setattr(database, "read_router", router)
+
+    def factory(method):
+        """Return the session class get_db picked."""
+        return database.route_session(
+            make_request(method), replica, database.session_local
+        )
+
+    assert factory("GET") is replica
+    assert factory("POST") is database.session_local
+    assert factory("GET") is database.session_local
+    db = next(database.get_db(make_request("GET", "Bearer other")))
+    assert db.bind is database.engine
+    db.close()
+    assert asyncio.run(database.route_async_session(
+        make_request("GET", "Bearer async"), replica, database.session_local
+    )) is replica
+    pinned = make_request(
+        "GET", "Bearer pinned", cookie=router.pin_cookie().split(";")[0]
+    )
+    assert database.route_session(
+        pinned, replica, database.session_local
+    ) is database.session_local
+    assert asyncio.run(database.route_async_session(
+        pinned, replica, database.session_local
+    )) is database.session_local
+
+
+@pytest.mark.skipif(
+    not settings.DB_REPLICA_HOST, reason="no replica configured"
+)
+def test_replica_lag_probe():
+    """Test the lag probe against the configured replica."""
+    assert database.replica_lag() >= 0
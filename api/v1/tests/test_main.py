@@ -1,9 +1,27 @@
 #!/usr/bin/python3
 """Test EstateTrust entry point route."""
 
+from api.v1.configurations.settings import settings
+
 
 def test_index(client):
     """Test entry route."""
     res = client.get('/')
     assert res.json().get("message") == "Welcome to Estate Trust."
     assert res.status_code == 200
+
+
+def test_metrics(client, monkeypatch):
+    """Test metrics route is only served to the monitoring system."""
+    assert client.get('/api/v1/metrics/').status_code == 404
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape")
+    assert client.get('/api/v1/metrics/').status_code == 401
+    res = client.get(
+        '/api/v1/metrics/', headers={'Authorization': 'Bearer other'}
+    )
+    assert res.status_code == 401
+    res = client.get(
+        '/api/v1/metrics/', headers={'Authorization': 'Bearer scrape'}
+    )
+    assert res.status_code == 200
+    assert "hits" in res.json()["principal_cache"]
@@ -0,0 +1,185 @@
+#!/usr/bin/python3
+"""Test the single round-trip queries of the repositories."""
+
+from datetime import date
+from uuid import uuid4
+from typing import Optional
+import pytest
+from pydantic import BaseModel
+from sqlalchemy import delete, event
+from sqlalchemy.engine import Engine
+from api.v1.models.data.assets import Asset, Monetary
+from api.v1.models.data.users import Beneficiary, Trustee, User
+from api.v1.repositories.assets import AssetRepository
+from api.v1.models.schemas.users import AddBeneficiary
+from api.v1.repositories.base import changed_values
+from api.v1.repositories.beneficiaries import BeneficiaryRepo
+from api.v1.repositories.monetaries import MonetaryRepository
+from api.v1.repositories.trustees import TrusteeRepository
+
+
+@pytest.fixture(scope="module")
+def estate(session):
+    """Seed a grantor with an heir, and an heir without any assets."""
+    grantor = User(
+        username="listOwner", first_name="List", last_name="Owner",
+        email="listowner@example.com", phone_number="+2340000000002",
+        password="unused", date_of_birth=date(2000, 7, 18), gender="male"
+    )
+    session.add(grantor)
+    session.flush()
+    heir, idle = (
+        Beneficiary(
+            first_name=name, last_name="Owner", relation="son",
+            added_by=grantor.uuid_pk
+        ) for name in ("Heir", "Idle")
+    )
+    session.add_all([heir, idle])
+    session.flush()
+    session.add_all([
+        Asset(
+            name="House", location="Onitsha", note="",
+            owner_id=grantor.uuid_pk, will_to=heir.uuid_pk
+        ),
+        Monetary(
+            acc_name="List Owner", acc_number="0001", amount="100",
+            bank_name="Bank", note="", owner_id=grantor.uuid_pk,
+            will_to=heir.uuid_pk
+        ),
+        Trustee(
+            username="listTrust", first_name="List", last_name="Trust",
+            email="listtrust@example.com", phone_number="+2340000000003",
+            password="unused", relation="lawyer", added_by=grantor.uuid_pk
+        ),
+    ])
+    session.commit()
+    yield grantor.uuid_pk, heir.uuid_pk, idle.uuid_pk
+    session.execute(delete(User).where(User.uuid_pk == grantor.uuid_pk))
+    session.commit()
+
+
+LISTS = [
+    (AssetRepository, "get_all_assests_for_grantor", 0),
+    (AssetRepository, "get_all_assests_for_beneficiary", 1),
+    (MonetaryRepository, "get_all_monetary_assets_for_grantor", 0),
+    (MonetaryRepository, "get_all_monetary_assets_for_beneficiary", 1),
+    (TrusteeRepository, "get_trustees", 0),
+    (BeneficiaryRepo, "get_all_beneficiaries", 0),
+]
+
+
+@pytest.mark.parametrize("repository, method, owner", LISTS)
+def test_list_in_one_round_trip(session, estate, repository, method, owner):
+    """Test that a list is fetched with a single statement."""
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", count)
+    rows = getattr(repository(session), method)(estate[owner])
+    event.remove(Engine, "before_cursor_execute", count)
+    assert len(statements) == 1
+    assert len(rows) >= 1
+
+
+@pytest.mark.parametrize("repository, method, owner", LISTS)
+def test_list_missing_owner(session, estate, repository, method, owner):
+    """Test that a missing owner is told apart from an empty list."""
+    assert getattr(repository(session), method)(str(uuid4())) is None
+
+
+def test_list_empty_owner(session, estate):
+    """Test that an owner without rows gets an empty list."""
+    repo = AssetRepository(session)
+    assert repo.get_all_assests_for_beneficiary(estate[2]) == []
+    assert MonetaryRepository(session).get_all_monetary_assets_for_beneficiary(
+        estate[2]
+    ) == []
+
+
+class AssetPatch(BaseModel):
+    """Partial asset update body."""
+
+    name: Optional[str] = None
+    location: Optional[str] = None
+    note: Optional[str] = None
+    upload: Optional[str] = None
+
+
+def test_changed_values():
+    """Test that only set, storable fields are sent."""
+    values = changed_values(Asset, AssetPatch(note="Deed", upload="x"))
+    assert set(values) == {"note", "updated_at"}
+    values = changed_values(Asset, AssetPatch(name=None, location=None))
+    assert set(values) == {"location", "updated_at"}
+
+
+def test_update_in_one_round_trip(session, estate):
+    """Test that an update is a single owner-checked statement."""
+    repo = AssetRepository(session)
+    asset_id = repo.get_all_assests_for_grantor(estate[0])[0].uuid_pk
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", count)
+    asset = repo.update_asset(estate[0], asset_id, AssetPatch(name="Villa"))
+    event.remove(Engine, "before_cursor_execute", count)
+    assert len(statements) == 1
+    assert asset.name == "Villa"
+    assert asset.location == "Onitsha"
+    assert asset.updated_at is not None
+    assert repo.update_asset(
+        str(uuid4()), asset_id, AssetPatch(name="Stolen")
+    ) is None
+
+
+def test_bulk_delete_in_one_round_trip(session, estate):
+    """Test that a bulk delete is a single all-or-nothing statement."""
+    repo = TrusteeRepository(session)
+    trustee_ids = [trustee.uuid_pk for trustee in repo.get_trustees(estate[0])]
+    unknown = str(uuid4())
+    assert repo.delete_trustees(estate[0], trustee_ids + [unknown]) == [
+        unknown
+    ]
+    assert len(repo.get_trustees(estate[0])) == len(trustee_ids)
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", count)
+    assert repo.delete_trustees(estate[0], trustee_ids) == []
+    event.remove(Engine, "before_cursor_execute", count)
+    assert len(statements) == 1
+    assert repo.get_trustees(estate[0]) == []
+
+
+def test_batch_insert_in_one_round_trip(session, estate):
+    """Test that a batch of rows is inserted with one statement."""
+    repo = BeneficiaryRepo(session)
+    data = [
+        AddBeneficiary(
+            first_name=f"Batch{i}", last_name="Owner", middle_name=None,
+            relation="daughter"
+        ) for i in range(25)
+    ]
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", count)
+    results = repo.add_beneficiaries(estate[0], data)
+    event.remove(Engine, "before_cursor_execute", count)
+    assert len(statements) == 1
+    assert [item["index"] for item in results] == list(range(25))
+    names = {
+        beneficiary.uuid_pk: beneficiary.first_name
+        for beneficiary in repo.get_all_beneficiaries(estate[0])
+    }
+    assert [names[item["uuid_pk"]] for item in results] == [
+        f"Batch{i}" for i in range(25)
+    ]
@@ -0,0 +1,75 @@
+#!/usr/bin/python3
+"""Test the document metadata backfill."""
+
+import hashlib
+from datetime import date
+from uuid import uuid4
+from sqlalchemy import delete, select
+from api.v1.cli import main
+from api.v1.models.data.assets import Asset
+from api.v1.models.data.documents import Document
+from api.v1.models.data.users import Beneficiary, User
+from api.v1.repositories import documents
+
+
+def test_backfill_documents(session, tmp_path, monkeypatch, capsys):
+    """Index an upload directory, attributing every file it can."""
+    monkeypatch.setattr(documents, "BACKFILL_BATCH", 2)
+    grantor = User(
+        username="backfill", first_name="Back", last_name="Fill",
+        email="backfill@example.com", phone_number="+2340000000031",
+        password="unused", date_of_birth=date(2000, 7, 18), gender="male"
+    )
+    session.add(grantor)
+    session.flush()
+    heir = Beneficiary(
+        first_name="Heir", last_name="Fill", relation="son",
+        added_by=grantor.uuid_pk
+    )
+    session.add(heir)
+    session.flush()
+    asset = Asset(
+        name="Plot 1", location="Onitsha", note="", document="deed.pdf",
+        owner_id=grantor.uuid_pk, will_to=heir.uuid_pk
+    )
+    session.add(asset)
+    session.commit()
+    grantor_id, asset_id = grantor.uuid_pk, asset.uuid_pk
+    files = {
+        "deed.pdf": b"%PDF deed",
+        f"{grantor_id}_2024-01-01will.pdf": b"%PDF will",
+        f"scans/{grantor_id}_2024-01-02photo.png": b"\x89PNG",
+        f"{uuid4()}_2024-01-03gone.pdf": b"%PDF gone",
+        "stray.bin": b"\x00",
+        ".partial-upload": b"%PDF half",
+    }
+    (tmp_path / "scans").mkdir()
+    for key, content in files.items():
+        (tmp_path / key).write_bytes(content)
+    args = ["documents", "backfill", "--directory", str(tmp_path)]
+
+    try:
+        assert main(args) == 0
+        out, err = capsys.readouterr()
+        assert set(out.split()) == set(list(files)[3:5])
+        assert "5 files scanned, 3 indexed, 2 unattributed" in err
+        rows = session.execute(select(
+            Document.storage_key, Document.owner_id, Document.asset_id,
+            Document.content_type, Document.size, Document.sha256
+        ).where(Document.owner_id == grantor_id)).all()
+        assert sorted(tuple(row) for row in rows) == sorted([
+            (key, grantor_id, asset_id if key == "deed.pdf" else None,
+             content_type, len(files[key]),
+             hashlib.sha256(files[key]).hexdigest())
+            for key, content_type in zip(list(files)[:3], (
+                "application/pdf", "application/pdf", "image/png"
+            ))
+        ])
+        assert main(args) == 0
+        assert "0 indexed" in capsys.readouterr().err
+        assert session.scalar(select(Document.uuid_pk).where(
+            Document.storage_key == "stray.bin"
+        )) is None
+    finally:
+        session.execute(delete(User).where(User.uuid_pk == grantor_id))
+        session.commit()
@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+"""Test that estate exports stream in constant memory."""
+
+import subprocess
+import sys
+from datetime import date
+from sqlalchemy import delete, text
+from api.v1.models.data.users import Beneficiary, User
+
+# Exports the estate of argv[1] as argv[2] in a fresh interpreter, then
+# prints its peak resident set size in KiB.
+EXPORT = """
+import asyncio, resource, sys
+import api.v1.models.data.assets
+from api.v1.configurations.database import session_local
+from api.v1.repositories.users import EXPORT_FIELDS, UserRepository
+from api.v1.utils.streaming import csv_lines, ndjson
+
+
+async def drain(body):
+    async for _ in body:
+        pass
+
+as_csv = sys.argv[2] == "csv"
+with session_local() as sess:
+    rows = UserRepository(sess).export_estate(sys.argv[1], as_csv)
+    body = csv_lines(EXPORT_FIELDS, rows) if as_csv else ndjson(rows)
+    asyncio.run(drain(body))
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+SEED = """
+INSERT INTO assets (name, location, note, owner_id, will_to)
+SELECT 'Plot ' || i, 'Onitsha', repeat('x', 400), :grantor, :heir
+FROM generate_series(1, :count) AS i
+"""
+
+
+def peak_rss(grantor_id: str, export_format: str) -> int:
+    """Export an estate in a subprocess and return its peak RSS in KiB."""
+    done = subprocess.run(
+        [sys.executable, "-c", EXPORT, grantor_id, export_format],
+        capture_output=True, text=True, check=True
+    )
+    return int(done.stdout.split()[-1])
+
+
+def test_export_memory_is_flat(session):
+    """Test that peak RSS does not grow with the exported estate."""
+    grantor = User(
+        username="exportRss", first_name="Ex", last_name="Port",
+        email="exportrss@example.com", phone_number="+2340000000017",
+        password="unused", date_of_birth=date(2000, 7, 18), gender="male"
+    )
+    session.add(grantor)
+    session.flush()
+    heir = Beneficiary(
+        first_name="Heir", last_name="Port", relation="son",
+        added_by=grantor.uuid_pk
+    )
+    session.add(heir)
+    session.flush()
+    grantor_id = str(grantor.uuid_pk)
+    params = {"grantor": grantor_id, "heir": heir.uuid_pk}
+    try:
+        peaks = {"ndjson": [], "csv": []}
+        for count in (500, 50_000):
+            session.execute(text(SEED), dict(params, count=count))
+            session.commit()
+            for export_format, sizes in peaks.items():
+                sizes.append(peak_rss(grantor_id, export_format))
+        # Buffering the 50,000 rows, over 20MB of text, would show here.
+        for small, large in peaks.values():
+            assert large - small < 8 * 1024, peaks
+    finally:
+        session.rollback()
+        session.execute(delete(User).where(User.uuid_pk == grantor_id))
+        session.commit()
@@ -0,0 +1,137 @@
+#!/usr/bin/python3
+"""Test the estate summary read model."""
+
+from datetime import date
+from decimal import Decimal
+from typing import Optional
+import pytest
+from pydantic import BaseModel
+from sqlalchemy import delete, update
+from api.v1.cli import main
+from api.v1.models.data.summaries import EstateSummary
+from api.v1.models.data.users import User
+from api.v1.models.schemas.assets import AddAsset, AddMonetary
+from api.v1.models.schemas.users import AddBeneficiary, AddTrustee
+from api.v1.repositories.assets import AssetRepository
+from api.v1.repositories.beneficiaries import BeneficiaryRepo
+from api.v1.repositories.monetaries import MonetaryRepository
+from api.v1.repositories.summaries import (
+    check_summaries, rebuild_summaries
+)
+from api.v1.repositories.trustees import TrusteeRepository
+from api.v1.repositories.users import UserRepository
+
+
+class NewUser(BaseModel):
+    """Grantor row accepted by UserRepository.insert_user."""
+
+    username: str = "summary"
+    first_name: str = "Sum"
+    middle_name: Optional[str] = None
+    last_name: str = "Mary"
+    email: str = "summary@example.com"
+    phone_number: str = "+2340000000009"
+    password: str = "unused"
+    date_of_birth: date = date(2000, 7, 18)
+    gender: str = "male"
+
+
+class AmountPatch(BaseModel):
+    """Partial monetary update changing the amount only."""
+
+    amount: Optional[Decimal] = None
+
+
+@pytest.fixture(scope="module")
+def grantor(session):
+    """Create a grantor through the repository."""
+    assert UserRepository(session).insert_user(NewUser())
+    grantor_id = session.query(User).filter_by(
+        username="summary"
+    ).one().uuid_pk
+    yield grantor_id
+    session.execute(delete(User).where(User.uuid_pk == grantor_id))
+    session.commit()
+
+
+def summary_of(session, grantor_id):
+    """Read the stored summary bypassing the identity map."""
+    session.expire_all()
+    return session.get(EstateSummary, grantor_id)
+
+
+def drift_of(session, grantor_id):
+    """Return the drift reported for one grantor."""
+    return [
+        entry for entry in check_summaries(session)
+        if entry["grantor_id"] == grantor_id
+    ]
+
+
+def test_summary_follows_writes(session, grantor):
+    """Test that every repository write is folded into the summary."""
+    assert summary_of(session, grantor).assets == 0
+    heirs = BeneficiaryRepo(session).add_beneficiaries(grantor, [
+        AddBeneficiary(
+            first_name=name, last_name="Mary", middle_name=None,
+            relation="son"
+        ) for name in ("One", "Two")
+    ])
+    heir, other = (item["uuid_pk"] for item in heirs)
+    AssetRepository(session).add_assets(grantor, [
+        AddAsset(name=f"Plot {i}", will_to=heir, note="") for i in range(3)
+    ])
+    accounts = MonetaryRepository(session).add_monetary_assets(grantor, [
+        AddMonetary(
+            acc_name="Sum", acc_number=str(i), amount=amount,
+            currency=currency, bank_name="Bank", will_to=other, note=""
+        ) for i, (amount, currency) in enumerate(
+            [("10.25", "USD"), ("5", "USD"), ("700", "NGN")]
+        )
+    ])
+    assert TrusteeRepository(session).add_trustee(AddTrustee(
+        username="summaryT", first_name="Sum", last_name="Trust",
+        middle_name=None, email="summaryt@example.com",
+        phone_number="+2340000000010", password="unused",
+        relation="lawyer", added_by=grantor, note=None
+    ))
+    summary = summary_of(session, grantor)
+    assert (
+        summary.beneficiaries, summary.trustees, summary.assets,
+        summary.monetaries
+    ) == (2, 1, 3, 3)
+    assert {
+        currency: Decimal(total)
+        for currency, total in summary.monetary_totals.items()
+    } == {"USD": Decimal("15.25"), "NGN": Decimal("700")}
+
+    usd, _, ngn = (item["uuid_pk"] for item in accounts)
+    assert MonetaryRepository(session).update_asset(
+        grantor, usd, AmountPatch(amount="1.75")
+    )
+    assert MonetaryRepository(session).delete_assets(grantor, [ngn]) == []
+    summary = summary_of(session, grantor)
+    assert summary.monetaries == 2
+    assert summary.monetary_totals == {"USD": "6.75"}
+
+    assert BeneficiaryRepo(session).delete_beneficiary(grantor, heir)
+    summary = summary_of(session, grantor)
+    assert (summary.beneficiaries, summary.assets) == (1, 0)
+    assert drift_of(session, grantor) == []
+
+
+def test_check_and_rebuild(session, grantor):
+    """Test that drift is reported and repaired by a rebuild."""
+    session.execute(update(EstateSummary).where(
+        EstateSummary.grantor_id == grantor
+    ).values(trustees=7))
+    session.commit()
+    assert drift_of(session, grantor) == [
+        {"grantor_id": grantor, "trustees": {"stored": 7, "expected": 1}}
+    ]
+    assert main(["summary", "check"]) == 1
+    drift = rebuild_summaries(session)
+    assert grantor in [entry["grantor_id"] for entry in drift]
+    assert check_summaries(session) == []
+    assert summary_of(session, grantor).trustees == 1
+    assert main(["summary", "check"]) == 0
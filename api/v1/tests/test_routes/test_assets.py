@@ -1,11 +1,23 @@
 #!/usr/bin/python3
 """Test assets routes for EstateTrust."""
 
+import hashlib
+import os
+from datetime import date
 from typing import Dict
+from uuid import uuid4
 import pytest
 from jose import jwt
+from sqlalchemy import delete, select
+from api.v1.authorizations.cache import principal_cache
+from api.v1.authorizations.oauth import create_token
+from api.v1.cli import main
 from api.v1.configurations.settings import settings
+from api.v1.models.data.assets import Asset
+from api.v1.models.data.documents import Document, DocumentBlob
+from api.v1.models.data.users import Beneficiary, User
 from api.v1.models.schemas.users import AccessToken
+from api.v1.utils import documents
 
 
 @pytest.mark.order(after="test_beneficiaries.py::test_delete_beneficiary")
@@ -183,6 +195,14 @@ def test_update_asset(client):
         }
     )
     assert asset.status_code == 200
+    other = client.put(
+        f"/api/v1/assets/{uuid4()}/assets/{assets.json()[0]['uuid_pk']}"
+        "/update", headers=headers, json={
+            "name": "Not mine", "location": None, "will_to": None,
+            "note": None
+        }
+    )
+    assert other.status_code == 403
 
 
 @pytest.mark.order(after="test_assets.py::test_update_asset")
@@ -209,8 +229,302 @@ def test_delete_asset(client):
         f"/api/v1/assets/grantor/{user_id}/assets",
         headers=headers
     )
+    other = client.delete(
+        f"/api/v1/assets/{uuid4()}/assets/{assets.json()[0]['uuid_pk']}"
+        "/delete", headers=headers
+    )
+    assert other.status_code == 403
     asset = client.delete(
         f"/api/v1/assets/{user_id}/assets/{assets.json()[0]['uuid_pk']}/delete",
         headers=headers
     )
     assert asset.status_code == 204
+
+
+def test_bulk_delete_assets(client, session):
+    """Delete several assets in one transaction."""
+    grantor = User(
+        username="bulkDel", first_name="Bulk", last_name="Delete",
+        email="bulkdelete@example.com", phone_number="+2340000000004",
+        password="unused", date_of_birth=date(2000, 7, 18), gender="male"
+    )
+    session.add(grantor)
+    session.flush()
+    heir = Beneficiary(
+        first_name="Heir", last_name="Delete", relation="son",
+        added_by=grantor.uuid_pk
+    )
+    session.add(heir)
+    session.flush()
+    assets = [
+        Asset(
+            name=f"Plot {i}", location="Onitsha", note="",
+            owner_id=grantor.uuid_pk, will_to=heir.uuid_pk
+        ) for i in range(3)
+    ]
+    session.add_all(assets)
+    session.commit()
+    grantor_id = grantor.uuid_pk
+    asset_ids = [asset.uuid_pk for asset in assets]
+    url = f"/api/v1/assets/{grantor_id}/assets/bulk/delete"
+    headers = {'Authorization': 'Bearer {}'.format(create_token(data={
+        "uuid_pk": grantor_id, "username": "bulkDel",
+        "account_type": "grantor"
+    }))}
+
+    unknown = str(uuid4())
+    res = client.post(
+        url, headers=headers, json={"ids": [asset_ids[0], unknown]}
+    )
+    assert res.status_code == 404
+    assert res.json()["detail"] == {"missing": [unknown]}
+    res = client.post(
+        f"/api/v1/assets/{uuid4()}/assets/bulk/delete",
+        headers=headers, json={"ids": asset_ids}
+    )
+    assert res.status_code == 403
+    assert len(session.scalars(
+        select(Asset).where(Asset.owner_id == grantor_id)
+    ).all()) == 3
+
+    res = client.post(url, headers=headers, json={"ids": asset_ids[:2]})
+    assert res.status_code == 204
+    remaining = session.scalars(
+        select(Asset.uuid_pk).where(Asset.owner_id == grantor_id)
+    ).all()
+    assert remaining == asset_ids[2:]
+    session.execute(delete(User).where(User.uuid_pk == grantor_id))
+    session.commit()
+    principal_cache.invalidate(grantor_id)
+    # The account is checked, not just the token
+    res = client.post(url, headers=headers, json={"ids": asset_ids[2:]})
+    assert res.status_code == 401
+
+
+def test_create_assets(client, session):
+    """Add several assets in one transaction."""
+    grantor = User(
+        username="batchAdd", first_name="Batch", last_name="Add",
+        email="batchadd@example.com", phone_number="+2340000000005",
+        password="unused", date_of_birth=date(2000, 7, 18), gender="male"
+    )
+    session.add(grantor)
+    session.flush()
+    heir = Beneficiary(
+        first_name="Heir", last_name="Add", relation="son",
+        added_by=grantor.uuid_pk
+    )
+    session.add(heir)
+    session.commit()
+    grantor_id = grantor.uuid_pk
+    url = f"/api/v1/assets/{grantor_id}/create/assets"
+    headers = {'Authorization': 'Bearer {}'.format(create_token(data={
+        "uuid_pk": grantor_id, "username": "batchAdd",
+        "account_type": "grantor"
+    }))}
+    items = [
+        {"name": f"Plot {i}", "will_to": heir.uuid_pk, "note": ""}
+        for i in range(3)
+    ]
+
+    res = client.post(url, headers=headers, json=items + [
+        {"name": "Stranger", "will_to": str(uuid4()), "note": ""},
+        {"name": "Typo", "will_to": "not-a-uuid", "note": ""},
+    ])
+    assert res.status_code == 422
+    assert [item["index"] for item in res.json()["detail"]] == [3, 4]
+    res = client.post(url, headers=headers, json=items * 167)
+    assert res.status_code == 422
+    assert session.scalars(
+        select(Asset).where(Asset.owner_id == grantor_id)
+    ).all() == []
+
+    res = client.post(url, headers=headers, json=items)
+    assert res.status_code == 201
+    assert [item["index"] for item in res.json()] == [0, 1, 2]
+    names = dict(session.execute(
+        select(Asset.uuid_pk, Asset.name).where(Asset.owner_id == grantor_id)
+    ).all())
+    assert [names[item["uuid_pk"]] for item in res.json()] == [
+        "Plot 0", "Plot 1", "Plot 2"
+    ]
+    session.execute(delete(User).where(User.uuid_pk == grantor_id))
+    session.commit()
+    principal_cache.invalidate(grantor_id)
+    # The account is checked, not just the token
+    assert client.post(url, headers=headers, json=items).status_code == 401
+
+
+def test_retrieve_assets_pages(client, session):
+    """Walk a grantor's assets page by page."""
+    grantor = User(
+        username="pageAll", first_name="Page", last_name="All",
+        email="pageall@example.com", phone_number="+2340000000006",
+        password="unused", date_of_birth=date(2000, 7, 18), gender="male"
+    )
+    session.add(grantor)
+    session.flush()
+    heir = Beneficiary(
+        first_name="Heir", last_name="Page", relation="son",
+        added_by=grantor.uuid_pk
+    )
+    session.add(heir)
+    session.flush()
+    # One transaction: every asset shares created_at, uuid_pk breaks ties.
+    session.add_all([
+        Asset(
+            name=f"Plot {i}", location="Onitsha", note="",
+            owner_id=grantor.uuid_pk, will_to=heir.uuid_pk
+        ) for i in range(5)
+    ])
+    session.commit()
+    grantor_id = grantor.uuid_pk
+    url = f"/api/v1/assets/grantor/{grantor_id}/assets"
+    headers = {'Authorization': 'Bearer {}'.format(create_token(data={
+        "uuid_pk": grantor_id, "username": "pageAll",
+        "account_type": "grantor"
+    }))}
+
+    seen, pages, cursor = [], 0, None
+    while True:
+        params = {"limit": 2} if cursor is None else {
+            "limit": 2, "cursor": cursor
+        }
+        res = client.get(url, headers=headers, params=params)
+        assert res.status_code == 200
+        seen.extend(asset["uuid_pk"] for asset in res.json())
+        pages += 1
+        cursor = res.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert pages == 3
+    assert len(seen) == len(set(seen)) == 5
+    assert client.get(
+        url, headers=headers, params={"cursor": "garbage"}
+    ).status_code == 400
+    assert client.get(
+        url, headers=headers, params={"limit": 0}
+    ).status_code == 422
+    session.execute(delete(User).where(User.uuid_pk == grantor_id))
+    session.commit()
+
+
+def test_upload_asset_document(client, session, tmp_path, monkeypatch):
+    """Stream assets' documents to shared, reference counted storage."""
+    monkeypatch.setattr(documents, "UPLOAD_DIR", str(tmp_path))
+    grantor = User(
+        username="docAsset", first_name="Doc", last_name="Asset",
+        email="docasset@example.com", phone_number="+2340000000018",
+        password="unused", date_of_birth=date(2000, 7, 18), gender="male"
+    )
+    session.add(grantor)
+    session.flush()
+    heir = Beneficiary(
+        first_name="Heir", last_name="Asset", relation="son",
+        added_by=grantor.uuid_pk
+    )
+    session.add(heir)
+    session.flush()
+    assets = [
+        Asset(
+            name=f"Plot {i}", location="Onitsha", note="",
+            owner_id=grantor.uuid_pk, will_to=heir.uuid_pk
+        ) for i in range(2)
+    ]
+    session.add_all(assets)
+    session.commit()
+    grantor_id = grantor.uuid_pk
+    asset_ids = [asset.uuid_pk for asset in assets]
+    url = f"/api/v1/assets/{grantor_id}/assets/{{}}/document"
+    headers = {'Authorization': 'Bearer {}'.format(create_token(data={
+        "uuid_pk": grantor_id, "username": "docAsset",
+        "account_type": "grantor"
+    }))}
+    deed = b"%PDF-1.4 deed of assignment" * 1000
+    survey = b"%PDF-1.4 survey plan" * 1000
+
+    def put(asset_id, content, name="deed.pdf"):
+        """Upload content as the asset's document."""
+        return client.put(url.format(asset_id), headers=headers, files={
+            "file": (name, content, "application/pdf")
+        })
+
+    def refs(content):
+        """Return the reference count of content, None once swept."""
+        return session.scalar(select(DocumentBlob.ref_count).where(
+            DocumentBlob.sha256 == hashlib.sha256(content).hexdigest()
+        ))
+
+    res = put(asset_ids[0], deed)
+    assert res.status_code == 200, res.text
+    document = res.json()
+    sha256 = hashlib.sha256(deed).hexdigest()
+    assert document == {
+        "filename": f"{sha256[:2]}/{sha256[2:4]}/{sha256}",
+        "size": len(deed), "sha256": sha256,
+        "content_type": "application/pdf"
+    }
+    assert (tmp_path / document["filename"]).read_bytes() == deed
+    assert session.get(Asset, asset_ids[0]).document == document["filename"]
+    stored = session.execute(select(
+        Document.owner_id, Document.asset_id, Document.monetary_id,
+        Document.size
+    ).where(Document.storage_key == document["filename"])).one()
+    assert tuple(stored) == (grantor_id, asset_ids[0], None, len(deed))
+
+    download = f"/api/v1/assets/asset/download/{document['filename']}"
+    res = client.get(
+        download, headers=headers, params={"grantor_id": grantor_id}
+    )
+    assert res.status_code == 200
+    assert res.content == deed
+    assert res.headers["content-type"] == "application/pdf"
+    assert client.get(
+        download, headers=headers, params={"grantor_id": str(uuid4())}
+    ).status_code == 403
+    assert client.get(
+        "/api/v1/assets/asset/download/deed.pdf", headers=headers,
+        params={"grantor_id": grantor_id}
+    ).status_code == 404
+
+    # The same deed for another asset is only referenced.
+    res = put(asset_ids[1], deed, name="copy.pdf")
+    assert res.json()["filename"] == document["filename"]
+    assert refs(deed) == 2
+    assert os.listdir(tmp_path) == [sha256[:2]]
+    # Re-uploads release the deed, removed with its last reference.
+    assert put(asset_ids[0], survey).status_code == 200
+    assert refs(deed) == 1
+    assert put(asset_ids[1], survey).status_code == 200
+    assert refs(deed) is None and refs(survey) == 2
+    assert not (tmp_path / document["filename"]).exists()
+
+    assert put(uuid4(), deed).status_code == 404
+    assert not [
+        name for name in os.listdir(tmp_path)
+        if name.startswith(documents.PARTIAL_PREFIX)
+    ]
+    assert refs(deed) is None
+    res = client.put(
+        f"/api/v1/assets/{uuid4()}/assets/{asset_ids[0]}/document",
+        headers=headers, files={"file": ("deed.pdf", deed)}
+    )
+    assert res.status_code == 403
+    res = client.put(
+        url.format(asset_ids[0]), headers=headers, data={"note": "no file"}
+    )
+    assert res.status_code == 400
+
+    # Deleted assets drop their references, collected by documents gc.
+    session.execute(delete(Asset).where(Asset.uuid_pk.in_(asset_ids)))
+    session.commit()
+    assert refs(survey) == 0
+    survey_key = session.scalar(select(DocumentBlob.storage_key).where(
+        DocumentBlob.sha256 == hashlib.sha256(survey).hexdigest()
+    ))
+    assert (tmp_path / survey_key).exists()
+    assert main(["documents", "gc"]) == 0
+    assert refs(survey) is None
+    assert not (tmp_path / survey_key).exists()
+    session.execute(delete(User).where(User.uuid_pk == grantor_id))
+    session.commit()
@@ -4,6 +4,8 @@
 from typing import Dict
 import pytest
 from jose import jwt
+from api.v1.authorizations.cache import principal_cache
+from api.v1.authorizations.oauth import create_token
 from api.v1.configurations.settings import settings
 from api.v1.models.schemas.users import AccessToken
 
@@ -74,4 +76,34 @@ def test_user_access_token(client):
 
     assert isinstance(user_id, str)
     assert username == "eBolton"
+    assert decoded_jwt.get("account_type") == "grantor"
     assert login_data.token_type == "bearer"
+
+
+@pytest.mark.order(after="test_authenticate.py::test_user_access_token")
+def test_legacy_access_token(client):
+    """Test that tokens without an account type claim still resolve."""
+    SECRET_KEY = settings.OAUTH2_SECRET_KEY
+    ALGORITHM = settings.ALGORITHM
+
+    res = client.post('/api/v1/auths/account/login', json={
+        'username': 'eBolton',
+        'password': '07067Oliver',
+        'account_type': 'grantor'
+    })
+    login_data = AccessToken(**res.json())
+    decoded_jwt = jwt.decode(
+        login_data.access_token,
+        SECRET_KEY, algorithms=[ALGORITHM]
+    )
+    user_id = decoded_jwt.get("uuid_pk")
+    legacy_token = create_token(
+        data={"uuid_pk": user_id, "username": "eBolton"}
+    )
+    principal_cache.clear()
+    grantor = client.get(
+        f"/api/v1/grantors/account/dashboard/{user_id}",
+        headers={'Authorization': f'Bearer {legacy_token}'}
+    )
+    assert grantor.status_code == 200
+    assert principal_cache.stats()["misses"] == 1
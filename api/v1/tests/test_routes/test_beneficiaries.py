@@ -1,10 +1,16 @@
 #!/usr/bin/python3
 """Test beneficiaries routes for EstateTrust."""
 
+from datetime import date
 from typing import Dict
+from uuid import uuid4
 import pytest
 from jose import jwt
+from sqlalchemy import delete
+from api.v1.authorizations.oauth import create_token
 from api.v1.configurations.settings import settings
+from api.v1.models.data.assets import Asset, Monetary
+from api.v1.models.data.users import Beneficiary, Trustee, User
 from api.v1.models.schemas.users import AccessToken
 
 
@@ -200,3 +206,207 @@ def test_delete_beneficiary(client):
         headers=headers
     )
     assert beneficiary.status_code == 204
+
+
+def test_retrieve_distribution(client, session, monkeypatch):
+    """Stream what each beneficiary of a grantor receives."""
+    grantor = User(
+        username="distrib", first_name="Dist", last_name="Rib",
+        email="distrib@example.com", phone_number="+2340000000007",
+        password="unused", date_of_birth=date(2000, 7, 18), gender="male"
+    )
+    session.add(grantor)
+    session.flush()
+    heirs = [
+        Beneficiary(
+            first_name=name, last_name="Rib", relation="son",
+            added_by=grantor.uuid_pk
+        ) for name in ("First", "Second", "Third")
+    ]
+    session.add_all(heirs)
+    session.flush()
+    trustee = Trustee(
+        username="distribT", first_name="Dist", last_name="Trust",
+        email="distribt@example.com", phone_number="+2340000000008",
+        password="unused", relation="lawyer", added_by=grantor.uuid_pk
+    )
+    session.add_all([trustee] + [
+        Asset(
+            name=f"Plot {i}", location="Onitsha", note="",
+            owner_id=grantor.uuid_pk, will_to=heirs[0].uuid_pk
+        ) for i in range(2)
+    ] + [
+        Monetary(
+            acc_name="Dist Rib", acc_number=str(i), amount=amount,
+            currency=currency, bank_name="Bank", note="",
+            owner_id=grantor.uuid_pk, will_to=heirs[1].uuid_pk
+        ) for i, (amount, currency) in enumerate(
+            [("100.50", "USD"), ("200", "USD"), ("5000", "NGN")]
+        )
+    ])
+    session.commit()
+    grantor_id = grantor.uuid_pk
+    url = f"/api/v1/beneficiaries/account/{grantor_id}/distribution"
+    # A small batch makes the report span several fetches.
+    monkeypatch.setattr(settings, "STREAM_BATCH_SIZE", 1)
+
+    for principal in (
+        {"uuid_pk": grantor_id, "username": "distrib",
+         "account_type": "grantor"},
+        {"uuid_pk": trustee.uuid_pk, "username": "distribT",
+         "account_type": "trustee", "added_by": grantor_id},
+    ):
+        headers = {'Authorization': 'Bearer {}'.format(
+            create_token(data=principal)
+        )}
+        res = client.get(url, headers=headers)
+        assert res.status_code == 200
+        assert res.headers["content-type"] == "application/json"
+        report = {entry["first_name"]: entry for entry in res.json()}
+        assert sorted(report) == ["First", "Second", "Third"]
+        assert report["First"]["asset_count"] == 2
+        assert sorted(
+            asset["name"] for asset in report["First"]["assets"]
+        ) == ["Plot 0", "Plot 1"]
+        assert report["Second"]["asset_count"] == 0
+        assert report["Second"]["monetary_totals"] == [
+            {"currency": "NGN", "amount": "5000.00", "accounts": 1},
+            {"currency": "USD", "amount": "300.50", "accounts": 2},
+        ]
+        assert len(report["Second"]["monetaries"]) == 3
+        assert report["Third"]["assets"] == []
+        assert report["Third"]["monetary_totals"] == []
+
+    other = client.get(
+        f"/api/v1/beneficiaries/account/{uuid4()}/distribution",
+        headers=headers
+    )
+    assert other.status_code == 403
+    session.execute(delete(Beneficiary).where(
+        Beneficiary.added_by == grantor_id
+    ))
+    session.commit()
+    headers = {'Authorization': 'Bearer {}'.format(create_token(data={
+        "uuid_pk": grantor_id, "username": "distrib",
+        "account_type": "grantor"
+    }))}
+    res = client.get(url, headers=headers)
+    assert res.status_code == 200
+    assert res.json() == []
+    session.execute(delete(User).where(User.uuid_pk == grantor_id))
+    session.commit()
+    res = client.get(url, headers=headers)
+    assert res.status_code == 404
+
+
+def test_search_beneficiaries(client, session, trigram):
+    """Suggest beneficiaries by name and refuse likely duplicates."""
+    grantor = User(
+        username="fuzzy", first_name="Fuz", last_name="Zy",
+        email="fuzzy@example.com", phone_number="+2340000000013",
+        password="unused", date_of_birth=date(2000, 7, 18), gender="male"
+    )
+    session.add(grantor)
+    session.flush()
+    session.add_all([
+        Beneficiary(
+            first_name=first, middle_name=middle, last_name="Ejie",
+            relation="daughter", added_by=grantor.uuid_pk
+        ) for first, middle in (("Ada", "Blessing"), ("Chiamaka", None))
+    ])
+    session.commit()
+    grantor_id = grantor.uuid_pk
+    headers = {'Authorization': 'Bearer {}'.format(create_token(data={
+        "uuid_pk": grantor_id, "username": "fuzzy",
+        "account_type": "grantor"
+    }))}
+    url = f"/api/v1/beneficiaries/account/{grantor_id}/search"
+
+    res = client.get(url, headers=headers, params={"q": "Ad"})
+    assert res.status_code == 200
+    assert [hit["first_name"] for hit in res.json()] == ["Ada"]
+    res = client.get(url, headers=headers, params={"q": "chiam"})
+    assert [hit["first_name"] for hit in res.json()] == ["Chiamaka"]
+    assert res.json()[0]["score"] > 0
+    assert client.get(
+        url, headers=headers, params={"q": "Okonkwo"}
+    ).json() == []
+    assert client.get(
+        f"/api/v1/beneficiaries/account/{uuid4()}/search",
+        headers=headers, params={"q": "Ada"}
+    ).status_code == 403
+
+    create = f"/api/v1/beneficiaries/account/{grantor_id}/create/beneficiary"
+    adah = {
+        "first_name": "Adah", "middle_name": "Blessing",
+        "last_name": "Ejie", "relation": "daughter"
+    }
+    res = client.post(
+        create, headers=headers, json=adah,
+        params={"check_duplicates": True}
+    )
+    assert res.status_code == 409
+    matches = res.json()["detail"]["possible_duplicates"]
+    assert [hit["first_name"] for hit in matches] == ["Ada"]
+    assert client.post(
+        create, headers=headers, json={
+            "first_name": "Obinna", "last_name": "Okafor", "relation": "son"
+        },
+        params={"check_duplicates": True}
+    ).status_code == 201
+    assert client.post(create, headers=headers, json=adah).status_code == 201
+    session.execute(delete(User).where(User.uuid_pk == grantor_id))
+    session.commit()
+
+
+def test_search_beneficiaries_without_trigram(client, session, no_trigram):
+    """Suggest beneficiaries by typed words without pg_trgm."""
+    grantor = User(
+        username="plain", first_name="Pla", last_name="In",
+        email="plain@example.com", phone_number="+2340000000033",
+        password="unused", date_of_birth=date(2000, 7, 18), gender="male"
+    )
+    session.add(grantor)
+    session.flush()
+    session.add_all([
+        Beneficiary(
+            first_name=first, middle_name=middle, last_name="Ejie",
+            relation="daughter", added_by=grantor.uuid_pk
+        ) for first, middle in (("Ada", "Blessing"), ("Chiamaka", None))
+    ])
+    session.commit()
+    grantor_id = grantor.uuid_pk
+    headers = {'Authorization': 'Bearer {}'.format(create_token(data={
+        "uuid_pk": grantor_id, "username": "plain",
+        "account_type": "grantor"
+    }))}
+    url = f"/api/v1/beneficiaries/account/{grantor_id}/search"
+
+    res = client.get(url, headers=headers, params={"q": "chiam ejie"})
+    assert res.status_code == 200
+    assert [hit["first_name"] for hit in res.json()] == ["Chiamaka"]
+    assert res.json()[0]["score"] > 0
+    res = client.get(url, headers=headers, params={"q": "ejie"})
+    assert [hit["first_name"] for hit in res.json()] == ["Chiamaka", "Ada"]
+    assert client.get(
+        url, headers=headers, params={"q": "%"}
+    ).json() == []
+
+    create = f"/api/v1/beneficiaries/account/{grantor_id}/create/beneficiary"
+    ada = {
+        "first_name": "ADA", "middle_name": "Blessing",
+        "last_name": "Ejie", "relation": "daughter"
+    }
+    res = client.post(
+        create, headers=headers, json=ada,
+        params={"check_duplicates": True}
+    )
+    assert res.status_code == 409
+    matches = res.json()["detail"]["possible_duplicates"]
+    assert [hit["first_name"] for hit in matches] == ["Ada"]
+    assert client.post(
+        create, headers=headers, json={**ada, "first_name": "Adah"},
+        params={"check_duplicates": True}
+    ).status_code == 201
+    session.execute(delete(User).where(User.uuid_pk == grantor_id))
+    session.commit()
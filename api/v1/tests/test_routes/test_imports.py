@@ -0,0 +1,168 @@
+#!/usr/bin/python3
+"""Test CSV import routes for EstateTrust."""
+
+import json
+from datetime import date
+from uuid import uuid4
+import pytest
+from sqlalchemy import delete, select
+from api.v1.authorizations.oauth import create_token
+from api.v1.cli import main
+from api.v1.configurations.settings import settings
+from api.v1.models.data.assets import Asset, Monetary
+from api.v1.models.data.users import Beneficiary, User
+
+
+@pytest.fixture(scope="module")
+def grantor(session):
+    """Create a grantor with one beneficiary, and a stranger's heir."""
+    grantors = [
+        User(
+            username=f"import{i}", first_name="Im", last_name="Port",
+            email=f"import{i}@example.com",
+            phone_number=f"+23400000000{20 + i}", password="unused",
+            date_of_birth=date(2000, 7, 18), gender="male"
+        ) for i in range(2)
+    ]
+    session.add_all(grantors)
+    session.flush()
+    heirs = [
+        Beneficiary(
+            first_name="Heir", last_name="Port", relation="son",
+            added_by=owner.uuid_pk
+        ) for owner in grantors
+    ]
+    session.add_all(heirs)
+    session.commit()
+    ids = [str(row.uuid_pk) for row in grantors + heirs]
+    yield {
+        "id": ids[0], "heir": ids[2], "strange_heir": ids[3],
+        "headers": {'Authorization': 'Bearer {}'.format(create_token(data={
+            "uuid_pk": ids[0], "username": "import0",
+            "account_type": "grantor"
+        }))}
+    }
+    session.rollback()
+    session.execute(delete(User).where(User.uuid_pk.in_(ids[:2])))
+    session.commit()
+
+
+def upload(client, grantor, kind, content):
+    """Post a CSV file to the import route."""
+    return client.post(
+        f"/api/v1/imports/grantor/{grantor['id']}/{kind}",
+        headers=grantor["headers"],
+        files={"file": (f"{kind}.csv", content.encode(), "text/csv")}
+    )
+
+
+def test_import_beneficiaries(client, session, grantor, monkeypatch):
+    """Import beneficiaries over several COPY chunks."""
+    monkeypatch.setattr(settings, "IMPORT_CHUNK_SIZE", 2)
+    res = upload(client, grantor, "beneficiaries", (
+        "\ufeffFirst_Name,middle_name,last_name,relation\r\n"
+        "Ada,,Port,daughter\r\n"
+        "\r\n"
+        "Obi,Chukwu,Port,son\r\n"
+        "Ngozi,,Port,wife\r\n"
+    ))
+    assert res.status_code == 201, res.text
+    assert res.json() == {"imported": 3, "invalid": 0, "errors": []}
+    names = session.execute(select(
+        Beneficiary.first_name, Beneficiary.middle_name
+    ).where(
+        Beneficiary.added_by == grantor["id"],
+        Beneficiary.first_name != "Heir"
+    ).order_by(Beneficiary.first_name)).all()
+    assert [tuple(row) for row in names] == [
+        ("Ada", ""), ("Ngozi", ""), ("Obi", "Chukwu")
+    ]
+
+
+def test_import_assets(client, session, grantor):
+    """Import assets willed to the grantor's beneficiary."""
+    heir = grantor["heir"]
+    res = upload(client, grantor, "assets", (
+        "name,location,will_to,note\n"
+        f'"Plot 5, Lekki",Lagos,{heir},\n'
+        f'Farmland,,{heir},"Bought in 1999\nfrom the Obi family"\n'
+    ))
+    assert res.status_code == 201, res.text
+    assert res.json()["imported"] == 2
+    assets = session.execute(select(
+        Asset.name, Asset.location, Asset.note
+    ).where(Asset.owner_id == grantor["id"]).order_by(Asset.name)).all()
+    assert [tuple(row) for row in assets] == [
+        ("Farmland", "", "Bought in 1999\nfrom the Obi family"),
+        ("Plot 5, Lekki", "Lagos", ""),
+    ]
+
+
+def test_import_errors(client, session, grantor, monkeypatch):
+    """Report invalid rows by line and import nothing."""
+    heir = grantor["heir"]
+    header = "acc_name,acc_number,amount,currency,bank_name,will_to,note\n"
+    res = upload(client, grantor, "monetaries", (
+        header +
+        f"Savings,001,1000.50,,Access,{heir},\n"
+        f"Current,002,lots,NGN,Access,{heir},\n"
+        "Dollar,003,10,usd,Access,not-a-uuid,\n"
+        f",004,10,USD,Access,{heir},\n"
+    ))
+    assert res.status_code == 422
+    report = res.json()["detail"]
+    assert (report["imported"], report["invalid"]) == (0, 3)
+    assert [entry["line"] for entry in report["errors"]] == [3, 4, 5]
+    assert [
+        error["field"] for error in report["errors"][0]["errors"]
+    ] == ["amount"]
+    assert report["errors"][1]["errors"][0]["field"] == "currency"
+    assert report["errors"][2]["errors"][0]["field"] == "acc_name"
+
+    res = upload(client, grantor, "monetaries", (
+        header +
+        f"Savings,001,1000.50,,Access,{heir},\n"
+        f"Stolen,002,5,NGN,Access,{grantor['strange_heir']},\n"
+    ))
+    assert res.status_code == 422
+    assert res.json()["detail"]["errors"] == [{"line": 3, "errors": [
+        {"field": "will_to", "message": "unknown beneficiary"}
+    ]}]
+    assert session.scalar(select(Monetary.uuid_pk).where(
+        Monetary.owner_id == grantor["id"]
+    )) is None
+
+    monkeypatch.setattr(settings, "IMPORT_ERROR_LIMIT", 1)
+    res = upload(client, grantor, "beneficiaries", (
+        "first_name,last_name,relation\nA,B,pope\nC,D,\n"
+    ))
+    assert res.json()["detail"]["invalid"] == 2
+    assert len(res.json()["detail"]["errors"]) == 1
+    res = upload(client, grantor, "beneficiaries", 'a,b\n"unclosed\n')
+    assert res.status_code == 422
+
+    assert upload(client, grantor, "documents", header).status_code == 422
+    res = client.post(
+        f"/api/v1/imports/grantor/{uuid4()}/assets",
+        headers=grantor["headers"],
+        files={"file": ("assets.csv", header.encode(), "text/csv")}
+    )
+    assert res.status_code == 403
+
+
+def test_import_cli(session, grantor, tmp_path, capsys):
+    """Import monetary assets from the command line."""
+    path = tmp_path / "monetaries.csv"
+    path.write_text(
+        "acc_name,acc_number,amount,bank_name,will_to,note\n"
+        f"Savings,001,1000.50,Access,{grantor['heir']},\n"
+    )
+    args = ["import", "monetaries", grantor["id"], str(path)]
+    assert main(args) == 0
+    assert json.loads(capsys.readouterr().out)["imported"] == 1
+    amount, currency = session.execute(select(
+        Monetary.amount, Monetary.currency
+    ).where(Monetary.owner_id == grantor["id"])).one()
+    assert (str(amount), currency) == ("1000.50", settings.DEFAULT_CURRENCY)
+    path.write_text("acc_name\nSavings\n")
+    assert main(args) == 1
@@ -1,11 +1,22 @@
 #!/usr/bin/python3
 """Test monetary assets routes for EstateTrust."""
 
+import hashlib
+import os
+from datetime import date
+from decimal import Decimal
 from typing import Dict
+from uuid import uuid4
 import pytest
 from jose import jwt
+from sqlalchemy import delete, select
+from api.v1.authorizations.oauth import create_token
 from api.v1.configurations.settings import settings
+from api.v1.models.data.assets import Monetary
+from api.v1.models.data.documents import Document
+from api.v1.models.data.users import Beneficiary, User
 from api.v1.models.schemas.users import AccessToken
+from api.v1.utils import documents
 
 
 @pytest.mark.order(after="test_assets.py::test_delete_asset")
@@ -37,7 +48,8 @@ def test_create_monetary_asset(client) -> Dict[str, str]:
         headers=headers, json={
             "acc_name": "Okoye Chris Ebuka",
             "acc_number": "2070000000",
-            "amount": "$300,000.00",
+            "amount": "300000.00",
+            "currency": "USD",
             "bank_name": "United Bank For Africa (UBA)",
             "will_to": beneficiaries.json()[0]["uuid_pk"],
             "note": """
@@ -185,7 +197,7 @@ def test_update_asset(client):
         headers=headers, json={
             "acc_name": "Okoye Chris Edu",
             "acc_number": "2070000000",
-            "amount": "$300,000.00",
+            "amount": "300000.00",
             "bank_name": "United Bank For Africa (UBA)",
             "will_to": beneficiaries.json()[0]["uuid_pk"],
             "note": """
@@ -195,9 +207,96 @@ def test_update_asset(client):
         }
     )
     assert asset.status_code == 200
+    other = client.put(
+        f"/api/v1/monetaries/asset/grantor/{uuid4()}/assets/{asset_id}"
+        "/update", headers=headers, json={
+            "acc_name": "Not mine", "acc_number": None, "amount": None,
+            "bank_name": None, "will_to": None, "note": None
+        }
+    )
+    assert other.status_code == 403
 
 
 @pytest.mark.order(after="test_monetaries.py::test_update_asset")
+def test_retrieve_estate_totals(client):
+    """Sum the monetary assets per currency and per beneficiary."""
+    SECRET_KEY = settings.OAUTH2_SECRET_KEY
+    ALGORITHM = settings.ALGORITHM
+
+    res = client.post('/api/v1/auths/account/login', json={
+        'username': 'eBolton',
+        'password': '07067Oliver',
+        'account_type': 'grantor'
+    })
+    login_data = AccessToken(**res.json())
+    decoded_jwt = jwt.decode(
+        login_data.access_token,
+        SECRET_KEY, algorithms=[ALGORITHM]
+    )
+    user_id = decoded_jwt.get("uuid_pk")
+    headers = {
+        'Authorization': 'Bearer {}'.format(login_data.access_token)
+    }
+    heir = client.get(
+        f"/api/v1/beneficiaries/account/{user_id}/beneficiaries",
+        headers=headers
+    ).json()[0]["uuid_pk"]
+    res = client.post(
+        f"/api/v1/monetaries/asset/{user_id}/create/monetaries",
+        headers=headers, json=[
+            {
+                "acc_name": "Okoye Chris Ebuka", "acc_number": "2070000001",
+                "amount": "1500.50", "currency": "USD",
+                "bank_name": "Zenith Bank", "will_to": heir, "note": ""
+            },
+            {
+                "acc_name": "Okoye Chris Ebuka", "acc_number": "2070000002",
+                "amount": "2000", "bank_name": "Zenith Bank",
+                "will_to": heir, "note": ""
+            },
+        ]
+    )
+    assert res.status_code == 201
+    res = client.post(
+        f"/api/v1/monetaries/asset/{user_id}/create/monetary",
+        headers=headers, json={
+            "acc_name": "Okoye Chris Ebuka", "acc_number": "2070000003",
+            "amount": "$1,000", "bank_name": "Zenith Bank",
+            "will_to": heir, "note": ""
+        }
+    )
+    assert res.status_code == 422
+    totals = client.get(
+        f"/api/v1/monetaries/asset/grantor/{user_id}/totals",
+        headers=headers
+    )
+    assert totals.status_code == 200
+    assert totals.json() == {
+        "grantor_id": user_id,
+        "totals": [
+            {"currency": "NGN", "amount": "2000.00", "accounts": 1},
+            {"currency": "USD", "amount": "301500.50", "accounts": 2},
+        ],
+        "beneficiaries": [
+            {
+                "beneficiary_id": heir, "currency": "NGN",
+                "amount": "2000.00", "accounts": 1
+            },
+            {
+                "beneficiary_id": heir, "currency": "USD",
+                "amount": "301500.50", "accounts": 2
+            },
+        ]
+    }
+    other = client.get(
+        "/api/v1/monetaries/asset/grantor/"
+        "00000000-0000-0000-0000-000000000000/totals",
+        headers=headers
+    )
+    assert other.status_code == 403
+
+
+@pytest.mark.order(after="test_monetaries.py::test_retrieve_estate_totals")
 def test_delete_asset(client):
     """Delete an asset."""
     SECRET_KEY = settings.OAUTH2_SECRET_KEY
@@ -222,8 +321,71 @@ def test_delete_asset(client):
         headers=headers
     )
     asset_id = assets.json()[0]['uuid_pk']
+    other = client.delete(
+        f"/api/v1/monetaries/asset/grantor/{uuid4()}/assets/{asset_id}"
+        "/delete", headers=headers
+    )
+    assert other.status_code == 403
     asset = client.delete(
         f"/api/v1/monetaries/asset/grantor/{user_id}/assets/{asset_id}/delete",
         headers=headers
     )
     assert asset.status_code == 204
+
+
+def test_upload_monetary_document(client, session, tmp_path, monkeypatch):
+    """Stream a monetary asset's document to storage and attach it."""
+    monkeypatch.setattr(documents, "UPLOAD_DIR", str(tmp_path))
+    grantor = User(
+        username="docMoney", first_name="Doc", last_name="Money",
+        email="docmoney@example.com", phone_number="+2340000000019",
+        password="unused", date_of_birth=date(2000, 7, 18), gender="male"
+    )
+    session.add(grantor)
+    session.flush()
+    heir = Beneficiary(
+        first_name="Heir", last_name="Money", relation="son",
+        added_by=grantor.uuid_pk
+    )
+    session.add(heir)
+    session.flush()
+    account = Monetary(
+        acc_name="Savings", acc_number="0001", amount=Decimal("10.00"),
+        bank_name="Access", note="", owner_id=grantor.uuid_pk,
+        will_to=heir.uuid_pk
+    )
+    session.add(account)
+    session.commit()
+    grantor_id, asset_id = grantor.uuid_pk, account.uuid_pk
+    url = "/api/v1/monetaries/asset/grantor/{}/assets/{}/document"
+    headers = {'Authorization': 'Bearer {}'.format(create_token(data={
+        "uuid_pk": grantor_id, "username": "docMoney",
+        "account_type": "grantor"
+    }))}
+    content = b"statement of account" * 1000
+    files = {"file": ("statement.pdf", content, "application/pdf")}
+
+    res = client.put(
+        url.format(grantor_id, asset_id), headers=headers, files=files
+    )
+    assert res.status_code == 200, res.text
+    document = res.json()
+    assert document["sha256"] == hashlib.sha256(content).hexdigest()
+    assert (tmp_path / document["filename"]).read_bytes() == content
+    session.expire_all()
+    assert session.get(Monetary, asset_id).document == document["filename"]
+    assert session.scalar(select(Document.monetary_id).where(
+        Document.storage_key == document["filename"]
+    )) == asset_id
+
+    res = client.put(
+        url.format(grantor_id, uuid4()), headers=headers, files=files
+    )
+    assert res.status_code == 404
+    assert os.listdir(tmp_path) == [document["sha256"][:2]]
+    res = client.put(
+        url.format(uuid4(), asset_id), headers=headers, files=files
+    )
+    assert res.status_code == 403
+    session.execute(delete(User).where(User.uuid_pk == grantor_id))
+    session.commit()
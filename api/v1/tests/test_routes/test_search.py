@@ -0,0 +1,115 @@
+#!/usr/bin/python3
+"""Test estate search routes for EstateTrust."""
+
+from datetime import date
+from uuid import uuid4
+from sqlalchemy import delete
+from api.v1.authorizations.oauth import create_token
+from api.v1.models.data.assets import Asset, Monetary
+from api.v1.models.data.users import Beneficiary, User
+
+
+def test_search_estate(client, session):
+    """Search a grantor's assets and monetary assets, best first."""
+    grantor = User(
+        username="search", first_name="Sea", last_name="Rch",
+        email="search@example.com", phone_number="+2340000000011",
+        password="unused", date_of_birth=date(2000, 7, 18), gender="male"
+    )
+    stranger = User(
+        username="searchX", first_name="Sea", last_name="Rch",
+        email="searchx@example.com", phone_number="+2340000000012",
+        password="unused", date_of_birth=date(2000, 7, 18), gender="male"
+    )
+    session.add_all([grantor, stranger])
+    session.flush()
+    heirs = [
+        Beneficiary(
+            first_name="Heir", last_name="Search", relation="son",
+            added_by=owner.uuid_pk
+        ) for owner in (grantor, stranger)
+    ]
+    session.add_all(heirs)
+    session.flush()
+    session.add_all([
+        Asset(
+            name="Lekki duplex", location="Lagos", note="",
+            owner_id=grantor.uuid_pk, will_to=heirs[0].uuid_pk
+        ),
+        Asset(
+            name="Farmland", location="Enugu",
+            note="Bought from the Lekki family",
+            owner_id=grantor.uuid_pk, will_to=heirs[0].uuid_pk
+        ),
+        Asset(
+            name="Lekki shop", location="Lagos", note="",
+            owner_id=stranger.uuid_pk, will_to=heirs[1].uuid_pk
+        ),
+    ] + [
+        Monetary(
+            acc_name="Savings", acc_number=str(i), amount=1,
+            bank_name=bank, note=note, owner_id=grantor.uuid_pk,
+            will_to=heirs[0].uuid_pk
+        ) for i, (bank, note) in enumerate([
+            ("Lekki Bank", ""), ("Access", "Rent from the Lekki duplex")
+        ])
+    ])
+    session.commit()
+    grantor_id, stranger_id = grantor.uuid_pk, stranger.uuid_pk
+    url = f"/api/v1/search/grantor/{grantor_id}/estate"
+    headers = {'Authorization': 'Bearer {}'.format(create_token(data={
+        "uuid_pk": grantor_id, "username": "search",
+        "account_type": "grantor"
+    }))}
+
+    res = client.get(url, headers=headers, params={"q": "lekki"})
+    assert res.status_code == 200
+    hits = res.json()
+    assert [(hit["kind"], hit["title"]) for hit in hits[:2]] == [
+        ("asset", "Lekki duplex"), ("monetary", "Savings")
+    ]
+    assert len(hits) == 4
+    assert [hit["rank"] for hit in hits] == sorted(
+        (hit["rank"] for hit in hits), reverse=True
+    )
+    res = client.get(url, headers=headers, params={"q": '"lekki duplex"'})
+    assert sorted(hit["note"] for hit in res.json()) == [
+        "", "Rent from the Lekki duplex"
+    ]
+    res = client.get(url, headers=headers, params={"q": "lekki -duplex"})
+    assert len(res.json()) == 2
+    for terms in ("abuja", "the"):
+        assert client.get(
+            url, headers=headers, params={"q": terms}
+        ).json() == []
+
+    seen, pages, cursor = [], 0, None
+    while True:
+        params = {"q": "lekki", "limit": 1}
+        if cursor is not None:
+            params["cursor"] = cursor
+        res = client.get(url, headers=headers, params=params)
+        assert res.status_code == 200
+        seen.extend(hit["uuid_pk"] for hit in res.json())
+        pages += 1
+        cursor = res.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert seen == [hit["uuid_pk"] for hit in hits]
+    assert pages == 4
+    assert client.get(
+        url, headers=headers, params={"q": "lekki", "cursor": "garbage"}
+    ).status_code == 400
+    assert client.get(url, headers=headers).status_code == 422
+    assert client.get(
+        f"/api/v1/search/grantor/{stranger_id}/estate",
+        headers=headers, params={"q": "lekki"}
+    ).status_code == 403
+    assert client.get(
+        f"/api/v1/search/grantor/{uuid4()}/estate",
+        headers=headers, params={"q": "lekki"}
+    ).status_code == 403
+    session.execute(delete(User).where(
+        User.uuid_pk.in_([grantor_id, stranger_id])
+    ))
+    session.commit()
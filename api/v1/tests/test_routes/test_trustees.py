@@ -1,10 +1,15 @@
 #!/usr/bin/python3
 """Test trustees routes for EstateTrust."""
 
+from datetime import date
 from typing import Dict
+from uuid import uuid4
 import pytest
 from jose import jwt
+from sqlalchemy import delete
+from api.v1.authorizations.oauth import create_token
 from api.v1.configurations.settings import settings
+from api.v1.models.data.users import Trustee, User
 from api.v1.models.schemas.users import AccessToken
 
 
@@ -216,3 +221,106 @@ def test_delete_trustee(client):
         headers=headers
     )
     assert trustee.status_code == 204
+
+
+def test_search_trustees(client, session, trigram):
+    """Suggest trustees by name, email or phone and refuse duplicates."""
+    grantor = User(
+        username="fuzzyT", first_name="Fuz", last_name="Zy",
+        email="fuzzyt@example.com", phone_number="+2340000000014",
+        password="unused", date_of_birth=date(2000, 7, 18), gender="male"
+    )
+    session.add(grantor)
+    session.flush()
+    session.add(Trustee(
+        username="fuzzyLaw", first_name="Ngozi", last_name="Okeke",
+        email="ngozi.okeke@example.com", phone_number="+2348031234567",
+        password="unused", relation="lawyer", added_by=grantor.uuid_pk
+    ))
+    session.commit()
+    grantor_id = grantor.uuid_pk
+    headers = {'Authorization': 'Bearer {}'.format(create_token(data={
+        "uuid_pk": grantor_id, "username": "fuzzyT",
+        "account_type": "grantor"
+    }))}
+    url = f"/api/v1/trustees/account/{grantor_id}/search"
+
+    for terms in ("Ngozy", "ngozi.okeke@", "08031234567"):
+        res = client.get(url, headers=headers, params={"q": terms})
+        assert res.status_code == 200
+        assert [hit["username"] for hit in res.json()] == ["fuzzyLaw"]
+    assert client.get(
+        url, headers=headers, params={"q": "Chukwuemeka"}
+    ).json() == []
+    assert client.get(
+        f"/api/v1/trustees/account/{uuid4()}/search",
+        headers=headers, params={"q": "Ngozi"}
+    ).status_code == 403
+
+    create = f"/api/v1/trustees/account/{grantor_id}/create/trustee"
+    twin = {
+        "first_name": "Ngozie", "middle_name": None, "last_name": "Okeke",
+        "email": "ngozi.okeke@example.com", "phone_number": "+2348031234567",
+        "username": "fuzzyTwin", "password": "password",
+        "relation": "lawyer", "note": ""
+    }
+    res = client.post(
+        create, headers=headers, json=twin,
+        params={"check_duplicates": True}
+    )
+    assert res.status_code == 409
+    matches = res.json()["detail"]["possible_duplicates"]
+    assert [hit["username"] for hit in matches] == ["fuzzyLaw"]
+    assert "password" not in matches[0]
+    assert client.post(create, headers=headers, json=twin).status_code == 201
+    session.execute(delete(User).where(User.uuid_pk == grantor_id))
+    session.commit()
+
+
+def test_search_trustees_without_trigram(client, session, no_trigram):
+    """Suggest trustees by typed words without pg_trgm."""
+    grantor = User(
+        username="plainT", first_name="Pla", last_name="In",
+        email="plaint@example.com", phone_number="+2340000000034",
+        password="unused", date_of_birth=date(2000, 7, 18), gender="male"
+    )
+    session.add(grantor)
+    session.flush()
+    session.add(Trustee(
+        username="plainLaw", first_name="Ngozi", last_name="Okeke",
+        email="ngozi.okeke@example.com", phone_number="+2348031234567",
+        password="unused", relation="lawyer", added_by=grantor.uuid_pk
+    ))
+    session.commit()
+    grantor_id = grantor.uuid_pk
+    headers = {'Authorization': 'Bearer {}'.format(create_token(data={
+        "uuid_pk": grantor_id, "username": "plainT",
+        "account_type": "grantor"
+    }))}
+    url = f"/api/v1/trustees/account/{grantor_id}/search"
+
+    for terms in ("ngozi", "okeke@example", "8031234567"):
+        res = client.get(url, headers=headers, params={"q": terms})
+        assert res.status_code == 200
+        assert [hit["username"] for hit in res.json()] == ["plainLaw"]
+    assert client.get(
+        url, headers=headers, params={"q": "Ngozy"}
+    ).json() == []
+
+    create = f"/api/v1/trustees/account/{grantor_id}/create/trustee"
+    twin = {
+        "first_name": "Ngozi", "middle_name": None, "last_name": "Okeke",
+        "email": "ngozi.okeke@example.com", "phone_number": "+2348031234567",
+        "username": "plainTwin", "password": "password",
+        "relation": "lawyer", "note": ""
+    }
+    res = client.post(
+        create, headers=headers, json=twin,
+        params={"check_duplicates": True}
+    )
+    assert res.status_code == 409
+    matches = res.json()["detail"]["possible_duplicates"]
+    assert [hit["username"] for hit in matches] == ["plainLaw"]
+    assert "password" not in matches[0]
+    session.execute(delete(User).where(User.uuid_pk == grantor_id))
+    session.commit()
@@ -1,9 +1,18 @@
 #!/usr/bin/python3
 """Test users routes."""
 
+import csv
+import io
+import json
+from datetime import date
 from typing import Dict
 from jose import jwt
+from sqlalchemy import delete, event
+from sqlalchemy.engine import Engine
+from api.v1.authorizations.oauth import create_token
 from api.v1.configurations.settings import settings
+from api.v1.models.data.assets import Asset, Monetary
+from api.v1.models.data.users import Beneficiary, Trustee, User
 from api.v1.models.schemas.users import AccessToken
 
 
@@ -81,6 +90,198 @@ def test_user_dashboard(client) -> Dict[str, str]:
     assert grantor.json()["uuid_pk"] == user_id
 
 
+def test_user_summary(client):
+    """Test that the estate summary agrees with the dashboard."""
+    res = client.post('/api/v1/auths/account/login', json={
+        'username': 'eBolton',
+        'password': '07067Oliver',
+        'account_type': 'grantor'
+    })
+    login_data = AccessToken(**res.json())
+    decoded_jwt = jwt.decode(
+        login_data.access_token,
+        settings.OAUTH2_SECRET_KEY, algorithms=[settings.ALGORITHM]
+    )
+    user_id = decoded_jwt.get("uuid_pk")
+    headers = {
+        'Authorization': 'Bearer {}'.format(login_data.access_token)
+    }
+    dashboard = client.get(
+        f"/api/v1/grantors/account/dashboard/{user_id}",
+        headers=headers
+    ).json()
+    summary = client.get(
+        f"/api/v1/grantors/account/dashboard/{user_id}/summary",
+        headers=headers
+    )
+    assert summary.status_code == 200
+    body = summary.json()
+    assert body["grantor_id"] == user_id
+    assert [body[name] for name in (
+        "beneficiaries", "trustees", "assets", "monetaries"
+    )] == [len(dashboard[name] or []) for name in (
+        "beneficiaries", "executors", "assets", "monetaries"
+    )]
+    other = client.get(
+        "/api/v1/grantors/account/dashboard/"
+        "00000000-0000-0000-0000-000000000000/summary",
+        headers=headers
+    )
+    assert other.status_code == 403
+
+
+def test_user_dashboard_query_count(client, session):
+    """Test that the dashboard query count does not grow with the estate."""
+    grantor = User(
+        username="qCount", first_name="Query", last_name="Count",
+        email="querycount@example.com", phone_number="+2340000000001",
+        password="unused", date_of_birth=date(2000, 7, 18), gender="male"
+    )
+    session.add(grantor)
+    session.commit()
+    grantor_id = grantor.uuid_pk
+    token = create_token(data={
+        "uuid_pk": grantor_id, "username": "qCount",
+        "account_type": "grantor"
+    })
+    counts = []
+    for batch, size in enumerate((1, 5)):
+        beneficiaries = [
+            Beneficiary(
+                first_name=f"Heir{batch}{i}", last_name="Count",
+                relation="son", added_by=grantor_id
+            ) for i in range(size)
+        ]
+        session.add_all(beneficiaries)
+        session.flush()
+        for i, beneficiary in enumerate(beneficiaries):
+            session.add_all([
+                Asset(
+                    name=f"House {i}", location="Onitsha", note="",
+                    owner_id=grantor_id, will_to=beneficiary.uuid_pk
+                ),
+                Monetary(
+                    acc_name="Query Count", acc_number=f"{batch}{i}",
+                    amount="100", bank_name="Bank", note="",
+                    owner_id=grantor_id, will_to=beneficiary.uuid_pk
+                ),
+                Trustee(
+                    username=f"qc{batch}{i}", first_name="Trust",
+                    last_name="Count", email=f"qc{batch}{i}@example.com",
+                    phone_number=f"+234000000{batch}{i}",
+                    password="unused", relation="lawyer",
+                    added_by=grantor_id
+                ),
+            ])
+        session.commit()
+
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(Engine, "before_cursor_execute", count)
+        res = client.get(
+            f"/api/v1/grantors/account/dashboard/{grantor_id}",
+            headers={'Authorization': f'Bearer {token}'}
+        )
+        event.remove(Engine, "before_cursor_execute", count)
+        assert res.status_code == 200
+        assert len(res.json()["assets"]) == len(res.json()["executors"])
+        counts.append(len(statements))
+
+    session.execute(delete(User).where(User.uuid_pk == grantor_id))
+    session.commit()
+    assert counts == [1, 1]
+
+
+def test_export_estate(client, session):
+    """Test that the whole estate is exported as NDJSON or CSV."""
+    grantor = User(
+        username="export", first_name="Ex", last_name="Port",
+        email="export@example.com", phone_number="+2340000000015",
+        password="unused", date_of_birth=date(2000, 7, 18), gender="male"
+    )
+    session.add(grantor)
+    session.flush()
+    heirs = [
+        Beneficiary(
+            first_name=name, last_name="Port", relation="son",
+            added_by=grantor.uuid_pk
+        ) for name in ("First", "Second")
+    ]
+    session.add_all(heirs)
+    session.flush()
+    session.add_all([
+        Trustee(
+            username="exportT", first_name="Ex", last_name="Trust",
+            email="exportt@example.com", phone_number="+2340000000016",
+            password="unused", relation="lawyer", added_by=grantor.uuid_pk
+        ),
+        Asset(
+            name="Plot, east", location="Onitsha", note="",
+            owner_id=grantor.uuid_pk, will_to=heirs[0].uuid_pk
+        ),
+        Monetary(
+            acc_name="Ex Port", acc_number="1", amount="100.50",
+            bank_name="Bank", note="", owner_id=grantor.uuid_pk,
+            will_to=heirs[1].uuid_pk
+        ),
+    ])
+    session.commit()
+    grantor_id = grantor.uuid_pk
+    url = f"/api/v1/grantors/account/dashboard/{grantor_id}/export"
+    headers = {'Authorization': 'Bearer {}'.format(create_token(data={
+        "uuid_pk": grantor_id, "username": "export",
+        "account_type": "grantor"
+    }))}
+
+    res = client.get(url, headers=headers)
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "application/x-ndjson"
+    assert res.headers["content-disposition"] == (
+        f'attachment; filename="estate-{grantor_id}.ndjson"'
+    )
+    records = [json.loads(line) for line in res.text.splitlines()]
+    assert [record["kind"] for record in records] == [
+        "grantor", "beneficiary", "beneficiary", "trustee", "asset",
+        "monetary"
+    ]
+    assert records[0]["uuid_pk"] == grantor_id
+    heir_ids = {
+        record["first_name"]: record["uuid_pk"] for record in records[1:3]
+    }
+    assert sorted(heir_ids) == ["First", "Second"]
+    assert all("password" not in record for record in records)
+    assert "search" not in records[4]
+    assert records[5]["amount"] == 100.5
+
+    res = client.get(url, headers=headers, params={"format": "csv"})
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(res.text)))
+    assert [row["kind"] for row in rows] == [
+        record["kind"] for record in records
+    ]
+    assert "password" not in rows[0]
+    assert rows[4]["name"] == "Plot, east"
+    assert rows[4]["first_name"] == ""
+    assert rows[5]["amount"] == "100.50"
+    assert rows[5]["will_to"] == heir_ids["Second"]
+
+    assert client.get(
+        url, headers=headers, params={"format": "xml"}
+    ).status_code == 422
+    assert client.get(
+        "/api/v1/grantors/account/dashboard/"
+        "00000000-0000-0000-0000-000000000000/export",
+        headers=headers
+    ).status_code == 403
+    session.execute(delete(User).where(User.uuid_pk == grantor_id))
+    session.commit()
+    assert client.get(url, headers=headers).status_code == 404
+
+
 def test_update_account(client):
     """Test update_account."""
     SECRET_KEY = settings.OAUTH2_SECRET_KEY
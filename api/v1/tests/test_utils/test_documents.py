@@ -0,0 +1,161 @@
+#!/usr/bin/python3
+"""Test streamed document uploads for EstateTrust."""
+
+import asyncio
+import hashlib
+import itertools
+import os
+import threading
+import tracemalloc
+from typing import Iterable
+import pytest
+from fastapi import HTTPException, Request
+from api.v1.configurations.settings import settings
+from api.v1.utils import documents
+
+BOUNDARY = "estatetrustboundary"
+
+
+def multipart(content: Iterable[bytes], name="file") -> Iterable[bytes]:
+    """Wrap content in a multipart/form-data body, a piece at a time."""
+    yield (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="note"\r\n\r\n'
+        "the deed\r\n"
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="{name}"; '
+        'filename="../deed.pdf"\r\n'
+        "Content-Type: application/pdf\r\n\r\n"
+    ).encode()
+    yield from content
+    yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def upload(pieces: Iterable[bytes], length: int = None, media_type=None):
+    """Run receive_document over a request delivering pieces."""
+    headers = [(
+        b"content-type",
+        (media_type or f"multipart/form-data; boundary={BOUNDARY}").encode()
+    )]
+    if length is not None:
+        headers.append((b"content-length", str(length).encode()))
+    pieces = iter(pieces)
+
+    async def receive():
+        piece = next(pieces, None)
+        if piece is None:
+            return {"type": "http.request", "body": b"", "more_body": False}
+        return {"type": "http.request", "body": piece, "more_body": True}
+
+    request = Request(
+        {"type": "http", "method": "PUT", "headers": headers}, receive
+    )
+    return asyncio.run(documents.receive_document(request))
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    """Store documents in a temporary directory."""
+    monkeypatch.setattr(documents, "UPLOAD_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_receive_document(upload_dir, monkeypatch):
+    """Test that the file is written in chunks, checksummed and kept."""
+    monkeypatch.setattr(settings, "DOCUMENT_CHUNK_SIZE", 1000)
+    content = os.urandom(10_007)
+    writes = []
+    write = documents.PartialFile.write
+    monkeypatch.setattr(
+        documents.PartialFile, "write",
+        lambda self, data: writes.append(len(data)) or write(self, data)
+    )
+    pieces = (content[i:i + 999] for i in range(0, len(content), 999))
+    document = upload(multipart(pieces))
+    sha256 = hashlib.sha256(content).hexdigest()
+    assert document["size"] == len(content)
+    assert document["sha256"] == sha256
+    assert document["content_type"] == "application/pdf"
+    assert document["filename"] == f"{sha256[:2]}/{sha256[2:4]}/{sha256}"
+    assert os.listdir(upload_dir) == [os.path.basename(document["upload"])]
+    assert len(writes) > 5 and max(writes) < 2000
+
+    documents.store_blob(document["upload"], document["filename"])
+    assert (upload_dir / document["filename"]).read_bytes() == content
+    again = upload(multipart([content]))
+    documents.store_blob(again["upload"], again["filename"])
+    assert not os.path.exists(again["upload"])
+    assert os.listdir(upload_dir) == [sha256[:2]]
+
+
+def test_receive_document_refuses(upload_dir, monkeypatch):
+    """Test oversized, fieldless and malformed uploads leave no file."""
+    monkeypatch.setattr(settings, "DOCUMENT_MAX_SIZE", 5000)
+    read = []
+    endless = (read.append(1) or b"x" * 1000 for _ in range(100))
+    with pytest.raises(HTTPException) as exc:
+        upload(multipart(endless))
+    assert exc.value.status_code == 413
+    assert len(read) < 10
+    with pytest.raises(HTTPException) as exc:
+        upload(multipart(endless), length=10**9)
+    assert exc.value.status_code == 413
+    for body, media_type in (
+        (multipart([b"data"], name="other"), None),
+        ([b"not a multipart body"], None),
+        ([b"{}"], "application/json"),
+    ):
+        with pytest.raises(HTTPException) as exc:
+            upload(body, media_type=media_type)
+        assert exc.value.status_code == 400
+    assert os.listdir(upload_dir) == []
+
+
+def test_receive_document_bounds_headers(upload_dir, monkeypatch):
+    """Test part headers and fieldless bodies cannot grow unbounded."""
+    monkeypatch.setattr(settings, "DOCUMENT_MAX_SIZE", 5000)
+    discarded_by = []
+    discard = documents.PartialFile.discard
+    monkeypatch.setattr(
+        documents.PartialFile, "discard",
+        lambda self: discarded_by.append(threading.current_thread())
+        or discard(self)
+    )
+    read = []
+    header = (
+        f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=note"
+    ).encode()
+    endless = (read.append(1) or b"x" * 1000 for _ in range(10**4))
+    with pytest.raises(HTTPException) as exc:
+        upload(itertools.chain([header], endless))
+    assert exc.value.status_code == 413
+    assert "headers" in exc.value.detail
+    assert len(read) < 20
+
+    read.clear()
+    note = (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="note"\r\n\r\n'
+    ).encode()
+    with pytest.raises(HTTPException) as exc:
+        upload(itertools.chain([note], endless))
+    assert exc.value.status_code == 413
+    assert len(read) < 100
+    assert os.listdir(upload_dir) == []
+    assert len(discarded_by) == 2
+    assert threading.main_thread() not in discarded_by
+
+
+def test_receive_document_memory(upload_dir, monkeypatch):
+    """Test that peak memory does not grow with the document."""
+    monkeypatch.setattr(settings, "DOCUMENT_CHUNK_SIZE", 256 * 1024)
+    block = b"%PDF" * 16 * 1024
+    tracemalloc.start()
+    try:
+        document = upload(multipart(block for _ in range(64)))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # The 4MB document itself would not fit.
+    assert document["size"] == 64 * len(block)
+    assert peak < 4 * settings.DOCUMENT_CHUNK_SIZE
@@ -0,0 +1,27 @@
+#!/usr/bin/python3
+"""Test the keyset pagination helpers for EstateTrust."""
+
+from datetime import datetime, timezone
+from uuid import uuid4
+import pytest
+from fastapi import HTTPException
+from api.v1.utils.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_roundtrip():
+    """Test that a cursor decodes to the position it encodes."""
+    position = (datetime.now(timezone.utc), str(uuid4()))
+    cursor = encode_cursor(*position)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == position
+    assert decode_cursor(None) is None
+
+
+@pytest.mark.parametrize("cursor", ["garbage", encode_cursor(
+    datetime.now(timezone.utc), "not-a-uuid"
+)])
+def test_invalid_cursor(cursor):
+    """Test that a forged cursor is rejected with 400."""
+    with pytest.raises(HTTPException) as err:
+        decode_cursor(cursor)
+    assert err.value.status_code == 400
@@ -0,0 +1,81 @@
+#!/usr/bin/python3
+"""Test the password worker pool for EstateTrust."""
+
+import asyncio
+from time import perf_counter
+import pytest
+from api.v1.utils.passwd import (
+    PasswordPoolFull, PasswordService, hash_pwd
+)
+
+
+def test_password_service_roundtrip():
+    """Test hashing and verifying on the worker pool."""
+    service = PasswordService(workers=2, queue_size=2)
+
+    async def roundtrip():
+        hashed = await service.hash("07067Oliver")
+        return (
+            await service.verify("07067Oliver", hashed),
+            await service.verify("wrong", hashed)
+        )
+
+    assert asyncio.run(roundtrip()) == (True, False)
+    assert service.stats()["completed"] == 3
+
+
+def test_password_service_keeps_event_loop_responsive():
+    """Test that a burst of verifications does not stall the loop."""
+    service = PasswordService(workers=2, queue_size=8)
+    hashed = hash_pwd("07067Oliver")
+
+    async def storm():
+        gaps = []
+        burst = asyncio.gather(*(
+            service.verify("07067Oliver", hashed) for _ in range(4)
+        ))
+        last = perf_counter()
+        while not burst.done():
+            await asyncio.sleep(0.01)
+            now = perf_counter()
+            gaps.append(now - last)
+            last = now
+        await burst
+        return max(gaps)
+
+    assert asyncio.run(storm()) < 0.1
+
+
+def test_password_service_rejects_when_saturated():
+    """Test that work beyond the queue bound is rejected."""
+    service = PasswordService(workers=1, queue_size=0)
+    hashed = hash_pwd("07067Oliver")
+
+    async def saturate():
+        return await asyncio.gather(
+            service.verify("07067Oliver", hashed),
+            service.verify("07067Oliver", hashed),
+            return_exceptions=True
+        )
+
+    results = asyncio.run(saturate())
+    assert results[0] is True
+    assert isinstance(results[1], PasswordPoolFull)
+    assert service.stats()["rejected"] == 1
+
+
+def test_password_pool_full_response(client, test_user, monkeypatch):
+    """Test that a saturated pool sheds logins with 503."""
+    async def saturated(*args):
+        raise PasswordPoolFull("password worker pool is saturated")
+
+    monkeypatch.setattr(
+        "api.v1.routes.authenticate.averify_pwd", saturated
+    )
+    res = client.post("/api/v1/auths/account/login", json={
+        "username": "cBolton",
+        "password": "07067Oliver",
+        "account_type": "grantor"
+    })
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "1"
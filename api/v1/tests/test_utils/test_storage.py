@@ -0,0 +1,123 @@
+#!/usr/bin/python3
+"""Test the document storage backends for EstateTrust."""
+
+import asyncio
+import os
+import boto3
+import pytest
+from boto3.s3.transfer import TransferConfig
+from api.v1.configurations.settings import settings
+from api.v1.utils import documents, storage
+
+moto = pytest.importorskip("moto")
+
+MIB = 1024 * 1024
+
+
+@pytest.fixture
+def bucket():
+    """An S3Storage over a bucket of an in-process S3 stand-in."""
+    with moto.mock_s3():
+        client = boto3.client(
+            "s3", region_name="us-east-1",
+            aws_access_key_id="testing", aws_secret_access_key="testing"
+        )
+        client.create_bucket(Bucket="estatetrust")
+        yield storage.S3Storage(client, "estatetrust", TransferConfig(
+            multipart_threshold=5 * MIB, multipart_chunksize=5 * MIB,
+            max_concurrency=4
+        ))
+
+
+def received(tmp_path, content: bytes, name="upload") -> str:
+    """Write content where receive_document would leave an upload."""
+    path = tmp_path / name
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_s3_store(bucket, tmp_path):
+    """Test large uploads are sent in parts, and duplicates dropped."""
+    content = os.urandom(12 * MIB)
+    upload = received(tmp_path, content)
+    bucket.store(upload, "ab/cd/abcd")
+    assert not os.path.exists(upload)
+    head = bucket.client.head_object(Bucket="estatetrust", Key="ab/cd/abcd")
+    assert head["ContentLength"] == len(content)
+    # The ETag of a multipart upload ends with its number of parts
+    assert head["ETag"].strip('"').endswith("-3")
+
+    upload = received(tmp_path, content)
+    bucket.store(upload, "ab/cd/abcd")
+    assert not os.path.exists(upload)
+    again = bucket.client.head_object(Bucket="estatetrust", Key="ab/cd/abcd")
+    assert again["LastModified"] == head["LastModified"]
+
+
+def test_s3_serve_remove(bucket, tmp_path):
+    """Test documents are served from a temporary copy, and removed."""
+    content = os.urandom(11 * MIB)
+    bucket.store(received(tmp_path, content), "ab/cd/abcd")
+    assert bucket.stored("ab/cd/abcd")
+
+    res = bucket.serve("ab/cd/abcd", "application/pdf")
+    assert res.media_type == "application/pdf"
+    with open(res.path, "rb") as f:
+        assert f.read() == content
+    asyncio.run(res.background())
+    assert not os.path.exists(res.path)
+
+    bucket.remove("ab/cd/abcd")
+    assert not bucket.stored("ab/cd/abcd")
+    bucket.remove("ab/cd/abcd")
+
+
+def test_local_storage(tmp_path):
+    """Test documents are kept under the directory."""
+    local = storage.LocalStorage(str(tmp_path / "uploads"))
+    local.store(received(tmp_path, b"deed"), "ab/cd/abcd")
+    local.store(received(tmp_path, b"deed"), "ab/cd/abcd")
+    assert (tmp_path / "uploads/ab/cd/abcd").read_bytes() == b"deed"
+    assert not (tmp_path / "upload").exists()
+    res = local.serve("ab/cd/abcd", "application/pdf")
+    assert res.path == str(tmp_path / "uploads/ab/cd/abcd")
+    local.remove("ab/cd/abcd")
+    local.remove("ab/cd/abcd")
+    assert not (tmp_path / "uploads/ab/cd/abcd").exists()
+
+
+def test_incomplete_storage():
+    """Test a backend missing a method cannot be instantiated."""
+
+    class Unservable(storage.Storage):
+        """A backend without serve."""
+
+        def store(self, upload, storage_key):
+            """Store nothing."""
+
+        def remove(self, storage_key):
+            """Remove nothing."""
+
+    with pytest.raises(TypeError):
+        Unservable()
+
+
+def test_storage_backend(tmp_path, monkeypatch):
+    """Test the backend follows settings.STORAGE_BACKEND."""
+    monkeypatch.setattr(documents, "UPLOAD_DIR", str(tmp_path))
+    local = documents.storage()
+    assert isinstance(local, storage.LocalStorage)
+    assert local.directory == str(tmp_path)
+
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "s3")
+    monkeypatch.setattr(settings, "S3_REGION", "us-east-1")
+    monkeypatch.setattr(settings, "S3_MAX_CONCURRENCY", 3)
+    storage.s3_storage.cache_clear()
+    try:
+        remote = documents.storage()
+        assert isinstance(remote, storage.S3Storage)
+        assert remote is documents.storage()
+        assert remote.bucket == settings.AWS_BUCKET_NAME
+        assert remote.transfer.max_request_concurrency == 3
+    finally:
+        storage.s3_storage.cache_clear()
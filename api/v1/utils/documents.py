@@ -1,61 +1,262 @@
 #!/usr/bin/python3
-"""Upload files to the specified directory or server."""
+"""Receive uploaded documents and hand them to the configured storage."""
 
+import hashlib
 import os
-from datetime import datetime
-import boto3
-from botocore.exceptions import NoCredentialsError
-from fastapi import UploadFile
+from tempfile import NamedTemporaryFile
+from typing import Any, Dict
+from anyio import CancelScope
+from fastapi import HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import FileResponse
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
 from api.v1.configurations.settings import settings
+from api.v1.utils.storage import LocalStorage, Storage, s3_storage
 
 UPLOAD_DIR = "documents/uploads"
-up_date = f"_{datetime.now().date()}"
+# Names uploads still being written, never served or indexed
+PARTIAL_PREFIX = ".partial-"
+# Room for the multipart boundaries and part headers around the file.
+MULTIPART_OVERHEAD = 64 * 1024
+# The most header bytes a single part may carry.
+MAX_PART_HEADERS = 8 * 1024
 
 
-async def upload_file(uuid_pk: str, file: UploadFile):
-    """Upload a document file to local storage."""
-    if file.filename:
-        file.filename = uuid_pk + up_date + file.filename
-    else:
-        file.filename = uuid_pk + up_date + file.filename
-    file_path = os.path.join(UPLOAD_DIR, file.filename)
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+def blob_key(sha256: str) -> str:
+    """
+    Return the storage key of content with the given SHA-256.
 
-    with open(file_path, "wb") as f:
-        f.write(file.file.read())
+    Two levels of hash prefix shards keep every directory small: 65536
+    leaf directories share the files evenly.
+    """
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}"
 
-    return {"filename": file.filename}
 
+def storage() -> Storage:
+    """Return the storage backend selected by settings.STORAGE_BACKEND."""
+    if settings.STORAGE_BACKEND == "s3":
+        return s3_storage()
+    return LocalStorage(UPLOAD_DIR)
 
-s3 = boto3.client(
-    's3', aws_access_key_id=settings.AWS_ACCESS_KEY,
-    aws_secret_access_key=settings.AWS_SECRET_KEY
-)
 
+def store_blob(upload: str, storage_key: str) -> None:
+    """
+    Move a received upload to storage_key.
 
-async def aws_s3_upload_file(uuid_pk: str, file: UploadFile):
-    """Upload a file to the AWS Cloud Storage."""
-    if file.filename:
-        file.filename = uuid_pk + up_date + file.filename
-    else:
-        file.filename = uuid_pk + up_date + file.filename
+    Args:
+        upload (str): The path of the received file
+        storage_key (str): Where its content is stored; if a file is
+            there already it holds the same content and the upload is
+            dropped
+    """
+    storage().store(upload, storage_key)
+
+
+def remove_blob(storage_key: str) -> None:
+    """Remove a stored file nothing references any more."""
+    storage().remove(storage_key)
+
+
+def discard_upload(upload: str) -> None:
+    """Remove a received upload that was not stored, if still there."""
     try:
-        s3.upload_fileobj(
-            file.file,
-            settings.AWS_BUCKET_NAME,
-            file.filename
+        os.unlink(upload)
+    except FileNotFoundError:
+        pass
+
+
+class PartialFile:
+    """A file being uploaded, hashed as it is written."""
+
+    def __init__(self, directory: str) -> None:
+        """Open a hidden temporary file in directory."""
+        os.makedirs(directory, exist_ok=True)
+        self.file = NamedTemporaryFile(
+            dir=directory, prefix=PARTIAL_PREFIX, delete=False
         )
-        return {"message": f"File '{file.filename}' uploaded successfully."}
-    except NoCredentialsError:
-        return {"error": "AWS credentials not found."}
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data: bytes) -> None:
+        """Append data to the file and the checksum."""
+        self.sha256.update(data)
+        self.file.write(data)
+        self.size += len(data)
+
+    def close(self) -> None:
+        """Close the complete file."""
+        self.file.close()
+
+    def discard(self) -> None:
+        """Remove the incomplete file."""
+        self.file.close()
+        os.unlink(self.file.name)
+
+
+class FilePart:
+    """Collect the part named file of a multipart body as it is parsed."""
+
+    def __init__(self, boundary: bytes) -> None:
+        """Start parsing a body delimited by boundary."""
+        self.parser = MultipartParser(boundary, callbacks={
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        })
+        self.headers: Dict[bytes, bytes] = {}
+        self.field = self.value = b""
+        self.filename: str | None = None
+        self.content_type = "application/octet-stream"
+        self.reading = self.complete = False
+        self.pending = bytearray()
+        self.received = 0
+        self.header_size = 0
+
+    def on_part_begin(self) -> None:
+        """Forget the headers of the previous part."""
+        self.headers = {}
+        self.header_size = 0
+
+    def header_bytes(self, data: bytes, start: int, end: int) -> bytes:
+        """Count the part's header bytes, keeping none past the limit."""
+        self.header_size += end - start
+        if self.header_size > MAX_PART_HEADERS:
+            return b""
+        return data[start:end]
 
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        """Accumulate a header name."""
+        self.field += self.header_bytes(data, start, end)
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        """Accumulate a header value."""
+        self.value += self.header_bytes(data, start, end)
+
+    def on_header_end(self) -> None:
+        """Record a complete header."""
+        self.headers[self.field.lower()] = self.value
+        self.field = self.value = b""
+
+    def on_headers_finished(self) -> None:
+        """Start reading the part if it is the first file named file."""
+        _, options = parse_options_header(
+            self.headers.get(b"content-disposition", b"")
+        )
+        if self.filename is None and options.get(b"name") == b"file" \
+                and b"filename" in options:
+            self.filename = options[b"filename"].decode("utf-8", "replace")
+            self.content_type = self.headers.get(
+                b"content-type", self.content_type.encode()
+            ).decode("latin-1")
+            self.reading = True
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        """Buffer the file's data."""
+        if self.reading:
+            self.pending += data[start:end]
+            self.received += end - start
+
+    def on_part_end(self) -> None:
+        """Note that the whole file was received."""
+        if self.reading:
+            self.reading, self.complete = False, True
+
+    def take(self) -> bytearray:
+        """Hand over the buffered data."""
+        data, self.pending = self.pending, bytearray()
+        return data
+
+
+async def discard_partial(partial: PartialFile) -> None:
+    """Remove an incomplete upload off the event loop, even if cancelled."""
+    with CancelScope(shield=True):
+        await run_in_threadpool(partial.discard)
+
+
+async def receive_document(request: Request) -> Dict[str, Any]:
+    """
+    Stream the file field of a multipart request body to disk.
+
+    The body is parsed as it arrives. The file is written to disk off the
+    event loop settings.DOCUMENT_CHUNK_SIZE bytes at a time, its SHA-256
+    computed on the way, so neither the file nor the body is ever held
+    in memory. The upload is refused as soon as it grows past
+    settings.DOCUMENT_MAX_SIZE, or a part's headers past
+    MAX_PART_HEADERS, and only a complete file is kept, for store_blob
+    or discard_upload.
+
+    Args:
+        request (Request): The multipart/form-data request
+    Returns:
+        The received file's upload path, its content addressed filename,
+        size, sha256 and content_type
+    Raises:
+        HTTPException: 413 past the maximum size or header size, 400
+            without a file
+    """
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"documents are limited to {settings.DOCUMENT_MAX_SIZE} bytes"
+    )
+    headers_too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"part headers are limited to {MAX_PART_HEADERS} bytes"
+    )
+    no_file = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="expected a multipart/form-data body with a file field"
+    )
+    media_type, options = parse_options_header(
+        request.headers.get("content-type", "")
+    )
+    if media_type != b"multipart/form-data" or b"boundary" not in options:
+        raise no_file
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and \
+            int(length) > settings.DOCUMENT_MAX_SIZE + MULTIPART_OVERHEAD:
+        raise too_large
+    part = FilePart(options[b"boundary"])
+    partial = await run_in_threadpool(PartialFile, UPLOAD_DIR)
+    body_size = 0
+    try:
+        async for chunk in request.stream():
+            body_size += len(chunk)
+            part.parser.write(chunk)
+            if part.header_size > MAX_PART_HEADERS:
+                raise headers_too_large
+            if part.received > settings.DOCUMENT_MAX_SIZE or body_size > \
+                    settings.DOCUMENT_MAX_SIZE + MULTIPART_OVERHEAD:
+                raise too_large
+            if len(part.pending) >= settings.DOCUMENT_CHUNK_SIZE:
+                await run_in_threadpool(partial.write, part.take())
+        part.parser.finalize()
+        if not part.complete:
+            raise no_file
+        await run_in_threadpool(partial.write, part.take())
+        await run_in_threadpool(partial.close)
+    except MultipartParseError as exc:
+        await discard_partial(partial)
+        raise no_file from exc
+    except BaseException:
+        await discard_partial(partial)
+        raise
+    sha256 = partial.sha256.hexdigest()
+    return {
+        "upload": partial.file.name,
+        "filename": blob_key(sha256),
+        "size": partial.size,
+        "sha256": sha256,
+        "content_type": part.content_type,
+    }
 
-async def download_file(file_name: str) -> FileResponse:
-    """Download a file."""
-    for root, dirs, files in os.walk(UPLOAD_DIR):
-        for file in files:
-            if file_name in file:
-                file_path = os.path.join(root, file)
 
-    return FileResponse(file_path)
+async def download_file(storage_key: str, content_type: str) -> FileResponse:
+    """Serve a stored document, fetched first from a remote storage."""
+    return await run_in_threadpool(
+        storage().serve, storage_key, content_type
+    )
@@ -0,0 +1,31 @@
+#!/usr/bin/python3
+"""Possible duplicate responses for Estate Trust create routes."""
+
+from typing import Any, Dict, List
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+
+def refuse_duplicates(
+    matches: List[Dict[str, Any]], schema: type[BaseModel]
+) -> None:
+    """
+    Refuse a create request that looks like an existing entry.
+
+    Args:
+        matches (list): The look-alikes found by possible_duplicates
+        schema (type): The match schema to serialise them with
+    Raises:
+        HTTPException: 409 listing the look-alikes, if there are any
+    """
+    if matches:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={
+                "message": "possible duplicates found",
+                "possible_duplicates": jsonable_encoder(
+                    [schema(**match) for match in matches]
+                )
+            }
+        )
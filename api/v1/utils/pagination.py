@@ -0,0 +1,144 @@
+#!/usr/bin/python3
+"""Keyset pagination for Estate Trust list routes."""
+
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+from uuid import UUID
+from fastapi import HTTPException, Query, Response, status
+from api.v1.configurations.settings import settings
+
+# Response header carrying the cursor of the next page.
+NEXT_CURSOR = "X-Next-Cursor"
+
+
+def pack_cursor(*position: Any) -> str:
+    """Encode a JSON serialisable position as an opaque cursor."""
+    raw = json.dumps(list(position))
+    return urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def unpack_cursor(cursor: str) -> List[Any]:
+    """Decode an opaque cursor back to its JSON position."""
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(urlsafe_b64decode(padded))
+
+
+def encode_cursor(created_at: datetime, uuid_pk: str) -> str:
+    """Encode a (created_at, uuid_pk) position as an opaque cursor."""
+    return pack_cursor(created_at.isoformat(), str(uuid_pk))
+
+
+def decode_cursor(cursor: Optional[str]) -> Tuple[datetime, str] | None:
+    """
+    Decode an opaque cursor back to a (created_at, uuid_pk) position.
+
+    Args:
+        cursor (str): The cursor returned with the previous page
+    Returns:
+        The position, or None for the first page
+    Raises:
+        HTTPException: 400 if the cursor was not issued by us
+    """
+    if not cursor:
+        return None
+    try:
+        created_at, uuid_pk = unpack_cursor(cursor)
+        return datetime.fromisoformat(created_at), str(UUID(uuid_pk))
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="invalid cursor"
+        )
+
+
+class Pagination:
+    """Keyset pagination query parameters of a list route."""
+
+    def __init__(
+        self,
+        limit: int = Query(
+            settings.PAGE_SIZE, ge=1, le=settings.PAGE_SIZE_MAX
+        ),
+        cursor: Optional[str] = Query(None)
+    ) -> None:
+        """Parse the page size and the position to resume from."""
+        self.limit: int = limit
+        self.after: Tuple[datetime, str] | None = decode_cursor(cursor)
+
+    def page(self, items: List[Any] | None, response: Response):
+        """
+        Trim the lookahead row and advertise the next page.
+
+        Args:
+            items (list): The rows fetched with limit + 1
+            response (Response): The response to set X-Next-Cursor on
+        Returns:
+            At most limit rows
+        """
+        if items is None or len(items) <= self.limit:
+            return items
+        items = items[:self.limit]
+        last = items[-1]
+        response.headers[NEXT_CURSOR] = encode_cursor(
+            last.created_at, last.uuid_pk
+        )
+        return items
+
+
+def decode_rank_cursor(cursor: Optional[str]) -> Tuple[float, str] | None:
+    """
+    Decode an opaque cursor back to a (rank, uuid_pk) search position.
+
+    Args:
+        cursor (str): The cursor returned with the previous page
+    Returns:
+        The position, or None for the first page
+    Raises:
+        HTTPException: 400 if the cursor was not issued by us
+    """
+    if not cursor:
+        return None
+    try:
+        rank, uuid_pk = unpack_cursor(cursor)
+        return float(rank), str(UUID(uuid_pk))
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="invalid cursor"
+        )
+
+
+class RankedPagination(Pagination):
+    """Keyset pagination of results in descending rank order."""
+
+    def __init__(
+        self,
+        limit: int = Query(
+            settings.PAGE_SIZE, ge=1, le=settings.PAGE_SIZE_MAX
+        ),
+        cursor: Optional[str] = Query(None)
+    ) -> None:
+        """Parse the page size and the ranked position to resume from."""
+        self.limit: int = limit
+        self.after: Tuple[float, str] | None = decode_rank_cursor(cursor)
+
+    def page(self, items: List[Any], response: Response):
+        """
+        Trim the lookahead result and advertise the next page.
+
+        Args:
+            items (list): The results fetched with limit + 1
+            response (Response): The response to set X-Next-Cursor on
+        Returns:
+            At most limit results
+        """
+        if len(items) <= self.limit:
+            return items
+        items = items[:self.limit]
+        last = items[-1]
+        response.headers[NEXT_CURSOR] = pack_cursor(
+            last["rank"], str(last["uuid_pk"])
+        )
+        return items
@@ -1,7 +1,13 @@
 #!/usr/bin/python3
 """Password utility functions."""
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from time import perf_counter
+from typing import Any, Callable, Dict
 from passlib.context import CryptContext
+from api.v1.configurations.settings import settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -14,3 +20,96 @@ def hash_pwd(password: str) -> CryptContext:
 def verify_pwd(password: str, hashed_password: str) -> CryptContext:
     """Verify password."""
     return pwd_context.verify(password, hashed_password)
+
+
+class PasswordPoolFull(Exception):
+    """Raised when the password worker pool queue is full."""
+
+
+class PasswordService:
+    """Run bcrypt hashing off the event loop on a bounded worker pool."""
+
+    def __init__(self, workers: int, queue_size: int) -> None:
+        """Initialize the worker pool."""
+        self.workers: int = workers
+        self.queue_size: int = queue_size
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="passwd"
+        )
+        self._lock = Lock()
+        self._pending: int = 0
+        self._running: int = 0
+        self.completed: int = 0
+        self.rejected: int = 0
+        self.wait_total: float = 0.0
+        self.wait_max: float = 0.0
+
+    async def _run(self, func: Callable, *args) -> Any:
+        """Queue func on the pool, rejecting work beyond the queue bound."""
+        with self._lock:
+            if self._pending >= self.workers + self.queue_size:
+                self.rejected += 1
+                raise PasswordPoolFull("password worker pool is saturated")
+            self._pending += 1
+        submitted = perf_counter()
+
+        def job():
+            """Record the queue wait and run func."""
+            waited = perf_counter() - submitted
+            with self._lock:
+                self._running += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+            try:
+                return func(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self.completed += 1
+
+        try:
+            return await asyncio.wrap_future(self._executor.submit(job))
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        """Hash password on the worker pool."""
+        return await self._run(hash_pwd, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """Verify password on the worker pool."""
+        return await self._run(verify_pwd, password, hashed_password)
+
+    def stats(self) -> Dict[str, int | float]:
+        """Return queue depth and wait time counters."""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "queue_depth": self._pending - self._running,
+                "in_flight": self._running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "wait_avg_ms": (
+                    self.wait_total / self.completed * 1000
+                    if self.completed else 0.0
+                ),
+                "wait_max_ms": self.wait_max * 1000,
+            }
+
+
+password_service = PasswordService(
+    workers=settings.PASSWORD_POOL_WORKERS,
+    queue_size=settings.PASSWORD_POOL_QUEUE_SIZE
+)
+
+
+async def ahash_pwd(password: str) -> str:
+    """Hash password without blocking the event loop."""
+    return await password_service.hash(password)
+
+
+async def averify_pwd(password: str, hashed_password: str) -> bool:
+    """Verify password without blocking the event loop."""
+    return await password_service.verify(password, hashed_password)
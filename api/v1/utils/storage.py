@@ -0,0 +1,155 @@
+#!/usr/bin/python3
+"""
+Document storage backends for Estate Trust.
+
+Uploads are received to a local file first (see utils.documents); a
+backend then keeps them under their storage key, on the local disk or in
+an S3-compatible bucket, as settings.STORAGE_BACKEND selects. Backend
+methods block and are called from the threadpool.
+"""
+
+import os
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from tempfile import mkstemp
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from fastapi.responses import FileResponse
+from starlette.background import BackgroundTask
+from api.v1.configurations.settings import settings
+
+
+class Storage(ABC):
+    """Where stored documents are kept."""
+
+    @abstractmethod
+    def store(self, upload: str, storage_key: str) -> None:
+        """
+        Move a received upload to storage_key.
+
+        Args:
+            upload (str): The path of the received file, removed here
+            storage_key (str): Where its content is stored; if something
+                is there already it holds the same content and the upload
+                is dropped
+        """
+
+    @abstractmethod
+    def remove(self, storage_key: str) -> None:
+        """Remove a stored document, if there."""
+
+    @abstractmethod
+    def serve(self, storage_key: str, content_type: str) -> FileResponse:
+        """Build the response downloading a stored document."""
+
+
+class LocalStorage(Storage):
+    """Documents kept in a directory of the local filesystem."""
+
+    def __init__(self, directory: str) -> None:
+        """Keep documents under directory."""
+        self.directory: str = directory
+
+    def path(self, storage_key: str) -> str:
+        """Return where the document with storage_key is kept."""
+        return os.path.join(self.directory, storage_key)
+
+    def store(self, upload: str, storage_key: str) -> None:
+        """Move a received upload to storage_key."""
+        path = self.path(storage_key)
+        if os.path.exists(path):
+            os.unlink(upload)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(upload, path)
+
+    def remove(self, storage_key: str) -> None:
+        """Remove a stored document, if there."""
+        try:
+            os.unlink(self.path(storage_key))
+        except FileNotFoundError:
+            pass
+
+    def serve(self, storage_key: str, content_type: str) -> FileResponse:
+        """Build the response downloading a stored document."""
+        return FileResponse(self.path(storage_key), media_type=content_type)
+
+
+class S3Storage(Storage):
+    """
+    Documents kept in an S3-compatible bucket.
+
+    Transfers above the multipart threshold of transfer are split into
+    parts sent, and fetched with ranged requests, several at a time.
+    """
+
+    def __init__(
+        self, client, bucket: str, transfer: TransferConfig
+    ) -> None:
+        """Keep documents in bucket, moved as transfer configures."""
+        self.client = client
+        self.bucket: str = bucket
+        self.transfer: TransferConfig = transfer
+
+    def stored(self, storage_key: str) -> bool:
+        """Tell whether a document is stored under storage_key."""
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=storage_key)
+        except ClientError as exc:
+            if exc.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                return False
+            raise
+        return True
+
+    def store(self, upload: str, storage_key: str) -> None:
+        """Upload a received file to storage_key, in parallel parts."""
+        if not self.stored(storage_key):
+            self.client.upload_file(
+                upload, self.bucket, storage_key, Config=self.transfer
+            )
+        os.unlink(upload)
+
+    def remove(self, storage_key: str) -> None:
+        """Remove a stored document, if there."""
+        self.client.delete_object(Bucket=self.bucket, Key=storage_key)
+
+    def fetch(self, storage_key: str, path: str) -> None:
+        """Download a stored document to path, in parallel ranges."""
+        self.client.download_file(
+            self.bucket, storage_key, path, Config=self.transfer
+        )
+
+    def serve(self, storage_key: str, content_type: str) -> FileResponse:
+        """Fetch a stored document to a temporary file and serve it."""
+        fd, path = mkstemp(prefix="download-")
+        os.close(fd)
+        try:
+            self.fetch(storage_key, path)
+        except BaseException:
+            os.unlink(path)
+            raise
+        return FileResponse(
+            path, media_type=content_type,
+            background=BackgroundTask(os.unlink, path)
+        )
+
+
+@lru_cache(maxsize=1)
+def s3_storage() -> S3Storage:
+    """Connect to the bucket of the settings, once per process."""
+    client = boto3.client(
+        "s3",
+        aws_access_key_id=settings.AWS_ACCESS_KEY,
+        aws_secret_access_key=settings.AWS_SECRET_KEY,
+        endpoint_url=settings.S3_ENDPOINT_URL,
+        region_name=settings.S3_REGION,
+        # Room for a few transfers of S3_MAX_CONCURRENCY parts at once
+        config=Config(max_pool_connections=4 * settings.S3_MAX_CONCURRENCY)
+    )
+    return S3Storage(client, settings.AWS_BUCKET_NAME, TransferConfig(
+        multipart_threshold=settings.S3_MULTIPART_THRESHOLD,
+        multipart_chunksize=settings.S3_MULTIPART_CHUNK_SIZE,
+        max_concurrency=settings.S3_MAX_CONCURRENCY
+    ))
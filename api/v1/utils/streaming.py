@@ -0,0 +1,104 @@
+#!/usr/bin/python3
+"""Streaming response bodies for Estate Trust."""
+
+import csv
+from io import StringIO
+from itertools import islice
+from typing import (
+    AsyncIterable, AsyncIterator, Iterable, List, Sequence, TypeVar
+)
+from starlette.concurrency import run_in_threadpool
+from api.v1.configurations.settings import settings
+
+T = TypeVar("T")
+
+
+async def batches(
+    entries: Iterable[T] | AsyncIterable[T]
+) -> AsyncIterator[List[T]]:
+    """
+    Group entries settings.STREAM_BATCH_SIZE at a time.
+
+    Args:
+        entries: The entries; a sync iterator is advanced on the
+            threadpool since it may fetch rows from the database, one
+            batch per hop rather than one entry
+    Returns:
+        The non-empty batches
+    """
+    size = settings.STREAM_BATCH_SIZE
+    if hasattr(entries, "__aiter__"):
+        batch = []
+        async for entry in entries:
+            batch.append(entry)
+            if len(batch) == size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+        return
+    iterator = iter(entries)
+    while batch := await run_in_threadpool(list, islice(iterator, size)):
+        yield batch
+
+
+async def json_array(
+    entries: Iterable[str] | AsyncIterable[str]
+) -> AsyncIterator[str]:
+    """
+    Stream already encoded JSON values as one JSON array.
+
+    Args:
+        entries: The encoded values
+    Returns:
+        The chunks of the array, one per batch of values
+    """
+    separator = "["
+    async for batch in batches(entries):
+        yield separator + ",".join(batch)
+        separator = ","
+    yield "]" if separator == "," else "[]"
+
+
+async def ndjson(
+    rows: Iterable[Sequence[str]] | AsyncIterable[Sequence[str]]
+) -> AsyncIterator[str]:
+    """
+    Stream already encoded JSON values as newline delimited JSON.
+
+    Args:
+        rows: Rows whose single column is an encoded value
+    Returns:
+        The lines, one chunk per batch of rows
+    """
+    async for batch in batches(rows):
+        yield "".join(row[0] + "\n" for row in batch)
+
+
+async def csv_lines(
+    header: Sequence[str],
+    rows: Iterable[Sequence] | AsyncIterable[Sequence]
+) -> AsyncIterator[str]:
+    """
+    Stream rows as CSV, NULLs as blank fields.
+
+    Args:
+        header: The column names written first
+        rows: The rows
+    Returns:
+        The header line, then one chunk per batch of rows
+    """
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+
+    def lines(batch: Iterable[Sequence]) -> str:
+        """Format rows, emptying the buffer."""
+        writer.writerows(batch)
+        formatted = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return formatted
+
+    yield lines([header])
+    async for batch in batches(rows):
+        yield lines(batch)